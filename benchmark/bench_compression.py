@@ -0,0 +1,65 @@
+"""
+Size reduction and cost of compressing state entries with the shipped
+dictionary, on synthetic GGOs (most with emissions), measurements and
+settlements of 1 to 50 parts.
+
+For every entry type and encoding (JSON as written by 0.1, compact as written
+by 0.2) it reports the mean entry size uncompressed, compressed without a
+dictionary and compressed with the dictionary (as written by 0.3), and the
+mean encode and decode time with and without compression. The samples use a
+different seed than the dictionary was trained on.
+
+    python -m benchmark.bench_compression [entries]
+"""
+import sys
+import time
+import zlib
+import statistics
+
+from src.datahub_processor.ledger_dto import GGO, Measurement, Settlement
+from src.datahub_processor.compression import LEVEL, WBITS, MEMLEVEL
+from src.datahub_processor.state_codec import encode_state, decode_state
+
+from .fixtures import sample_states
+
+
+def deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, WBITS, MEMLEVEL)
+    return compressor.compress(data) + compressor.flush()
+
+
+def per_entry(function, states) -> float:
+    begin = time.perf_counter()
+    for state in states:
+        function(state)
+    return (time.perf_counter() - begin) / len(states) * 1e6
+
+
+def main(entries: int):
+    states = list(sample_states(entries, seed='benchmark'))
+
+    print(f'{"entry":<11} {"encoding":<8} {"bytes":>7} {"deflate":>8} {"dict":>7} {"ratio":>6}'
+          f' {"encode":>9} {"+dict":>9} {"decode":>9} {"+dict":>9}')
+
+    for clazz in (GGO, Measurement, Settlement):
+        selected = [state for state in states if type(state) is clazz]
+
+        for name, compact in (('json', False), ('compact', True)):
+            plain = [encode_state(state, compact) for state in selected]
+            compressed = [encode_state(state, compact, compressed=True) for state in selected]
+
+            size = statistics.mean(map(len, plain))
+            deflated = statistics.mean(len(deflate(data)) + 1 for data in plain)
+            with_dictionary = statistics.mean(map(len, compressed))
+
+            encode = per_entry(lambda state: encode_state(state, compact), selected)
+            encode_compressed = per_entry(lambda state: encode_state(state, compact, compressed=True), selected)
+            decode = per_entry(lambda data: decode_state(clazz, data), plain)
+            decode_compressed = per_entry(lambda data: decode_state(clazz, data), compressed)
+
+            print(f'{clazz.__name__:<11} {name:<8} {size:>7.0f} {deflated:>8.0f} {with_dictionary:>7.0f} {with_dictionary / size:>6.2f}'
+                  f' {encode:>6.1f} us {encode_compressed:>6.1f} us {decode:>6.1f} us {decode_compressed:>6.1f} us')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,60 @@
+"""
+End-to-end throughput of the processor as it runs in production: main.main(url)
+in its own process, connected over ZMQ to a local stand-in validator, so the
+SDK's protobuf serialization, messaging threads and state round trips are
+all included.
+
+The synthetic GGO lifecycles of bench_lifecycle are sent stage by stage with
+up to --in-flight requests outstanding, and the throughput and latency of
+every stage is printed.
+
+    python -m benchmark.bench_end_to_end --ggos 1000 --in-flight 8
+"""
+import os
+import sys
+import time
+import argparse
+
+from sawtooth_sdk.protobuf.processor_pb2 import TpProcessResponse
+from test.validator import LocalValidator, run_main
+
+from .bench_lifecycle import STAGES, lifecycle
+
+
+def run_quiet(url):
+    sys.stdout = open(os.devnull, 'w')
+    run_main(url)
+
+
+def main(ggos: int, in_flight: int):
+    lifecycles = [lifecycle(i) for i in range(ggos)]
+
+    with LocalValidator() as validator:
+        processor = validator.start_processor(run_quiet)
+
+        try:
+            validator.wait_for_registration([handler().family_name for _, handler in STAGES])
+
+            print(f'ggos: {ggos}, in flight: {in_flight}')
+            print(f'{"stage":>10} {"transactions":>13} {"tps":>10} {"per tx":>12} {"rejected":>9}')
+
+            for stage, _ in STAGES:
+                transactions = [tx for transactions in lifecycles for tx in transactions[stage]]
+
+                begin = time.perf_counter()
+                responses = validator.run(transactions, in_flight)
+                elapsed = time.perf_counter() - begin
+
+                rejected = len([r for r in responses if r.status != TpProcessResponse.OK])
+                print(f'{stage:>10} {len(transactions):>13} {len(transactions) / elapsed:>10.1f} {elapsed / len(transactions) * 1e6:>9.1f} us {rejected:>9}')
+        finally:
+            validator.shutdown(processor)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ggos', type=int, default=1000, help='number of GGO lifecycles')
+    parser.add_argument('--in-flight', type=int, default=1, help='requests outstanding at the processor')
+    args = parser.parse_args()
+
+    main(args.ggos, args.in_flight)
@@ -0,0 +1,225 @@
+"""
+Synthetic GGO lifecycles driven through every handler against an in-memory
+context: publish production and consumption measurements, issue, split,
+transfer, retire and settle.
+
+For every handler the apply latency is timed per transaction and reported as
+throughput, p50 and p99. Allocation pressure is measured on a smaller sample
+with tracemalloc (peak bytes traced during one apply and the net number of
+memory blocks it left allocated), as tracing slows the handlers down.
+
+Lifecycles are generated and applied in batches, each batch with a fresh
+context, so memory stays flat up to a million GGOs. The result is written as
+JSON so runs can be compared across releases.
+
+With --rtt every get_state and set_state call waits for a simulated validator
+round trip, which shows how each handler's latency grows with the RTT.
+
+    python -m benchmark.bench_lifecycle --ggos 1000 --output bench_lifecycle.json
+    python -m benchmark.bench_lifecycle --ggos 1000 --rtt 1 --jitter 0.2
+
+With --family-version 0.2 the handlers write compact binary state entries
+instead of JSON; state_bytes_per_lifecycle shows the size of the state left
+behind by one lifecycle.
+
+    python -m benchmark.bench_lifecycle --ggos 1000 --family-version 0.2
+"""
+import os
+import sys
+import json
+import time
+import array
+import argparse
+import platform
+import contextlib
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+
+from src.datahub_processor import PublishMeasurementTransactionHandler, IssueGGOTransactionHandler, TransferGGOTransactionHandler, SplitGGOTransactionHandler, RetireGGOTransactionHandler, SettlementHandler
+from src.datahub_processor.ledger_dto import PublishMeasurementRequest, IssueGGORequest, SplitGGORequest, SplitGGOPart, TransferGGORequest, RetireGGORequest, SettlementRequest, MeasurementType, AddressPrefix
+from src.datahub_processor.settlement_pages import page_prefix, member_address
+from src.datahub_processor.trusted_issuers import trusted_issuers
+from test.mocks import MockContext, LatencyContext
+
+from .fixtures import SyntheticKey, EMISSIONS, address, transaction
+
+
+STAGES = [
+    ('publish', PublishMeasurementTransactionHandler),
+    ('issue', IssueGGOTransactionHandler),
+    ('split', SplitGGOTransactionHandler),
+    ('transfer', TransferGGOTransactionHandler),
+    ('retire', RetireGGOTransactionHandler),
+    ('settle', SettlementHandler),
+]
+
+BEGIN = datetime(2020, 1, 1, 12, tzinfo=timezone.utc)
+END = datetime(2020, 1, 1, 13, tzinfo=timezone.utc)
+
+
+def lifecycle(i: int, family_version: str = '0.1'):
+    """ Returns the transactions of lifecycle i grouped by stage. """
+    producer = SyntheticKey(f'{i}-producer')
+    consumer = SyntheticKey(f'{i}-consumer')
+    owner = SyntheticKey(f'{i}-owner')
+    part_1 = SyntheticKey(f'{i}-part-1')
+    part_2 = SyntheticKey(f'{i}-part-2')
+    receiver = SyntheticKey(f'{i}-receiver')
+
+    production = address(AddressPrefix.MEASUREMENT, producer)
+    consumption = address(AddressPrefix.MEASUREMENT, consumer)
+    settlement = address(AddressPrefix.SETTLEMENT, consumer)
+    ggo = address(AddressPrefix.GGO, owner)
+    ggo_1 = address(AddressPrefix.GGO, part_1)
+    ggo_2 = address(AddressPrefix.GGO, part_2)
+    ggo_3 = address(AddressPrefix.GGO, receiver)
+    member = member_address(settlement, ggo_3)
+    issuers = trusted_issuers.addresses
+
+    return {
+        'publish': [
+            transaction(PublishMeasurementRequest(amount=100, type=MeasurementType.PRODUCTION, begin=BEGIN, end=END, sector='DK1'),
+                producer, [production] + issuers, [production], family_version),
+            transaction(PublishMeasurementRequest(amount=100, type=MeasurementType.CONSUMPTION, begin=BEGIN, end=END, sector='DK1'),
+                consumer, [consumption] + issuers, [consumption], family_version),
+        ],
+        'issue': [
+            transaction(IssueGGORequest(origin=production, destination=ggo, tech_type='T12412', fuel_type='F010101', emissions=EMISSIONS),
+                producer, [production, ggo] + issuers, [ggo], family_version),
+        ],
+        'split': [
+            transaction(SplitGGORequest(origin=ggo, parts=[SplitGGOPart(address=ggo_1, amount=60), SplitGGOPart(address=ggo_2, amount=40)]),
+                owner, [ggo, ggo_1, ggo_2], [ggo, ggo_1, ggo_2], family_version),
+        ],
+        'transfer': [
+            transaction(TransferGGORequest(origin=ggo_1, destination=ggo_3),
+                part_1, [ggo_1, ggo_3], [ggo_1, ggo_3], family_version),
+        ],
+        'retire': [
+            transaction(RetireGGORequest(origin=ggo_3, settlement_address=settlement),
+                receiver, [ggo_3, settlement], [ggo_3], family_version),
+        ],
+        'settle': [
+            transaction(SettlementRequest(settlement_address=settlement, measurement_address=consumption, ggo_addresses=[ggo_3]),
+                consumer, [consumption, settlement, ggo_3, page_prefix(settlement), member], [settlement, page_prefix(settlement), member], family_version),
+        ],
+    }
+
+
+def run_batch(first: int, count: int, handlers, latencies, rtt: float, jitter: float, family_version: str):
+    batch = [lifecycle(i, family_version) for i in range(first, first + count)]
+    context = LatencyContext(states={}, latency=rtt, jitter=jitter, seed=first)
+
+    for stage, _ in STAGES:
+        handler = handlers[stage]
+        timings = latencies[stage]
+
+        for transactions in batch:
+            for tx in transactions[stage]:
+                begin = time.perf_counter()
+                handler.apply(tx, context)
+                timings.append(time.perf_counter() - begin)
+
+    return sum(len(data) for data in context.states.values())
+
+
+def measure_allocations(count: int, handlers, family_version: str):
+    batch = [lifecycle(i, family_version) for i in range(count)]
+    context = MockContext(states={})
+    result = {}
+
+    for stage, _ in STAGES:
+        handler = handlers[stage]
+        peaks, blocks = [], []
+
+        for transactions in batch:
+            for tx in transactions[stage]:
+                tracemalloc.start()
+                before = sys.getallocatedblocks()
+                handler.apply(tx, context)
+                blocks.append(sys.getallocatedblocks() - before)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+
+        result[stage] = {
+            'alloc_peak_bytes_mean': sum(peaks) / len(peaks),
+            'alloc_net_blocks_mean': sum(blocks) / len(blocks),
+        }
+
+    return result
+
+
+def percentile(ordered, p: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main(ggos: int, batch_size: int, alloc_sample: int, rtt: float = 0.0, jitter: float = 0.0, family_version: str = '0.1'):
+    handlers = {stage: handler() for stage, handler in STAGES}
+    latencies = {stage: array.array('d') for stage, _ in STAGES}
+    state_bytes = 0
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for first in range(0, ggos, batch_size):
+            state_bytes += run_batch(first, min(batch_size, ggos - first), handlers, latencies, rtt, jitter, family_version)
+
+        allocations = measure_allocations(min(alloc_sample, ggos), handlers, family_version)
+
+    results = {}
+
+    for stage, handler in STAGES:
+        ordered = sorted(latencies[stage])
+        total = sum(ordered)
+
+        results[stage] = {
+            'family': handlers[stage].family_name,
+            'transactions': len(ordered),
+            'throughput_tps': len(ordered) / total,
+            'latency_mean_us': total / len(ordered) * 1e6,
+            'latency_p50_us': percentile(ordered, 0.50) * 1e6,
+            'latency_p99_us': percentile(ordered, 0.99) * 1e6,
+            **allocations[stage],
+        }
+
+    return {
+        'benchmark': 'lifecycle',
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'revision': revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'ggos': ggos,
+        'batch_size': batch_size,
+        'alloc_sample': min(alloc_sample, ggos),
+        'rtt_ms': rtt * 1000,
+        'jitter_ms': jitter * 1000,
+        'family_version': family_version,
+        'state_bytes_per_lifecycle': state_bytes / ggos,
+        'handlers': results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ggos', type=int, default=1000, help='number of GGO lifecycles, 1000 to 1000000')
+    parser.add_argument('--batch-size', type=int, default=1000, help='lifecycles per in-memory context')
+    parser.add_argument('--alloc-sample', type=int, default=200, help='lifecycles traced for allocations')
+    parser.add_argument('--rtt', type=float, default=0.0, help='simulated validator round trip in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='round trip jitter in milliseconds')
+    parser.add_argument('--family-version', default='0.1', help='family version of the transactions, 0.2 writes compact, 0.3 compressed compact state entries and 0.4 also pages settlements')
+    parser.add_argument('--output', help='write the JSON result to this file instead of stdout')
+    args = parser.parse_args()
+
+    result = json.dumps(main(args.ggos, args.batch_size, args.alloc_sample, args.rtt / 1000, args.jitter / 1000, args.family_version), indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(result)
+    else:
+        print(result)
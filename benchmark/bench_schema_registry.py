@@ -0,0 +1,65 @@
+"""
+Per-transaction time of TransferGGORequest with and without the shared
+schema registry.
+
+The "before" run patches the registry lookup used by GenericHandler so every
+call builds a fresh schema, which is what the handlers did before the registry.
+
+    python -m benchmark.bench_schema_registry [iterations]
+"""
+import os
+import sys
+import time
+import contextlib
+from unittest import mock
+
+from marshmallow_dataclass import class_schema
+
+from src.datahub_processor import TransferGGOTransactionHandler
+from src.datahub_processor.ledger_dto import TransferGGORequest, AddressPrefix
+from src.datahub_processor.schema_registry import STATE_TYPES
+from test.mocks import MockContext
+
+from .fixtures import child_key, address, ggo_bytes, transaction
+
+
+def uncached_schema(clazz: type):
+    if clazz in STATE_TYPES:
+        return clazz.get_schema()
+    return class_schema(clazz)()
+
+
+def run(iterations: int) -> float:
+    handler = TransferGGOTransactionHandler()
+
+    key = child_key(1)
+    origin = address(AddressPrefix.GGO, key)
+    destination = address(AddressPrefix.GGO, child_key(2))
+    state = ggo_bytes(origin, 100)
+
+    request = TransferGGORequest(origin=origin, destination=destination)
+    tx = transaction(request, key, [origin, destination], [origin, destination])
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        begin = time.perf_counter()
+        for _ in range(iterations):
+            handler.apply(tx, MockContext(states={origin: state}))
+        elapsed = time.perf_counter() - begin
+
+    return elapsed / iterations
+
+
+def main(iterations: int):
+    with mock.patch('src.datahub_processor.generic_handler.get_schema', uncached_schema):
+        before = run(iterations)
+
+    after = run(iterations)
+
+    print(f'iterations:         {iterations}')
+    print(f'before (per tx):    {before * 1e6:10.1f} us')
+    print(f'after  (per tx):    {after * 1e6:10.1f} us')
+    print(f'speedup:            {before / after:10.2f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,81 @@
+"""
+State access of a SettlementRequest adding k GGOs to a settlement of n parts,
+stored as one entry (0.3) and as a header and pages (0.4), see
+settlement_pages.py.
+
+A paged settlement writes a member entry per added GGO, so a duplicate is
+found with one read per GGO. The "scan" columns give what the duplicate check
+would read instead without member entries: every page of the settlement.
+
+    python -m benchmark.bench_settlement_pages
+"""
+import math
+import time
+import hashlib
+
+from src.datahub_processor import SettlementHandler
+from src.datahub_processor.ledger_dto import GGONext, GGOAction, MeasurementType, Settlement, SettlementPart, SettlementRequest, generate_address, AddressPrefix
+from src.datahub_processor.state_codec import encode_state
+from src.datahub_processor.settlement_pages import PagedSettlement, PAGE_SIZE, ROW
+from test.mocks import MockContext
+
+from .fixtures import child_key, address, ggo_bytes, measurement_bytes, transaction
+
+
+def ggo_address(i: int) -> str:
+    return generate_address(AddressPrefix.GGO, hashlib.sha256(str(i).encode()).digest())
+
+
+def settlement_states(version: str, settlement_address: str, measurement_address: str, parts: int):
+    if version in SettlementHandler.PAGED_VERSIONS:
+        paged = PagedSettlement(settlement_address, measurement_address)
+        for i in range(parts):
+            paged.add(ggo_address(i), 1)
+        return paged.entries(lambda addresses: {})
+
+    settlement = Settlement(measurement=measurement_address, parts=[SettlementPart(ggo=ggo_address(i), amount=1) for i in range(parts)])
+    return {settlement_address: encode_state(settlement, compact=True, compressed=True)}
+
+
+def run(version: str, parts: int, added: int):
+    key = child_key(3)
+    measurement_address = address(AddressPrefix.MEASUREMENT, key)
+    settlement_address = address(AddressPrefix.SETTLEMENT, key)
+
+    states = {measurement_address: measurement_bytes(parts + added, MeasurementType.CONSUMPTION)}
+    states.update(settlement_states(version, settlement_address, measurement_address, parts))
+
+    ggo_addresses = [ggo_address(parts + i) for i in range(added)]
+    for ggo in ggo_addresses:
+        states[ggo] = ggo_bytes(measurement_address, 1, GGONext(GGOAction.RETIRE, [settlement_address]))
+
+    request = SettlementRequest(
+        settlement_address=settlement_address,
+        measurement_address=measurement_address,
+        ggo_addresses=ggo_addresses)
+
+    context = MockContext(states)
+
+    begin = time.perf_counter()
+    SettlementHandler().apply(transaction(request, key, [], [], version), context)
+
+    return context, time.perf_counter() - begin
+
+
+def main():
+    print(f'{"parts":>6} {"added":>5} {"version":>7} {"read":>5} {"bytes":>8} {"written":>7} {"bytes":>8} {"ms":>7} {"scan":>5} {"bytes":>8}')
+
+    for parts in (256, 4096, 32768):
+        for added in (1, 16, 128):
+            pages = math.ceil(parts / PAGE_SIZE)
+
+            for version in ('0.3', '0.4'):
+                context, elapsed = run(version, parts, added)
+                scan = f'{pages:>5} {pages + parts * ROW.size:>8}' if version == '0.4' else ''
+
+                print(f'{parts:>6} {added:>5} {version:>7} {context.addresses_read:>5} {context.bytes_read:>8}'
+                      f' {context.addresses_written:>7} {context.bytes_written:>8} {elapsed * 1000:>7.1f} {scan}')
+
+
+if __name__ == '__main__':
+    main()
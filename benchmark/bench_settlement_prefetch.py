@@ -0,0 +1,62 @@
+"""
+Latency of a SettlementRequest against a context that simulates the validator
+round trip, for a growing number of GGOs.
+
+The "per address" run sets STATE_CHUNK_SIZE to 1, which costs one round trip
+per address as the handler did before prefetching.
+
+    python -m benchmark.bench_settlement_prefetch [rtt_ms]
+"""
+import sys
+import time
+
+from src.datahub_processor import SettlementHandler
+from src.datahub_processor.ledger_dto import GGONext, GGOAction, MeasurementType, SettlementRequest, AddressPrefix
+from test.mocks import LatencyContext
+
+from .fixtures import child_key, address, ggo_bytes, measurement_bytes, transaction
+
+
+def run(ggo_count: int, rtt: float, chunk_size: int):
+    key = child_key(3)
+    measurement_address = address(AddressPrefix.MEASUREMENT, key)
+    settlement_address = address(AddressPrefix.SETTLEMENT, key)
+
+    states = {measurement_address: measurement_bytes(ggo_count, MeasurementType.CONSUMPTION)}
+    ggo_addresses = []
+
+    for i in range(ggo_count):
+        ggo_address = f'ggo_{i}'
+        ggo_addresses.append(ggo_address)
+        states[ggo_address] = ggo_bytes(measurement_address, 1, GGONext(GGOAction.RETIRE, [settlement_address]))
+
+    request = SettlementRequest(
+        settlement_address=settlement_address,
+        measurement_address=measurement_address,
+        ggo_addresses=ggo_addresses)
+
+    addresses = [measurement_address, settlement_address] + ggo_addresses
+    tx = transaction(request, key, addresses, addresses)
+
+    handler = SettlementHandler()
+    handler.STATE_CHUNK_SIZE = chunk_size
+    context = LatencyContext(states, latency=rtt)
+
+    begin = time.perf_counter()
+    handler.apply(tx, context)
+
+    return time.perf_counter() - begin, len(context.calls)
+
+
+def main(rtt: float):
+    print(f'simulated rtt: {rtt * 1000:.1f} ms')
+    print(f'{"ggos":>6} {"per address":>22} {"prefetched":>22}')
+
+    for ggo_count in (1, 10, 100, 500, 1000):
+        before, before_trips = run(ggo_count, rtt, 1)
+        after, after_trips = run(ggo_count, rtt, SettlementHandler.STATE_CHUNK_SIZE)
+        print(f'{ggo_count:>6} {before * 1000:>10.1f} ms {before_trips:>5} rt {after * 1000:>10.1f} ms {after_trips:>5} rt')
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.001)
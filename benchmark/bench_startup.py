@@ -0,0 +1,64 @@
+"""
+Startup cost of the processor after a restart.
+
+Import time is measured by importing main.py in fresh interpreters. Time to
+first transaction starts the processor in a fresh (spawned) interpreter
+against a local stand-in validator, with and without LEDGER_WARM_UP. It
+reports the time until the families were registered, the latency of the
+first transaction and the mean latency of the rest of a GGO lifecycle.
+
+    python -m benchmark.bench_startup [runs]
+"""
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+from src.datahub_processor.warm_up import transactions
+from test.validator import LocalValidator, run_main, SRC
+
+
+IMPORT = f'import sys, time; sys.path.insert(0, {SRC!r}); t = time.perf_counter(); import main; print(time.perf_counter() - t)'
+
+
+def import_seconds() -> float:
+    return float(subprocess.check_output([sys.executable, '-c', IMPORT]).decode().strip().splitlines()[-1])
+
+
+def first_transaction(warm_up: bool):
+    os.environ['LEDGER_WARM_UP'] = 'true' if warm_up else 'false'
+    lifecycle = transactions()
+
+    with LocalValidator() as validator:
+        begin = time.perf_counter()
+        processor = validator.start_processor(run_main, method='spawn')
+
+        try:
+            validator.wait_for_registration(sorted({t.header.family_name for t in lifecycle}), timeout=60)
+            registered = time.perf_counter()
+
+            latencies = []
+            for transaction in lifecycle:
+                sent = time.perf_counter()
+                validator.run([transaction])
+                latencies.append(time.perf_counter() - sent)
+        finally:
+            validator.shutdown(processor)
+
+    return registered - begin, latencies[0], statistics.mean(latencies[1:])
+
+
+def main(runs: int):
+    print(f'import main.py:       {statistics.median(import_seconds() for _ in range(runs)) * 1000:8.1f} ms (median of {runs})')
+    print()
+    print(f'{"warm-up":>8} {"registered":>13} {"first tx":>11} {"next txs":>11}')
+
+    for warm_up in (False, True):
+        results = [first_transaction(warm_up) for _ in range(runs)]
+        registered, first, rest = (statistics.median(values) for values in zip(*results))
+        print(f'{str(warm_up):>8} {registered * 1000:>10.1f} ms {first * 1000:>8.1f} ms {rest * 1000:>8.1f} ms')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
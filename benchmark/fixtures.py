@@ -0,0 +1,136 @@
+import random
+import hashlib
+from datetime import datetime, timezone, timedelta
+
+from bip32utils import BIP32Key
+from marshmallow_dataclass import class_schema
+from sawtooth_signing import create_context
+from sawtooth_signing.secp256k1 import Secp256k1PrivateKey
+
+from src.datahub_processor.ledger_dto import GGO, GGONext, GGOAction, Measurement, MeasurementType, Settlement, SettlementPart, generate_address, AddressPrefix
+from test.mocks import FakeTransaction, FakeTransactionHeader
+
+
+MASTER_KEY = BIP32Key.fromEntropy("datahub_processor_benchmark_master_key".encode())
+
+EMISSIONS = {
+    "co2": {
+        "value": 1113342.14,
+        "unit": "g/Wh",
+    },
+    "so2": {
+        "value": 9764446,
+        "unit": "g/Wh",
+    },
+}
+
+TECHNOLOGIES = [('T010000', 'F00000000'), ('T020001', 'F01040100'), ('T12412', 'F010101'), ('T030002', 'F01050100')]
+
+
+class SyntheticKey:
+    """
+    Stands in for a BIP32Key when many keys are needed, the key is derived
+    from the seed with libsecp256k1 which is orders of magnitude faster.
+    """
+
+    _context = create_context('secp256k1')
+
+    def __init__(self, seed: str):
+        private_key = Secp256k1PrivateKey.from_bytes(hashlib.sha256(seed.encode()).digest())
+        self._public_key = self._context.get_public_key(private_key).as_bytes()
+
+    def PublicKey(self) -> bytes:
+        return self._public_key
+
+
+def child_key(*path) -> BIP32Key:
+    key = MASTER_KEY
+    for index in path:
+        key = key.ChildKey(index)
+    return key
+
+
+def address(prefix: AddressPrefix, key: BIP32Key) -> str:
+    return generate_address(prefix, key.PublicKey())
+
+
+def ggo_bytes(origin: str, amount: int, next=None) -> bytes:
+    return GGO.get_schema().dumps(GGO(
+        origin=origin,
+        amount=amount,
+        begin=datetime(2020, 1, 1, 12, tzinfo=timezone.utc),
+        end=datetime(2020, 1, 1, 13, tzinfo=timezone.utc),
+        tech_type='T12412',
+        fuel_type='F010101',
+        sector='DK1',
+        next=next,
+        emissions=EMISSIONS,
+    )).encode('utf8')
+
+
+def measurement_bytes(amount: int, type: MeasurementType) -> bytes:
+    return Measurement.get_schema().dumps(Measurement(
+        amount=amount,
+        type=type,
+        begin=datetime(2020, 1, 1, 12, tzinfo=timezone.utc),
+        end=datetime(2020, 1, 1, 13, tzinfo=timezone.utc),
+        sector='DK1',
+    )).encode('utf8')
+
+
+def transaction(request, key: BIP32Key, inputs, outputs, family_version: str = '0.1') -> FakeTransaction:
+    return FakeTransaction(
+        header=FakeTransactionHeader(
+            batcher_public_key=key.PublicKey().hex(),
+            dependencies=[],
+            family_name=type(request).__name__,
+            family_version=family_version,
+            inputs=inputs,
+            outputs=outputs,
+            signer_public_key=key.PublicKey().hex()),
+        payload=class_schema(type(request))().dumps(request).encode('utf8')
+    )
+
+
+def sample_states(count: int, seed: str = 'samples'):
+    """
+    Yields count realistic state entries: measurements, GGOs with and without
+    next and emissions, and settlements of 1 to 50 parts, spread over a year
+    of hourly periods.
+    """
+    rng = random.Random(seed)
+
+    def random_address(prefix: AddressPrefix) -> str:
+        return generate_address(prefix, rng.getrandbits(264).to_bytes(33, 'big'))
+
+    for _ in range(count):
+        begin = datetime(2020, 1, 1, tzinfo=timezone.utc) + timedelta(hours=rng.randrange(24 * 366))
+        end = begin + timedelta(hours=1)
+        sector = rng.choice(['DK1', 'DK2'])
+        kind = rng.random()
+
+        if kind < 0.2:
+            yield Measurement(amount=rng.randrange(10**7), type=rng.choice(list(MeasurementType)), begin=begin, end=end, sector=sector)
+
+        elif kind < 0.8:
+            tech_type, fuel_type = rng.choice(TECHNOLOGIES)
+            next = None
+            if rng.random() < 0.5:
+                action = rng.choice(list(GGOAction))
+                addresses = [random_address(AddressPrefix.SETTLEMENT if action == GGOAction.RETIRE else AddressPrefix.GGO)
+                    for _ in range(rng.choice([1, 1, 2, 3]))]
+                next = GGONext(action=action, addresses=addresses)
+
+            emissions = None
+            if rng.random() < 0.7:
+                emissions = {
+                    name: {'value': round(rng.uniform(0, 10**6), 2), 'unit': 'g/Wh'}
+                    for name in ['co2', 'so2', 'nox', 'ch4', 'n2o', 'particles'][:rng.randint(2, 6)]
+                }
+
+            yield GGO(origin=random_address(AddressPrefix.MEASUREMENT), amount=rng.randrange(10**7), begin=begin, end=end,
+                tech_type=tech_type, fuel_type=fuel_type, sector=sector, next=next, emissions=emissions)
+
+        else:
+            parts = [SettlementPart(ggo=random_address(AddressPrefix.GGO), amount=rng.randrange(10**6)) for _ in range(rng.randint(1, 50))]
+            yield Settlement(measurement=random_address(AddressPrefix.MEASUREMENT), parts=parts)
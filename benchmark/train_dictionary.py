@@ -0,0 +1,68 @@
+"""
+Trains a compression dictionary on synthetic state entries, JSON and compact,
+and writes it as the given dictionary version. Shipped versions are never
+overwritten, see compression.py.
+
+    python -m benchmark.train_dictionary 2
+"""
+import os
+import sys
+import collections
+
+from src.datahub_processor.compression import dictionary_path
+from src.datahub_processor.state_codec import encode_state
+
+from .fixtures import sample_states
+
+
+def train_dictionary(samples, size: int = 32 * 1024, k: int = 8) -> bytes:
+    """
+    Builds a dictionary from sample entries. Runs of bytes made of k-grams that
+    occur in more than one sample are collected and ranked by how much of the
+    samples they cover. zlib matches nearby bytes with shorter codes, so the
+    best segments are placed at the end. Random content such as the hash part
+    of addresses rarely repeats and is left out.
+    """
+    frequency = collections.Counter()
+    for sample in samples:
+        frequency.update({sample[i:i + k] for i in range(len(sample) - k + 1)})
+
+    segments = collections.Counter()
+    for sample in samples:
+        start = None
+        for i in range(len(sample) - k + 2):
+            common = i <= len(sample) - k and frequency[sample[i:i + k]] > 1
+            if common and start is None:
+                start = i
+            elif not common and start is not None:
+                segments[sample[start:i + k - 1]] += 1
+                start = None
+
+    ranked = sorted(segments, key=lambda segment: (segments[segment] * len(segment), segment))
+
+    result = b''
+    for segment in reversed(ranked):
+        if len(result) + len(segment) > size:
+            continue
+        if segment not in result:
+            result = segment + result
+
+    return result
+
+
+def main(version: int, count: int = 2000):
+    path = dictionary_path(version)
+    if os.path.exists(path):
+        sys.exit(f'{path} exists, dictionaries must not change once shipped')
+
+    samples = [encode_state(state, compact) for state in sample_states(count, seed='dictionary') for compact in (False, True)]
+    dictionary = train_dictionary(samples)
+
+    with open(path, 'wb') as f:
+        f.write(dictionary)
+
+    print(f'Wrote {len(dictionary)} bytes to {path}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]))
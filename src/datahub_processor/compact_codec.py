@@ -0,0 +1,358 @@
+"""
+Compact binary encoding of the state entries, written by the handlers for
+transactions of the compact family versions (GenericHandler.COMPACT_VERSIONS).
+
+An entry starts with a tag byte holding the entry type and format version,
+0x80 | type << 4 | version. A tag is never the first byte of UTF-8 JSON, so
+legacy JSON entries are told apart from compact ones by their first byte.
+
+The tag is followed by a fixed little-endian header packed with struct:
+signed 64 bit amounts, timestamps as epoch seconds and one byte codes for the
+enums and the sector. Then come the variable fields, each prefixed with its
+length in two bytes. Lowercase hex strings such as addresses are stored as the
+bytes they spell, flagged in the lowest bit of the length. A sector without a
+code is stored as a string after code 0.
+
+Settlements are written as SETTLEMENT_V2 when all their GGOs are state
+addresses: the header holds the number of parts and their total amount, and
+the parts follow as a table of fixed width rows, the address bytes and the
+amount, sorted by their bytes. SettlementRecord reads the total, finds GGOs
+with a binary search of the table and merges new rows into it without
+decoding it. The parts of a decoded SETTLEMENT_V2 entry come in the order of
+the table. Other settlements are written as SETTLEMENT_V1.
+
+Objects the format cannot represent exactly, e.g. a timestamp with sub-second
+precision or an amount out of range, are not encoded (encode_compact returns
+None) and are written as JSON instead.
+
+Decoding checks the structure of an entry, not the field validators of the
+schema; compact entries are only written by the handlers from validated data.
+"""
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+
+from marshmallow import ValidationError
+
+from .ledger_dto import GGO, GGONext, GGOAction, Measurement, MeasurementType, Settlement, SettlementPart
+
+
+GGO_V1 = 0x81
+MEASUREMENT_V1 = 0x91
+SETTLEMENT_V1 = 0xA1
+SETTLEMENT_V2 = 0xA2
+
+# The formats an entry type is written in, in order of preference
+TAGS = {
+    GGO: (GGO_V1,),
+    Measurement: (MEASUREMENT_V1,),
+    Settlement: (SETTLEMENT_V2, SETTLEMENT_V1),
+}
+
+_TYPES = {tag: clazz for clazz, tags in TAGS.items() for tag in tags}
+
+# Codes are stored in the entries, only ever append to these lists
+MEASUREMENT_TYPES = ['PRODUCTION', 'CONSUMPTION']
+GGO_ACTIONS = ['TRANSFER', 'SPLIT', 'RETIRE']
+SECTORS = ['DK1', 'DK2']
+
+_MEASUREMENT_TYPE_CODES = {MeasurementType[name]: code for code, name in enumerate(MEASUREMENT_TYPES, 1)}
+_GGO_ACTION_CODES = {GGOAction[name]: code for code, name in enumerate(GGO_ACTIONS, 1)}
+_SECTOR_CODES = {name: code for code, name in enumerate(SECTORS, 1)}
+
+# tag, amount, begin, end, sector code, flags (bit 0 next, bit 1 emissions)
+_GGO_HEADER = struct.Struct('<BqqqBB')
+# tag, amount, type code, begin, end, sector code
+_MEASUREMENT_HEADER = struct.Struct('<BqBqqB')
+# tag, number of parts
+_SETTLEMENT_HEADER = struct.Struct('<BH')
+# tag, number of parts, total amount of the parts
+SETTLEMENT_V2_HEADER = struct.Struct('<BIq')
+# GGO address, amount
+SETTLEMENT_V2_PART = struct.Struct('<35sq')
+# action code, number of addresses
+_NEXT_HEADER = struct.Struct('<BH')
+_AMOUNT = struct.Struct('<q')
+_LENGTH = struct.Struct('<H')
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_SECOND = timedelta(seconds=1)
+_ZERO = timedelta(0)
+
+
+class _Unrepresentable(Exception):
+    """Raised while encoding a value the compact format cannot hold exactly."""
+
+
+def is_compact(data: bytes) -> bool:
+    return len(data) > 0 and data[0] >= 0x80
+
+
+def _int(value) -> int:
+    if type(value) is not int:
+        raise _Unrepresentable()
+    return value
+
+
+def _seconds(value: datetime) -> int:
+    if type(value) is not datetime or value.microsecond or value.utcoffset() != _ZERO:
+        raise _Unrepresentable()
+    return (value - _EPOCH) // _SECOND
+
+
+def _str(value: str) -> bytes:
+    if type(value) is not str:
+        raise _Unrepresentable()
+    raw = value.encode('utf8')
+    return _LENGTH.pack(len(raw) << 1) + raw
+
+
+def _hex(value: str) -> bytes:
+    """Lowercase hex as the bytes it spells and anything else as a string, flagged in the lowest bit of the length."""
+    if type(value) is not str:
+        raise _Unrepresentable()
+
+    try:
+        raw = bytes.fromhex(value)
+    except ValueError:
+        return _str(value)
+
+    # fromhex also accepts uppercase and whitespace, which would not round trip
+    if len(raw) * 2 != len(value) or not (value.islower() or value.isdigit()):
+        return _str(value)
+
+    return _LENGTH.pack(len(raw) << 1 | 1) + raw
+
+
+def _sector(value: str, parts: list) -> int:
+    code = _SECTOR_CODES.get(value, 0)
+    if code == 0:
+        parts.append(_str(value))
+    return code
+
+
+def _read(data: bytes, position: int):
+    """Reads the variable field at position, returns the value and the position after it."""
+    length, = _LENGTH.unpack_from(data, position)
+    position += 2
+    end = position + (length >> 1)
+    raw = data[position:end]
+
+    if len(raw) != length >> 1:
+        raise ValueError('Truncated field')
+
+    return (raw.hex() if length & 1 else raw.decode('utf8')), end
+
+
+def _datetime(seconds: int) -> datetime:
+    return _EPOCH + timedelta(seconds=seconds)
+
+
+def _code(codes: list, code: int):
+    if not 0 < code <= len(codes):
+        raise ValueError(f'Invalid code {code}')
+    return codes[code - 1]
+
+
+def _encode_ggo(ggo: GGO) -> bytes:
+    parts = [b'', _hex(ggo.origin)]
+    sector = _sector(ggo.sector, parts)
+    parts.append(_str(ggo.tech_type))
+    parts.append(_str(ggo.fuel_type))
+
+    if ggo.next is not None:
+        if type(ggo.next) is not GGONext or type(ggo.next.addresses) is not list:
+            raise _Unrepresentable()
+        parts.append(_NEXT_HEADER.pack(_GGO_ACTION_CODES[ggo.next.action], len(ggo.next.addresses)))
+        parts.extend(_hex(address) for address in ggo.next.addresses)
+
+    if ggo.emissions is not None:
+        parts.append(_str(json.dumps(ggo.emissions, separators=(',', ':'), allow_nan=False)))
+
+    parts[0] = _GGO_HEADER.pack(GGO_V1, _int(ggo.amount), _seconds(ggo.begin), _seconds(ggo.end),
+        sector, (ggo.next is not None) | (ggo.emissions is not None) << 1)
+
+    return b''.join(parts)
+
+
+def _decode_ggo(data: bytes):
+    _, amount, begin, end, sector, flags = _GGO_HEADER.unpack_from(data)
+    origin, position = _read(data, _GGO_HEADER.size)
+
+    if sector:
+        sector = _code(SECTORS, sector)
+    else:
+        sector, position = _read(data, position)
+
+    tech_type, position = _read(data, position)
+    fuel_type, position = _read(data, position)
+
+    next = None
+    if flags & 1:
+        action, count = _NEXT_HEADER.unpack_from(data, position)
+        position += _NEXT_HEADER.size
+        addresses = []
+        for _ in range(count):
+            address, position = _read(data, position)
+            addresses.append(address)
+        next = GGONext(action=GGOAction[_code(GGO_ACTIONS, action)], addresses=addresses)
+
+    emissions = None
+    if flags & 2:
+        emissions, position = _read(data, position)
+        emissions = json.loads(emissions)
+
+    ggo = GGO(origin=origin, amount=amount, begin=_datetime(begin), end=_datetime(end), sector=sector,
+        tech_type=tech_type, fuel_type=fuel_type, next=next, emissions=emissions)
+
+    return ggo, position
+
+
+def _encode_measurement(measurement: Measurement) -> bytes:
+    parts = [b'']
+    sector = _sector(measurement.sector, parts)
+
+    parts[0] = _MEASUREMENT_HEADER.pack(MEASUREMENT_V1, _int(measurement.amount), _MEASUREMENT_TYPE_CODES[measurement.type],
+        _seconds(measurement.begin), _seconds(measurement.end), sector)
+
+    return b''.join(parts)
+
+
+def _decode_measurement(data: bytes):
+    _, amount, type, begin, end, sector = _MEASUREMENT_HEADER.unpack_from(data)
+    position = _MEASUREMENT_HEADER.size
+
+    if sector:
+        sector = _code(SECTORS, sector)
+    else:
+        sector, position = _read(data, position)
+
+    measurement = Measurement(amount=amount, type=MeasurementType[_code(MEASUREMENT_TYPES, type)],
+        begin=_datetime(begin), end=_datetime(end), sector=sector)
+
+    return measurement, position
+
+
+def _encode_settlement(settlement: Settlement) -> bytes:
+    if type(settlement.parts) is not list:
+        raise _Unrepresentable()
+
+    parts = [_SETTLEMENT_HEADER.pack(SETTLEMENT_V1, len(settlement.parts)), _hex(settlement.measurement)]
+
+    for part in settlement.parts:
+        if type(part) is not SettlementPart:
+            raise _Unrepresentable()
+        parts.append(_hex(part.ggo))
+        parts.append(_AMOUNT.pack(_int(part.amount)))
+
+    return b''.join(parts)
+
+
+def encode_settlement_part(ggo: str, amount: int):
+    """Returns the SETTLEMENT_V2 row of a part, or None when ggo is not a state address or amount is out of range."""
+    if type(ggo) is not str or len(ggo) != 70 or type(amount) is not int or not (ggo.islower() or ggo.isdigit()):
+        return None
+
+    try:
+        return SETTLEMENT_V2_PART.pack(bytes.fromhex(ggo), amount)
+    except (ValueError, struct.error):
+        return None
+
+
+def split_settlement(data: bytes):
+    """Returns the number of parts, the total, the measurement and the part table of a SETTLEMENT_V2 entry."""
+    _, count, total = SETTLEMENT_V2_HEADER.unpack_from(data)
+    measurement, position = _read(data, SETTLEMENT_V2_HEADER.size)
+    table = data[position:]
+
+    if len(table) != count * SETTLEMENT_V2_PART.size:
+        raise ValueError('Truncated part table')
+
+    return count, total, measurement, table
+
+
+def join_settlement(count: int, total: int, measurement: str, table: bytes) -> bytes:
+    """Builds a SETTLEMENT_V2 entry from a part table, the inverse of split_settlement. Raises struct.error when count or total is out of range."""
+    return SETTLEMENT_V2_HEADER.pack(SETTLEMENT_V2, count, total) + _hex(measurement) + table
+
+
+def _encode_settlement_v2(settlement: Settlement) -> bytes:
+    if type(settlement.parts) is not list:
+        raise _Unrepresentable()
+
+    rows = []
+    total = 0
+
+    for part in settlement.parts:
+        row = encode_settlement_part(part.ggo, part.amount) if type(part) is SettlementPart else None
+        if row is None:
+            raise _Unrepresentable()
+        rows.append(row)
+        total += part.amount
+
+    return join_settlement(len(rows), total, settlement.measurement, b''.join(sorted(rows)))
+
+
+def _decode_settlement_v2(data: bytes):
+    count, total, measurement, table = split_settlement(data)
+    parts = [SettlementPart(ggo=ggo.hex(), amount=amount) for ggo, amount in SETTLEMENT_V2_PART.iter_unpack(table)]
+
+    if sum(part.amount for part in parts) != total:
+        raise ValueError('Total does not match the parts')
+
+    return Settlement(measurement=measurement, parts=parts), len(data)
+
+
+def _decode_settlement(data: bytes):
+    _, count = _SETTLEMENT_HEADER.unpack_from(data)
+    measurement, position = _read(data, _SETTLEMENT_HEADER.size)
+
+    parts = []
+    for _ in range(count):
+        ggo, position = _read(data, position)
+        amount, = _AMOUNT.unpack_from(data, position)
+        position += _AMOUNT.size
+        parts.append(SettlementPart(ggo=ggo, amount=amount))
+
+    return Settlement(measurement=measurement, parts=parts), position
+
+
+_ENCODERS = {
+    GGO_V1: _encode_ggo,
+    MEASUREMENT_V1: _encode_measurement,
+    SETTLEMENT_V1: _encode_settlement,
+    SETTLEMENT_V2: _encode_settlement_v2,
+}
+
+_DECODERS = {
+    GGO_V1: _decode_ggo,
+    MEASUREMENT_V1: _decode_measurement,
+    SETTLEMENT_V1: _decode_settlement,
+    SETTLEMENT_V2: _decode_settlement_v2,
+}
+
+
+def encode_compact(obj):
+    """Returns the compact entry for obj, or None when the format cannot represent it exactly."""
+    for tag in TAGS.get(type(obj), ()):
+        try:
+            return _ENCODERS[tag](obj)
+        except (_Unrepresentable, struct.error, AttributeError, KeyError, TypeError, ValueError, OverflowError):
+            pass
+
+    return None
+
+
+def decode_compact(clazz: type, data: bytes):
+    """Decodes a compact entry, raises marshmallow's ValidationError if it is not a valid clazz."""
+    if not data or _TYPES.get(data[0]) is not clazz:
+        raise ValidationError(f'Not a compact {clazz.__name__} entry.')
+
+    try:
+        obj, position = _DECODERS[data[0]](data)
+        if position != len(data):
+            raise ValueError('Trailing data')
+    except (struct.error, KeyError, ValueError, OverflowError) as err:
+        raise ValidationError(f'Invalid compact {clazz.__name__} entry: {err!r}')
+
+    return obj
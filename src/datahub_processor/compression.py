@@ -0,0 +1,141 @@
+"""
+Compression of state entries with a preset zlib dictionary.
+
+A compressed entry is a marker byte 0xF0 | version followed by a raw deflate
+stream of the entry (JSON or compact), compressed with the dictionary of that
+version. The marker is never the first byte of a JSON or compact entry, so
+uncompressed entries decode as before.
+
+The dictionaries live in dictionaries/state-v<version>.zdict. A dictionary is
+part of the format: once shipped it must never change, a better one is added
+as a new version and becomes CURRENT_VERSION. Entries compressed with older
+versions remain readable as long as their dictionary is shipped.
+
+Validators must agree byte for byte on the state written by a transaction, so
+the level and window are fixed here. Deflate output is not specified by the
+format and may differ between zlib builds, so the zlib of the image must be
+pinned, and upgraded on all processors of a network at once. At startup
+check_compressor compresses a golden sample and compares it with the digest in
+GOLDEN_DIGESTS. A processor whose zlib produces other bytes does not register
+the compressed family versions, see warm_up.check_compression. compress still
+raises CompressorMismatch for an unchecked compressor, rather than write entries
+no other validator would write.
+"""
+import os
+import zlib
+import hashlib
+
+from marshmallow import ValidationError
+
+
+MARKER = 0xF0
+CURRENT_VERSION = 1
+
+# Entries shorter than this are not worth a deflate stream
+MIN_SIZE = 64
+
+# Sawtooth limits the size of state entries well below this
+MAX_SIZE = 1 << 22
+
+LEVEL = 6
+WBITS = -15
+MEMLEVEL = 8
+
+DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dictionaries')
+
+# SHA-256 of the golden sample of every dictionary version compressed by the reference zlib
+GOLDEN_DIGESTS = {
+    1: '622cdf85a6e70110fca197ef462ed6d25d7052de1c395bd72793c715a13a675d',
+}
+
+_dictionaries = {}
+_compressors = {}
+
+
+def dictionary_path(version: int) -> str:
+    return os.path.join(DIRECTORY, f'state-v{version}.zdict')
+
+
+def get_dictionary(version: int) -> bytes:
+    if version not in _dictionaries:
+        with open(dictionary_path(version), 'rb') as f:
+            _dictionaries[version] = f.read()
+    return _dictionaries[version]
+
+
+class CompressorMismatch(RuntimeError):
+    """Raised when the local zlib does not compress the golden sample to the reference bytes."""
+
+
+def golden_sample(version: int) -> bytes:
+    """
+    The last 4 KiB of the dictionary cut into 37 byte pieces in reverse order,
+    which deflate encodes as a mix of matches at many distances and literals.
+    """
+    dictionary = get_dictionary(version)
+    pieces = [dictionary[i:i + 37] for i in range(max(0, len(dictionary) - 4096), len(dictionary), 37)]
+    return b'|'.join(reversed(pieces))
+
+
+def _check_compressor(version: int, compressor):
+    sample = compressor.copy()
+    digest = hashlib.sha256(sample.compress(golden_sample(version)) + sample.flush()).hexdigest()
+
+    if digest != GOLDEN_DIGESTS.get(version):
+        raise CompressorMismatch(f'zlib {zlib.ZLIB_RUNTIME_VERSION} does not reproduce the golden sample of dictionary version {version}.')
+
+
+def _compressor(version: int):
+    """
+    Returns a fresh compressor for the dictionary version. Setting a dictionary
+    hashes all of it, so a primed compressor is kept per version and copied,
+    which produces the same output at a fraction of the cost. The primed
+    compressor is only kept once it has reproduced the golden sample.
+    """
+    if version not in _compressors:
+        compressor = zlib.compressobj(LEVEL, zlib.DEFLATED, WBITS, MEMLEVEL, zlib.Z_DEFAULT_STRATEGY, get_dictionary(version))
+        _check_compressor(version, compressor)
+        _compressors[version] = compressor
+    return _compressors[version].copy()
+
+
+def check_compressor(version: int = CURRENT_VERSION) -> bool:
+    """Returns whether the local zlib compresses the golden sample of the dictionary version to the reference bytes."""
+    try:
+        _compressor(version)
+    except CompressorMismatch:
+        return False
+    return True
+
+
+def is_compressed(data: bytes) -> bool:
+    return len(data) > 0 and data[0] & 0xF0 == MARKER
+
+
+def compress(data: bytes, version: int = CURRENT_VERSION) -> bytes:
+    """Returns the compressed entry, or data itself when it is short or does not get smaller."""
+    if len(data) < MIN_SIZE:
+        return data
+
+    compressor = _compressor(version)
+    compressed = bytes((MARKER | version,)) + compressor.compress(data) + compressor.flush()
+
+    return compressed if len(compressed) < len(data) else data
+
+
+def decompress(data: bytes) -> bytes:
+    """Decompresses a compressed entry, raises marshmallow's ValidationError if it is invalid."""
+    version = data[0] & 0x0F
+
+    try:
+        decompressor = zlib.decompressobj(WBITS, get_dictionary(version))
+        result = decompressor.decompress(data[1:], MAX_SIZE)
+    except FileNotFoundError:
+        raise ValidationError(f'Unknown compression dictionary version {version}.')
+    except zlib.error as err:
+        raise ValidationError(f'Invalid compressed entry: {err}')
+
+    if not decompressor.eof or decompressor.unused_data or decompressor.unconsumed_tail:
+        raise ValidationError('Invalid compressed entry: incomplete, too large or trailing data.')
+
+    return result
@@ -0,0 +1,41 @@
+"""
+The cost record GenericHandler attaches to the receipt of every accepted
+transaction with context.add_receipt_data, so tooling reading the receipts
+can find expensive transactions without profiling the processor.
+
+The record is COST.size bytes: the COST_V1 tag, the number of state
+addresses read and written, the bytes of state read and written and the
+CPU time spent applying the transaction in microseconds, little endian.
+Values too large for their field are stored as the largest it holds.
+
+The addresses and bytes read count the entries the handler read, whether they
+were prefetched or not, so they only depend on the transaction and the state.
+The CPU time is measured by the node applying the transaction and differs
+between nodes and runs, the receipts are diagnostics and not part of the
+state root the validators agree on.
+"""
+import struct
+from collections import namedtuple
+
+
+COST_V1 = 0xD1
+
+# tag, addresses read, addresses written, bytes read, bytes written, CPU microseconds
+COST = struct.Struct('<BIIIIQ')
+
+_LIMITS = (2**32 - 1,) * 4 + (2**64 - 1,)
+
+
+TransactionCost = namedtuple('TransactionCost', ['addresses_read', 'addresses_written', 'bytes_read', 'bytes_written', 'cpu_microseconds'])
+
+
+def encode_cost(cost: TransactionCost) -> bytes:
+    return COST.pack(COST_V1, *(min(max(value, 0), limit) for value, limit in zip(cost, _LIMITS)))
+
+
+def decode_cost(data: bytes) -> TransactionCost:
+    """Reads a cost record, raises ValueError if data is not one."""
+    if len(data) != COST.size or data[0] != COST_V1:
+        raise ValueError('Invalid cost record')
+
+    return TransactionCost(*COST.unpack(data)[1:])
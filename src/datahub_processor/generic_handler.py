@@ -1,23 +1,142 @@
-
+import os
+import abc
+import time
 
 from sawtooth_sdk.processor.handler import TransactionHandler
 from marshmallow import ValidationError
-from sawtooth_sdk.processor.exceptions import InvalidTransaction
-from marshmallow_dataclass import class_schema
+from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
 from json import JSONDecodeError
+from typing import Dict
 from .ledger_dto import GGO, Measurement
+from .schema_registry import get_schema
+from .state_codec import encode_state, decode_state
+from .state_context import CachedContext, stats
+from . import metrics, log
+from .profiling import profiler
+from .tracing import tracer
+from .cost import TransactionCost, encode_cost
 from sawtooth_signing import create_context
 from sawtooth_signing.secp256k1 import Secp256k1PublicKey as PublicKey
 
 class GenericHandler(TransactionHandler):
  
     TIMEOUT = 3
+    STATE_CHUNK_SIZE = 256
+
+    # Family versions whose transactions write state in the compact binary
+    # encoding, and those that also compress it with the shipped dictionary.
+    # All versions read every encoding, including the legacy JSON.
+    COMPACT_VERSIONS = ('0.2', '0.3', '0.4', '0.5')
+    COMPRESSED_VERSIONS = ('0.3', '0.4', '0.5')
+
+    # Family versions not registered with the validator, set at startup
+    # when the local zlib cannot write them, see warm_up.check_compression.
+    REFUSED_VERSIONS = ()
+
+    # Fetch the addresses declared in transaction.header.inputs with one
+    # get_state call before the handler runs, at most PREFETCH_MAX_ADDRESSES.
+    PREFETCH_INPUTS = os.getenv('LEDGER_PREFETCH_INPUTS', 'false').lower() == 'true'
+    PREFETCH_MAX_ADDRESSES = int(os.getenv('LEDGER_PREFETCH_MAX_ADDRESSES', '256'))
+
+    # Attach the cost of every accepted transaction to its receipt, see cost.py
+    COST_RECEIPTS = os.getenv('LEDGER_COST_RECEIPTS', 'true').lower() == 'true'
+    ADDRESS_LENGTH = 70
+
+    def apply(self, transaction, context):
+        if profiler.enabled:
+            return profiler.profile(self.family_name, self._apply_traced, transaction, context)
+        return self._apply_traced(transaction, context)
+
+    def _apply_traced(self, transaction, context):
+        with tracer.trace('apply', self.family_name, getattr(transaction, 'signature', None)):
+            self._apply_measured(transaction, context)
+
+    def _apply_measured(self, transaction, context):
+        state = CachedContext(context)
+        begin = time.perf_counter()
+        cpu_begin = time.thread_time()
+        outcome = metrics.INTERNAL_ERROR
+
+        try:
+            if self.PREFETCH_INPUTS:
+                self._prefetch_inputs(transaction, state)
+
+            self._apply(transaction, state)
+            self._flush(state)
+
+            if self.COST_RECEIPTS:
+                self._add_cost_receipt(context, state, time.thread_time() - cpu_begin)
+
+            outcome = metrics.ACCEPTED
+
+        except InvalidTransaction:
+            outcome = metrics.INVALID
+            raise
+
+        finally:
+            stats.add(state)
+            metrics.observe_transaction(self.family_name, time.perf_counter() - begin, outcome, state)
+
+        log.logger.debug('%s - round trips=%d saved=%d',
+            self.family_name, state.get_state_calls + state.set_state_calls, state.round_trips_saved)
+
+    def _registered(self, versions):
+        return [version for version in versions if version not in self.REFUSED_VERSIONS]
+
+    @abc.abstractmethod
+    def _apply(self, transaction, context):
+        """
+        The handler's business logic, called by apply with a context that caches
+        reads and buffers writes for the duration of the transaction.
+        """
+
+    def _prefetch_inputs(self, transaction, state: CachedContext):
+        try:
+            # Inputs may also be namespace prefixes, only full addresses can be fetched
+            addresses = [a for a in transaction.header.inputs if len(a) == self.ADDRESS_LENGTH]
+            state.prefetch(addresses[:self.PREFETCH_MAX_ADDRESSES])
+
+        except (InvalidTransaction, InternalError):
+            raise
+
+        except Exception:
+            log.failed(self.family_name)
+            raise InternalError('An unknown error has occured.')
+
+    def _flush(self, state: CachedContext):
+        try:
+            state.flush(self.TIMEOUT)
+
+        except (InvalidTransaction, InternalError):
+            raise
+
+        except Exception:
+            log.failed(self.family_name)
+            raise InternalError('An unknown error has occured.')
+
+    def _add_cost_receipt(self, context, state: CachedContext, cpu_seconds: float):
+        cost = TransactionCost(
+            addresses_read=state.addresses_used,
+            addresses_written=len(state.write_sizes),
+            bytes_read=state.bytes_used,
+            bytes_written=state.bytes_written,
+            cpu_microseconds=int(cpu_seconds * 1000000))
+
+        try:
+            context.add_receipt_data(encode_cost(cost), self.TIMEOUT)
+
+        except (InvalidTransaction, InternalError):
+            raise
+
+        except Exception:
+            log.failed(self.family_name)
+            raise InternalError('An unknown error has occured.')
 
     def _map_request(self, clazz: type, payload: bytes):
         try:
-            data = payload.decode('utf8')
-            schema = class_schema(clazz)
-            return schema().loads(json_data=data)
+            with tracer.span('map_request', type=clazz.__name__):
+                data = payload.decode('utf8')
+                return get_schema(clazz).loads(json_data=data)
 
         except ValidationError as err:
             raise InvalidTransaction(str(err))
@@ -29,12 +148,29 @@ class GenericHandler(TransactionHandler):
     def _addresses_not_empty(self, context, addresses):
         return len(context.get_state(addresses)) != 0
 
+    def _get_states(self, context, addresses) -> Dict[str, bytes]:
+        """
+        Fetches the addresses with as few get_state round trips as possible,
+        splitting very long lists into chunks, and indexes the entries by address.
+        """
+        addresses = list(dict.fromkeys(addresses))
+        states = {}
+
+        for i in range(0, len(addresses), self.STATE_CHUNK_SIZE):
+            for entry in context.get_state(addresses[i:i + self.STATE_CHUNK_SIZE]):
+                states[entry.address] = entry.data
+
+        return states
+
     def _try_get_type(self, clazz: type, context, address):
-        try:    
-            states = context.get_state([address])
-            for entry in states:     
-                if entry.address == address:
-                    return clazz.get_schema().loads(entry.data.decode('utf8'))
+        return self._try_decode_type(clazz, self._get_states(context, [address]), address)
+
+    def _try_decode_type(self, clazz: type, states: Dict[str, bytes], address):
+        try:
+            data = states.get(address)
+            if data is not None:
+                with tracer.span('decode_state', type=clazz.__name__, bytes=len(data)):
+                    return self._decode_state(clazz, data)
 
         except JSONDecodeError:
             pass
@@ -43,8 +179,20 @@ class GenericHandler(TransactionHandler):
 
         return None
 
+    def _decode_state(self, clazz: type, data: bytes):
+        return decode_state(clazz, data)
+
+    def _encode_state(self, obj, transaction) -> bytes:
+        """Encodes obj as the family version of the transaction writes it, see COMPACT_VERSIONS and COMPRESSED_VERSIONS."""
+        version = transaction.header.family_version
+        with tracer.span('encode_state', type=type(obj).__name__):
+            return encode_state(obj, version in self.COMPACT_VERSIONS, version in self.COMPRESSED_VERSIONS)
+
     def _get_type(self, clazz: type, context, address):
-        val = self._try_get_type(clazz, context, address)
+        return self._decode_type(clazz, self._get_states(context, [address]), address)
+
+    def _decode_type(self, clazz: type, states: Dict[str, bytes], address):
+        val = self._try_decode_type(clazz, states, address)
         if val:
             return val
         else:
@@ -1,12 +1,13 @@
 import os
-import hashlib
 import traceback
-import logging
 
 from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
 
 from .generic_handler import GenericHandler
-from .ledger_dto import GGO, IssueGGORequest, MeasurementType
+from . import log
+from .trusted_issuers import trusted_issuers, ISSUER_VERSIONS
+from .namespaces import GGO_NAMESPACE
+from .ledger_dto import GGO, IssueGGORequest, Measurement, MeasurementType
 
 
 class IssueGGOTransactionHandler(GenericHandler):
@@ -17,28 +18,32 @@ class IssueGGOTransactionHandler(GenericHandler):
 
     @property
     def family_versions(self):
-        return ['0.1']
+        return self._registered(['0.1', '0.2', '0.3', '0.4', '0.5'])
 
     @property
     def namespaces(self):
-        ggo_namespace = hashlib.sha512('GGO'.encode('utf-8')).hexdigest()[0:6]
-        return [ggo_namespace]
+        return [GGO_NAMESPACE]
 
 
-    def apply(self, transaction, context):
+    def _apply(self, transaction, context):
 
         try:
-            self.validate_transaction(transaction)
-            
             request: IssueGGORequest = self._map_request(IssueGGORequest, transaction.payload)
-            measurement = self._get_measurement(context, request.origin)
 
-            if self._addresses_not_empty(context, [request.destination]):
-                raise InvalidTransaction("GGO already issued!")
+            # The trusted issuers setting is read along with the measurement
+            checked = transaction.header.family_version in ISSUER_VERSIONS
+            states = self._get_states(context, [request.origin] + (trusted_issuers.addresses if checked else []))
+
+            self.validate_transaction(transaction, states)
+
+            measurement = self._decode_type(Measurement, states, request.origin)
 
             if measurement.type != MeasurementType.PRODUCTION:
                 raise InvalidTransaction("Measurement is not of type Production!")
 
+            if self._addresses_not_empty(context, [request.destination]):
+                raise InvalidTransaction("GGO already issued!")
+
             new_ggo = GGO(
                 origin=request.origin,
                 amount=measurement.amount,
@@ -50,23 +55,22 @@ class IssueGGOTransactionHandler(GenericHandler):
                 emissions=request.emissions,
             )
 
-            payload = GGO.get_schema().dumps(new_ggo).encode('utf8')
+            payload = self._encode_state(new_ggo, transaction)
 
             context.set_state(
                 {request.destination: payload}, 
                 self.TIMEOUT)
 
-            logging.info(f'IssueGGOTransactionHandler - origin={ request.origin } destination={ request.destination }')
+            log.accepted(self.family_name, origin=request.origin, destination=request.destination)
             
         except InvalidTransaction as ex:
-            logging.exception('IssueGGOTransactionHandler - InvalidException')
+            log.rejected(self.family_name, ex)
             raise
             
         except Exception as ex:
-            logging.exception('IssueGGOTransactionHandler - Exception')
+            log.failed(self.family_name)
             raise InternalError('An unknown error has occured.')
 
-    def validate_transaction(self, transaction):
-        # TODO: validate signer is energinet!!!
-        # raise InvalidTransaction('Not valid Guarantee of origin issuer!')
-        pass
+    def validate_transaction(self, transaction, states):
+        if transaction.header.family_version in ISSUER_VERSIONS and not trusted_issuers.is_trusted(transaction.header.signer_public_key, states):
+            raise InvalidTransaction('Not valid Guarantee of origin issuer!')
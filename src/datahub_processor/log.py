@@ -0,0 +1,161 @@
+import os
+import re
+import sys
+import time
+import queue
+import logging
+import threading
+import logging.handlers
+
+
+logger = logging.getLogger('datahub_processor')
+
+# The SDK's processor logs a warning for every invalid transaction, see RejectionFilter
+SDK_LOGGER = 'sawtooth_sdk.processor.core'
+
+FORMAT = '[%(asctime)s %(levelname)s %(name)s] %(message)s'
+
+# Rejections are expected under spam or replay, by default they are logged
+# without a stack trace and at most once per reason every interval seconds.
+INVALID_TRACEBACKS = os.getenv('LEDGER_LOG_INVALID_TRACEBACKS', 'false').lower() == 'true'
+REJECTION_INTERVAL = float(os.getenv('LEDGER_LOG_REJECTION_INTERVAL', '10'))
+
+_ADDRESS = re.compile(r'[0-9a-fA-F]{16,}')
+
+
+class Fields:
+    """The key=value fields of a record, only formatted if the record is emitted."""
+
+    __slots__ = ('fields',)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return ' '.join(f'{key}={value}' for key, value in self.fields.items())
+
+
+class RejectionSampler:
+    """
+    Lets the first rejection of each reason through per interval and counts
+    the ones suppressed in between. Addresses and other long hex strings are
+    masked, so rejections that only differ by address share a reason.
+    """
+
+    MAX_REASONS = 1024
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._reasons = {}
+
+    def sample(self, event: str, reason: str):
+        """Returns the number of rejections suppressed since the last one logged, or None to suppress this one."""
+        if self.interval <= 0:
+            return 0
+
+        key = (event, _ADDRESS.sub('*', reason))
+        now = time.monotonic()
+
+        with self._lock:
+            logged_at, suppressed = self._reasons.get(key, (None, 0))
+
+            if logged_at is not None and now - logged_at < self.interval:
+                self._reasons[key] = (logged_at, suppressed + 1)
+                return None
+
+            if len(self._reasons) >= self.MAX_REASONS:
+                self._reasons.clear()
+
+            self._reasons[key] = (now, 0)
+            return suppressed
+
+
+sampler = RejectionSampler(REJECTION_INTERVAL)
+
+
+class RejectionFilter(logging.Filter):
+    """
+    Samples the SDK's warning for every invalid transaction per reason, as
+    rejected() does for the handlers. Other records pass unchanged.
+    """
+
+    MESSAGE = 'Invalid Transaction %s'
+
+    def filter(self, record):
+        if record.msg != self.MESSAGE or len(record.args) != 1:
+            return True
+
+        suppressed = sampler.sample(record.name, str(record.args[0]))
+        if suppressed is None:
+            return False
+
+        record.msg = self.MESSAGE + ' (%d similar suppressed)'
+        record.args = (record.args[0], suppressed)
+        return True
+
+
+rejection_filter = RejectionFilter()
+
+
+def accepted(event: str, **fields):
+    """Logs an applied transaction at INFO."""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info('%s - %s', event, Fields(fields), extra={'fields': fields})
+
+
+def rejected(event: str, error: Exception):
+    """Logs an InvalidTransaction, sampled per reason and with a stack trace only if LEDGER_LOG_INVALID_TRACEBACKS is set."""
+    if not logger.isEnabledFor(logging.ERROR):
+        return
+
+    suppressed = sampler.sample(event, str(error))
+    if suppressed is None:
+        return
+
+    logger.error('%s - InvalidTransaction: %s (%d similar suppressed)', event, error, suppressed,
+        exc_info=error if INVALID_TRACEBACKS else None,
+        extra={'fields': {'reason': str(error), 'suppressed': suppressed}})
+
+
+def failed(event: str):
+    """Logs an unexpected exception with its stack trace, call from an except block."""
+    logger.exception('%s - Exception', event)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on the queue as they are. QueueHandler.prepare() would format
+    the message and stack trace on the calling thread, the listener's handlers
+    format them instead.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def configure(level='INFO', stream=None) -> logging.handlers.QueueListener:
+    """
+    Routes all logging through an unbounded queue to a stream handler on a
+    background thread, so formatting and I/O stay off the thread applying
+    transactions. Stop the returned listener to flush the queue on exit.
+
+    The SDK's warnings for invalid transactions are sampled by RejectionFilter.
+
+    Threads do not survive a fork, a forked worker must call configure again.
+    """
+    records = queue.Queue()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter(FORMAT))
+
+    listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers = [_QueueHandler(records)]
+    root.setLevel(level)
+
+    logging.getLogger(SDK_LOGGER).addFilter(rejection_filter)
+
+    listener.start()
+    return listener
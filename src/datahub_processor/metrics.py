@@ -0,0 +1,334 @@
+import abc
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+from .state_context import stats
+from .signer_addresses import signer_addresses
+from .log import logger
+
+
+ACCEPTED = 'accepted'
+INVALID = 'invalid'
+INTERNAL_ERROR = 'internal_error'
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536, 262144, 1048576)
+
+
+class Metric(abc.ABC):
+    """A metric family with a fixed set of label names, exposed in the Prometheus text format."""
+
+    type = None
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """
+        The (sample name, labels, value) of every series, in the order rendered.
+        """
+
+    def render(self) -> str:
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+
+        for name, labels, value in self.samples():
+            if labels:
+                label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+                lines.append(f'{name}{{{label_text}}} {_number(value)}')
+            else:
+                lines.append(f'{name} {_number(value)}')
+
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+
+        return [(self.name, dict(zip(self.labels, key)), value) for key, value in values]
+
+
+class Gauge(Metric):
+
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[tuple, float] = {}
+
+    def set(self, value: float, labels: tuple = ()):
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, labels: tuple = ()) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+
+        return [(self.name, dict(zip(self.labels, key)), value) for key, value in values]
+
+
+class Histogram(Metric):
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, labels: tuple = ()):
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # One count per bucket and +Inf, followed by the sum
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def count(self, labels: tuple = ()) -> int:
+        with self._lock:
+            return sum(self._values.get(labels, [0])[:-1])
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self._values.items())
+
+        result = []
+
+        for key, counts in values:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                result.append((f'{self.name}_bucket', {**labels, 'le': _number(bound)}, cumulative))
+
+            result.append((f'{self.name}_sum', labels, counts[-1]))
+            result.append((f'{self.name}_count', labels, cumulative))
+
+        return result
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Adds a callable returning metrics built when the registry is rendered."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        metrics = list(self._metrics)
+        for collector in self._collectors:
+            metrics.extend(collector())
+
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+registry = Registry()
+
+apply_seconds = registry.register(Histogram(
+    'datahub_processor_apply_seconds',
+    'Time spent applying a transaction.',
+    ('family',)))
+
+transactions = registry.register(Counter(
+    'datahub_processor_transactions_total',
+    'Transactions applied by outcome: accepted, invalid or internal_error.',
+    ('family', 'outcome')))
+
+get_state_calls = registry.register(Counter(
+    'datahub_processor_get_state_calls_total',
+    'get_state round trips to the validator.',
+    ('family',)))
+
+set_state_calls = registry.register(Counter(
+    'datahub_processor_set_state_calls_total',
+    'set_state round trips to the validator.',
+    ('family',)))
+
+state_read_bytes = registry.register(Counter(
+    'datahub_processor_state_read_bytes_total',
+    'Bytes of state read from the validator.',
+    ('family',)))
+
+state_written_bytes = registry.register(Counter(
+    'datahub_processor_state_written_bytes_total',
+    'Bytes of state written to the validator.',
+    ('family',)))
+
+state_entry_bytes = registry.register(Histogram(
+    'datahub_processor_state_entry_bytes',
+    'Size of the state entries read and written.',
+    ('family', 'operation'),
+    SIZE_BUCKETS))
+
+
+startup_seconds = registry.register(Gauge(
+    'datahub_processor_startup_seconds',
+    'Seconds spent per startup phase: import, warm_up, and first_transaction from process start until a transaction was applied.',
+    ('phase',)))
+
+
+class Startup:
+    """Times the startup phases, main.py sets started_at to the monotonic time before its imports."""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.first_transaction = False
+
+    def phase(self, name: str, seconds: float):
+        startup_seconds.set(seconds, (name,))
+        logger.info('Startup phase %s took %.3f seconds', name, seconds)
+
+    def transaction_applied(self):
+        if not self.first_transaction:
+            self.first_transaction = True
+            self.phase('first_transaction', time.monotonic() - self.started_at)
+
+
+startup = Startup()
+
+
+STATE_ACCESS_DOCUMENTATION = {
+    'transactions': 'Transactions applied through a CachedContext.',
+    'get_state_calls': 'get_state round trips made by CachedContext.',
+    'set_state_calls': 'set_state round trips made by CachedContext.',
+    'reads_saved': 'get_state round trips saved by the CachedContext read cache.',
+    'writes_saved': 'set_state round trips saved by coalescing writes.',
+}
+
+
+def _state_access_metrics():
+    result = []
+
+    for key, value in stats.snapshot().items():
+        counter = Counter(f'datahub_processor_cached_context_{key}_total', STATE_ACCESS_DOCUMENTATION[key])
+        counter.inc(amount=value)
+        result.append(counter)
+
+    return result
+
+
+registry.add_collector(_state_access_metrics)
+
+
+SIGNER_CACHE_DOCUMENTATION = {
+    'hits': ('counter', 'Signer addresses served from the signer address cache.'),
+    'misses': ('counter', 'Signer addresses derived because they were not in the signer address cache.'),
+    'size': ('gauge', 'Signer addresses held by the signer address cache.'),
+}
+
+
+def _signer_cache_metrics():
+    result = []
+
+    for key, value in signer_addresses.snapshot().items():
+        kind, documentation = SIGNER_CACHE_DOCUMENTATION[key]
+        if kind == 'counter':
+            metric = Counter(f'datahub_processor_signer_cache_{key}_total', documentation)
+            metric.inc(amount=value)
+        else:
+            metric = Gauge(f'datahub_processor_signer_cache_{key}', documentation)
+            metric.set(value)
+        result.append(metric)
+
+    return result
+
+
+registry.add_collector(_signer_cache_metrics)
+
+
+def observe_transaction(family: str, duration: float, outcome: str, state):
+    """Records one applied transaction, state is the CachedContext it was applied with."""
+    labels = (family,)
+
+    startup.transaction_applied()
+    apply_seconds.observe(duration, labels)
+    transactions.inc((family, outcome))
+    get_state_calls.inc(labels, state.get_state_calls)
+    set_state_calls.inc(labels, state.set_state_calls)
+    state_read_bytes.inc(labels, sum(state.read_sizes))
+    state_written_bytes.inc(labels, sum(state.write_sizes))
+
+    for size in state.read_sizes:
+        state_entry_bytes.observe(size, (family, 'read'))
+    for size in state.write_sizes:
+        state_entry_bytes.observe(size, (family, 'write'))
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        body = registry.render().encode('utf8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """Serves the registry on http://host:port/metrics from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    server.daemon_threads = True
+
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+
+    return server
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,8 @@
+# Namespace prefixes of the state addresses, the first 6 hex characters of
+# sha512 of the name, e.g. hashlib.sha512('GGO'.encode('utf-8')).hexdigest()[0:6]
+GGO_NAMESPACE = '849c0b'
+MEASUREMENT_NAMESPACE = '5a9839'
+SETTLEMENT_NAMESPACE = 'ba4817'
+
+# Pages and member entries of paged settlements, see settlement_pages.py
+SETTLEMENT_PAGE_NAMESPACE = 'fe817d'
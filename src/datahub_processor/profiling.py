@@ -0,0 +1,140 @@
+"""
+Deterministic profiling of the handlers, for finding where apply time goes
+on a running node without redeploying it.
+
+While enabled, GenericHandler.apply runs under a cProfile.Profile per
+transaction family and the aggregated stats are written every interval
+seconds to <directory>/<family>-<pid>.pstats, and once more when profiling is
+disabled. Read them with python -m pstats or snakeviz.
+
+Profiling is enabled at startup with LEDGER_PROFILE=true and toggled at
+runtime by sending the process SIGUSR2, see install_signal_handler. When
+disabled, apply only checks profiler.enabled.
+"""
+import os
+import time
+import signal
+import cProfile
+import threading
+from typing import Dict
+
+from .log import logger
+
+
+class HandlerProfiler:
+
+    def __init__(self, directory: str, interval: float, enabled: bool = False):
+        self.directory = directory
+        self.interval = interval
+        self.enabled = False
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._dumped_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        # Each family is reset under its lock, as a call may be in flight
+        with self._lock:
+            families = list(self._locks)
+
+        for family in families:
+            with self._family_lock(family):
+                self._profiles.pop(family, None)
+                self._dumped_at.pop(family, None)
+
+        self.enabled = True
+
+        logger.info('Profiling handlers, writing stats to %s every %s seconds', self.directory, self.interval)
+
+    def disable(self):
+        self.enabled = False
+        self.dump()
+        logger.info('Stopped profiling handlers')
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def profile(self, family: str, function, *args):
+        """
+        Calls function(*args) under the profile of the family. A profile is
+        only active in one thread at a time, concurrent calls of the same
+        family run unprofiled. So do calls for which no profiler can be
+        started: from Python 3.12 only one profiler is active per process,
+        and enabling another one raises ValueError.
+        """
+        lock = self._family_lock(family)
+
+        if not lock.acquire(blocking=False):
+            return function(*args)
+
+        try:
+            profile = self._profiles.get(family)
+            if profile is None:
+                profile = self._profiles[family] = cProfile.Profile()
+                self._dumped_at[family] = time.monotonic()
+
+            try:
+                profile.enable()
+            except ValueError:
+                return function(*args)
+
+            try:
+                return function(*args)
+            finally:
+                profile.disable()
+
+                if time.monotonic() - self._dumped_at[family] >= self.interval:
+                    self._dump(family, profile)
+
+        finally:
+            lock.release()
+
+    def dump(self):
+        """Writes the stats of every family profiled so far."""
+        for family in list(self._profiles):
+            with self._family_lock(family):
+                profile = self._profiles.get(family)
+                if profile is not None:
+                    self._dump(family, profile)
+
+    def path(self, family: str) -> str:
+        return os.path.join(self.directory, f'{family}-{os.getpid()}.pstats')
+
+    def _family_lock(self, family: str) -> threading.Lock:
+        lock = self._locks.get(family)
+        if lock is None:
+            with self._lock:
+                lock = self._locks.setdefault(family, threading.Lock())
+        return lock
+
+    def _dump(self, family: str, profile: cProfile.Profile):
+        self._dumped_at[family] = time.monotonic()
+        path = self.path(family)
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(path + '.tmp')
+            os.replace(path + '.tmp', path)
+        except OSError:
+            logger.exception('Could not write the profile of %s to %s', family, path)
+
+
+profiler = HandlerProfiler(
+    os.getenv('LEDGER_PROFILE_DIR', '/tmp/datahub-processor-profiles'),
+    float(os.getenv('LEDGER_PROFILE_INTERVAL', '60')),
+    os.getenv('LEDGER_PROFILE', 'false').lower() == 'true')
+
+
+def install_signal_handler(signum: int = signal.SIGUSR2):
+    """
+    Toggles profiling when the process receives signum, must be called from
+    the main thread. The toggle runs in its own thread, as writing the stats
+    waits for the transactions being profiled.
+    """
+    signal.signal(signum, lambda signum, frame: threading.Thread(target=profiler.toggle, name='profiler-toggle', daemon=True).start())
@@ -1,12 +1,12 @@
 import os
-import hashlib
 import traceback
-import logging
 
 from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
-from marshmallow_dataclass import class_schema
 
 from .generic_handler import GenericHandler
+from . import log
+from .trusted_issuers import trusted_issuers, ISSUER_VERSIONS
+from .namespaces import MEASUREMENT_NAMESPACE
 from .ledger_dto import Measurement, PublishMeasurementRequest
 
 
@@ -18,25 +18,29 @@ class PublishMeasurementTransactionHandler(GenericHandler):
 
     @property
     def family_versions(self):
-        return ['0.1']
+        return self._registered(['0.1', '0.2', '0.3', '0.4', '0.5'])
 
     @property
     def namespaces(self):
-        measurement_namespace = hashlib.sha512('MEASUREMENT'.encode('utf-8')).hexdigest()[0:6]
-        return [measurement_namespace]
+        return [MEASUREMENT_NAMESPACE]
 
 
-    def apply(self, transaction, context):
+    def _apply(self, transaction, context):
 
         try:
-            self.validate_transaction(transaction)
+            request = self._map_request(PublishMeasurementRequest, transaction.payload)
 
             address = transaction.header.outputs[0]
 
-            if self._addresses_not_empty(context, [address]):
+            # The trusted issuers setting is read along with the address
+            checked = transaction.header.family_version in ISSUER_VERSIONS
+            states = self._get_states(context, [address] + (trusted_issuers.addresses if checked else []))
+
+            self.validate_transaction(transaction, states)
+
+            if address in states:
                 raise InvalidTransaction(f'Address already in use "{address}"!')
 
-            request = self._map_request(PublishMeasurementRequest, transaction.payload)
             measurement = Measurement(
                     amount=request.amount,
                     type=request.type,
@@ -45,23 +49,22 @@ class PublishMeasurementTransactionHandler(GenericHandler):
                     sector=request.sector
                 )
 
-            payload = Measurement.get_schema().dumps(measurement).encode('utf8')
+            payload = self._encode_state(measurement, transaction)
 
             context.set_state(
                 {address: payload}, 
                 self.TIMEOUT)
 
-            logging.info(f'PublishMeasurement - address={ address }')
+            log.accepted(self.family_name, address=address)
             
         except InvalidTransaction as ex:
-            logging.exception('InvalidException')
+            log.rejected(self.family_name, ex)
             raise
             
         except Exception as ex:
-            logging.exception('Exception')
+            log.failed(self.family_name)
             raise InternalError('An unknown error has occured.')
 
-    def validate_transaction(self, transaction):
-        # TODO: validate signer is energinet!!!
-        # raise InvalidTransaction('Not valid Guarantee of origin issuer!')
-        pass
+    def validate_transaction(self, transaction, states):
+        if transaction.header.family_version in ISSUER_VERSIONS and not trusted_issuers.is_trusted(transaction.header.signer_public_key, states):
+            raise InvalidTransaction('Not valid Guarantee of origin issuer!')
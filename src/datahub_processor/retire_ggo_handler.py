@@ -1,12 +1,13 @@
 import os
-import hashlib
 import traceback
-import logging
 
 from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
 
 from .generic_handler import GenericHandler
-from .ledger_dto import GGO, GGONext, GGOAction, Settlement, SettlementPart, MeasurementType, generate_address, AddressPrefix
+from . import log
+from .signer_addresses import signer_address
+from .namespaces import GGO_NAMESPACE
+from .ledger_dto import GGO, GGONext, GGOAction, Settlement, SettlementPart, MeasurementType, AddressPrefix
 from .ledger_dto import RetireGGORequest
 
 
@@ -18,35 +19,33 @@ class RetireGGOTransactionHandler(GenericHandler):
 
     @property
     def family_versions(self):
-        return ['0.1']
+        return self._registered(['0.1', '0.2', '0.3', '0.4'])
 
     @property
     def namespaces(self):
-        ggo_namespace = hashlib.sha512('GGO'.encode('utf-8')).hexdigest()[0:6]
-        return [ggo_namespace]
+        return [GGO_NAMESPACE]
 
 
-    def apply(self, transaction, context):
+    def _apply(self, transaction, context):
 
         try:
             request: RetireGGORequest = self._map_request(RetireGGORequest, transaction.payload)
 
+            generated_address = signer_address(AddressPrefix.GGO, transaction.header.signer_public_key)
+            if generated_address != request.origin:
+                 raise InvalidTransaction('Invalid key for GGO')
+
             current_ggo = self._get_ggo(context, request.origin)
 
             if current_ggo.next != None:
                 raise InvalidTransaction('GGO already has been used')
 
-            public_key_bytes = bytearray.fromhex(transaction.header.signer_public_key)
-            generated_address = generate_address(AddressPrefix.GGO, public_key_bytes)
-            if generated_address != request.origin:
-                 raise InvalidTransaction('Invalid key for GGO')
-
             current_ggo.next = GGONext(
                 action=GGOAction.RETIRE,
                 addresses=[request.settlement_address]
             )
 
-            payload_current = GGO.get_schema().dumps(current_ggo).encode('utf8')
+            payload_current = self._encode_state(current_ggo, transaction)
 
             context.set_state(
                 {
@@ -54,12 +53,12 @@ class RetireGGOTransactionHandler(GenericHandler):
                 }, 
                 self.TIMEOUT)
 
-            logging.info(f'IssueGGO - origin={ request.origin } settlement={ request.settlement_address }')
+            log.accepted(self.family_name, origin=request.origin, settlement=request.settlement_address)
             
         except InvalidTransaction as ex:
-            logging.exception('InvalidException')
+            log.rejected(self.family_name, ex)
             raise
             
         except Exception as ex:
-            logging.exception('Exception')
+            log.failed(self.family_name)
             raise InternalError('An unknown error has occured.')
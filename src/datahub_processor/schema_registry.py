@@ -0,0 +1,50 @@
+from marshmallow_dataclass import class_schema
+
+from .ledger_dto import GGO, Measurement, Settlement
+from .ledger_dto import PublishMeasurementRequest, IssueGGORequest, TransferGGORequest, SplitGGORequest, RetireGGORequest, SettlementRequest
+
+
+REQUEST_TYPES = (
+    PublishMeasurementRequest,
+    IssueGGORequest,
+    TransferGGORequest,
+    SplitGGORequest,
+    RetireGGORequest,
+    SettlementRequest,
+)
+
+STATE_TYPES = (
+    GGO,
+    Measurement,
+    Settlement,
+)
+
+_schemas = {}
+
+
+def get_schema(clazz: type):
+    """
+    Returns the process-wide schema instance for the given dataclass.
+
+    Schemas are built once and shared by all handlers, marshmallow schema
+    instances keep no state between loads/dumps so they are safe to reuse.
+    """
+    schema = _schemas.get(clazz)
+
+    if schema is None:
+        if clazz in STATE_TYPES:
+            schema = clazz.get_schema()
+        else:
+            schema = class_schema(clazz)()
+
+        _schemas[clazz] = schema
+
+    return schema
+
+
+def build_schemas():
+    for clazz in REQUEST_TYPES + STATE_TYPES:
+        get_schema(clazz)
+
+
+build_schemas()
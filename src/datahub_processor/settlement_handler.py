@@ -1,52 +1,76 @@
 import os
-import hashlib
 import traceback
-import logging
 
 from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
 
 from .generic_handler import GenericHandler
-from .ledger_dto import GGO, GGONext, GGOAction, Settlement, SettlementPart, MeasurementType, generate_address, AddressPrefix
+from . import log
+from .signer_addresses import signer_address
+from .tracing import tracer
+from .namespaces import GGO_NAMESPACE, SETTLEMENT_NAMESPACE, MEASUREMENT_NAMESPACE, SETTLEMENT_PAGE_NAMESPACE
+from .ledger_dto import GGO, GGONext, GGOAction, Measurement, Settlement, SettlementPart, MeasurementType, AddressPrefix
 from .ledger_dto import SettlementRequest
+from .settlement_record import SettlementRecord
+from .settlement_pages import PagedSettlement, is_paged, member_address
 
 
 class SettlementHandler(GenericHandler):
 
+    # Family versions that store the settlements they create paged and can
+    # extend paged settlements, see settlement_pages.py
+    PAGED_VERSIONS = ('0.4',)
+
     @property
     def family_name(self):
         return SettlementRequest.__name__
 
     @property
     def family_versions(self):
-        return ['0.1']
+        return self._registered(['0.1', '0.2', '0.3', '0.4'])
 
     @property
     def namespaces(self):
-        ggo_namespace = hashlib.sha512('GGO'.encode('utf-8')).hexdigest()[0:6]
-        settlement_namespace = hashlib.sha512('SETTLEMENT'.encode('utf-8')).hexdigest()[0:6]
-        measurement_namespace = hashlib.sha512('MEASUREMENT'.encode('utf-8')).hexdigest()[0:6]
-
-        return [ggo_namespace, settlement_namespace, measurement_namespace]
+        return [GGO_NAMESPACE, SETTLEMENT_NAMESPACE, MEASUREMENT_NAMESPACE, SETTLEMENT_PAGE_NAMESPACE]
 
 
-    def apply(self, transaction, context):
+    def _apply(self, transaction, context):
 
         try:
             request: SettlementRequest = self._map_request(SettlementRequest, transaction.payload)
 
-            measurement = self._get_measurement(context, request.measurement_address)
-            settlement: Settlement = self._try_get_type(Settlement, context, request.settlement_address)
+            if len(set(request.ggo_addresses)) != len(request.ggo_addresses):
+                raise InvalidTransaction('GGO already part of settlement')
+
+            # A signer owning neither the settlement nor the measurement is
+            # rejected by the checks below whatever the settlement holds, so
+            # the GGOs are only read for a signer that owns one of them.
+            signer_owns = signer_address(AddressPrefix.SETTLEMENT, transaction.header.signer_public_key) == request.settlement_address \
+                or signer_address(AddressPrefix.MEASUREMENT, transaction.header.signer_public_key) == request.measurement_address
+
+            paged = transaction.header.family_version in self.PAGED_VERSIONS
+            members = [member_address(request.settlement_address, ggo_address) for ggo_address in request.ggo_addresses] if signer_owns else []
+            ggo_addresses = request.ggo_addresses if signer_owns else []
 
-            public_key_bytes = bytearray.fromhex(transaction.header.signer_public_key)
+            states = self._get_states(context, [request.measurement_address, request.settlement_address] + ggo_addresses + (members if paged else []))
+
+            measurement: Measurement = self._decode_type(Measurement, states, request.measurement_address)
+
+            if is_paged(states.get(request.settlement_address)):
+                settlement = PagedSettlement.decode(request.settlement_address, states[request.settlement_address], states)
+            else:
+                settlement: SettlementRecord = self._try_decode_type(SettlementRecord, states, request.settlement_address)
 
             if settlement != None:
                 if settlement.measurement != request.measurement_address:
                     raise InvalidTransaction('Measurement does not equal settlement measurement')
 
-                generated_address = generate_address(AddressPrefix.SETTLEMENT, public_key_bytes)
+                generated_address = signer_address(AddressPrefix.SETTLEMENT, transaction.header.signer_public_key)
                 if generated_address != request.settlement_address:
                     raise InvalidTransaction('Invalid key for settlement')
 
+                if isinstance(settlement, PagedSettlement) and not paged:
+                    raise InvalidTransaction(f'Settlement is paged, it can only be extended by family version {", ".join(self.PAGED_VERSIONS)}')
+
             else:
                 if request.measurement_address[6:-8] != request.settlement_address[6:-8]:
                     raise InvalidTransaction('Not correct settlement address for measurement')
@@ -54,20 +78,20 @@ class SettlementHandler(GenericHandler):
                 if measurement.type != MeasurementType.CONSUMPTION:
                     raise InvalidTransaction('Measurment is not of type consumption')
 
-                generated_address = generate_address(AddressPrefix.MEASUREMENT, public_key_bytes)
+                generated_address = signer_address(AddressPrefix.MEASUREMENT, transaction.header.signer_public_key)
                 if generated_address != request.measurement_address:
                     raise InvalidTransaction('Invalid key for measurement')
 
-                settlement = Settlement(
-                    measurement=request.measurement_address,
-                    parts=[]
-                )
+                if paged:
+                    settlement = PagedSettlement(request.settlement_address, request.measurement_address, states=states)
+                else:
+                    settlement = SettlementRecord(measurement=request.measurement_address)
 
             state_update = {}
             
             for ggo_address in request.ggo_addresses:
 
-                ggo = self._get_ggo(context, ggo_address)
+                ggo: GGO = self._decode_type(GGO, states, ggo_address)
 
                 if ggo.next == None:
                     raise InvalidTransaction('Invalid retired GGO in settlement')
@@ -87,30 +111,41 @@ class SettlementHandler(GenericHandler):
                 if ggo.begin != measurement.begin:
                     raise InvalidTransaction('GGO not produced at the same time as measurement')
 
-                for part in settlement.parts:
-                    if part.ggo == ggo_address:
-                        raise InvalidTransaction('GGO already part of settlement')
+                if isinstance(settlement, PagedSettlement) and not settlement.can_hold(ggo_address):
+                    raise InvalidTransaction('Invalid retired GGO in settlement')
+
+                if ggo_address in settlement:
+                    raise InvalidTransaction('GGO already part of settlement')
 
-                settlement.parts.append(SettlementPart(
-                        ggo=ggo_address,
-                        amount=ggo.amount
-                    ))
+                settlement.add(ggo_address, ggo.amount)
                 
-            if sum([p.amount for p in settlement.parts]) > measurement.amount:
+            if settlement.total > measurement.amount:
                 raise InvalidTransaction('Invalid to retire more that measurement amount')
 
-            context.set_state(
-                {
-                    request.settlement_address:  Settlement.get_schema().dumps(settlement).encode('utf8')
-                }, 
-                self.TIMEOUT)
+            if isinstance(settlement, PagedSettlement):
+                entries = settlement.entries(lambda addresses: self._get_states(context, addresses))
+            else:
+                entries = {request.settlement_address: self._encode_record(settlement, transaction)}
 
-            logging.info(f'Settlement - measurement={ request.measurement_address } settlement={ request.settlement_address }')
+            context.set_state(entries, self.TIMEOUT)
+
+            log.accepted(self.family_name, measurement=request.measurement_address, settlement=request.settlement_address)
             
         except InvalidTransaction as ex:
-            logging.exception('InvalidException')
+            log.rejected(self.family_name, ex)
             raise
             
         except Exception as ex:
-            logging.exception('Exception')
+            log.failed(self.family_name)
             raise InternalError('An unknown error has occured.')
+
+    def _decode_state(self, clazz: type, data: bytes):
+        if clazz is SettlementRecord:
+            return SettlementRecord.decode(data)
+        return super()._decode_state(clazz, data)
+
+    def _encode_record(self, record: SettlementRecord, transaction) -> bytes:
+        """Encodes the settlement as _encode_state would, see SettlementRecord.encode."""
+        version = transaction.header.family_version
+        with tracer.span('encode_state', type=type(record).__name__):
+            return record.encode(version in self.COMPACT_VERSIONS, version in self.COMPRESSED_VERSIONS)
@@ -0,0 +1,163 @@
+"""
+Paged storage of settlements, written by the PAGED_VERSIONS of SettlementHandler.
+
+A paged settlement is stored as
+
+- a header at the settlement address: the SETTLEMENT_V3 tag, the number of
+  parts per page, the number of parts, their total amount and the address of
+  the measurement,
+- pages at page_address(settlement, index) of up to PAGE_SIZE parts, as fixed
+  width rows of the GGO address without its namespace and the amount,
+- a member entry at member_address(settlement, ggo) for every GGO in the
+  settlement, holding the index of its page.
+
+Adding k GGOs reads the header, k member entries and the last page and writes
+the header, the last page, any new pages and k member entries of MEMBER.size
+bytes, whatever the number of parts. The member entries are the index that
+finds a duplicate GGO without reading every page.
+
+Only settlements created by a PAGED_VERSIONS transaction are paged, settlements
+created by older versions keep their single entry for every version. A paged
+settlement can only be extended by the PAGED_VERSIONS, older clients that do
+not list the pages are rejected.
+
+The pages and member entries live in SETTLEMENT_PAGE_NAMESPACE. Clients must
+list the member addresses of the GGOs and the pages of the settlement in the
+inputs and outputs of the transaction, page_prefix(settlement) covers all pages.
+A malformed header or page is rejected as an invalid transaction.
+"""
+import struct
+import hashlib
+from typing import Callable, Dict, List, Optional
+
+from sawtooth_sdk.processor.exceptions import InvalidTransaction
+
+from .namespaces import GGO_NAMESPACE, SETTLEMENT_PAGE_NAMESPACE
+
+
+SETTLEMENT_V3 = 0xA3
+SETTLEMENT_PAGE_V1 = 0xB1
+SETTLEMENT_MEMBER_V1 = 0xC1
+
+PAGE_SIZE = 256
+
+# tag, parts per page, number of parts, total amount of the parts, followed by the measurement address
+HEADER = struct.Struct('<BHIq')
+# GGO address without the namespace, amount
+ROW = struct.Struct('<32sq')
+# tag, page index
+MEMBER = struct.Struct('<BI')
+
+
+def page_prefix(settlement_address: str) -> str:
+    return SETTLEMENT_PAGE_NAMESPACE + settlement_address[6:62]
+
+
+def page_address(settlement_address: str, index: int) -> str:
+    return f'{page_prefix(settlement_address)}{index:08x}'
+
+
+def member_address(settlement_address: str, ggo_address: str) -> str:
+    digest = hashlib.sha512(f'{settlement_address}/{ggo_address}'.encode('utf8')).hexdigest()
+    return SETTLEMENT_PAGE_NAMESPACE + digest[:64]
+
+
+def is_paged(data: Optional[bytes]) -> bool:
+    return data is not None and data[:1] == bytes((SETTLEMENT_V3,))
+
+
+def encode_row(ggo_address: str, amount: int) -> Optional[bytes]:
+    """Returns the page row of a part, or None when ggo_address is not a GGO address or amount is out of range."""
+    if type(ggo_address) is not str or len(ggo_address) != 70 or not ggo_address.startswith(GGO_NAMESPACE) \
+            or type(amount) is not int or not (ggo_address.islower() or ggo_address.isdigit()):
+        return None
+
+    try:
+        return ROW.pack(bytes.fromhex(ggo_address[6:]), amount)
+    except (ValueError, struct.error):
+        return None
+
+
+def decode_page(data: bytes):
+    """Returns the (ggo address, amount) of the parts on a page."""
+    if data[:1] != bytes((SETTLEMENT_PAGE_V1,)) or (len(data) - 1) % ROW.size:
+        raise InvalidTransaction('Invalid settlement page')
+
+    return [(GGO_NAMESPACE + ggo.hex(), amount) for ggo, amount in ROW.iter_unpack(memoryview(data)[1:])]
+
+
+class PagedSettlement:
+
+    def __init__(self, address: str, measurement: str, count: int = 0, total: int = 0, page_size: int = PAGE_SIZE, states: Dict[str, bytes] = None):
+        self.address = address
+        self.measurement = measurement
+        self.count = count
+        self.total = total
+        self.page_size = page_size
+        self.added = []
+        self._members = set()
+
+        # Fetched state entries, holding the member entries of the GGOs being added
+        self._states = states if states is not None else {}
+
+    @classmethod
+    def decode(cls, address: str, data: bytes, states: Dict[str, bytes]) -> 'PagedSettlement':
+        try:
+            _, page_size, count, total = HEADER.unpack_from(data)
+            measurement = data[HEADER.size:].decode('utf8')
+        except (struct.error, UnicodeDecodeError):
+            page_size = 0
+
+        if page_size == 0:
+            raise InvalidTransaction('Invalid settlement header')
+        return cls(address, measurement, count, total, page_size, states)
+
+    def can_hold(self, ggo_address: str) -> bool:
+        return encode_row(ggo_address, 0) is not None
+
+    def __contains__(self, ggo_address: str) -> bool:
+        return ggo_address in self._members or member_address(self.address, ggo_address) in self._states
+
+    def add(self, ggo_address: str, amount: int):
+        self.added.append((ggo_address, amount))
+        self._members.add(ggo_address)
+        self.total += amount
+
+    def entries(self, read: Callable[[List[str]], Dict[str, bytes]]) -> Dict[str, bytes]:
+        """
+        Returns the entries to write for the added parts, read is called with
+        the address of the last page when it has to be extended.
+        """
+        entries = {}
+        index, filled = divmod(self.count, self.page_size)
+        rows = []
+
+        if filled:
+            address = page_address(self.address, index)
+            data = read([address]).get(address)
+            if data is None or data[:1] != bytes((SETTLEMENT_PAGE_V1,)) or len(data) != 1 + filled * ROW.size:
+                raise InvalidTransaction(f'Settlement page {address} does not hold {filled} parts')
+            rows.append(data[1:])
+
+        for ggo_address, amount in self.added:
+            row = encode_row(ggo_address, amount)
+            if row is None:
+                raise ValueError(f'Settlement part {ggo_address} cannot be paged')
+
+            rows.append(row)
+            entries[member_address(self.address, ggo_address)] = MEMBER.pack(SETTLEMENT_MEMBER_V1, index)
+            filled += 1
+
+            if filled == self.page_size:
+                entries[page_address(self.address, index)] = bytes((SETTLEMENT_PAGE_V1,)) + b''.join(rows)
+                index, filled, rows = index + 1, 0, []
+
+        if rows:
+            entries[page_address(self.address, index)] = bytes((SETTLEMENT_PAGE_V1,)) + b''.join(rows)
+
+        self.count += len(self.added)
+        self.added = []
+
+        entries[self.address] = HEADER.pack(SETTLEMENT_V3, self.page_size, self.count, self.total) + self.measurement.encode('utf8')
+
+        return entries
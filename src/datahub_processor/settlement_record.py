@@ -0,0 +1,114 @@
+"""
+The settlement SettlementHandler extends, with the running total of its parts
+and an index of the GGOs in it.
+
+A record read from a SETTLEMENT_V2 entry is not decoded: the total comes from
+the header, membership is a binary search of the sorted fixed width part table
+and new parts are merged into it, so checking and adding k GGOs costs
+O(k log n) comparisons for a settlement of n parts, and one copy of the table
+to write the entry. Records read from JSON or SETTLEMENT_V1 entries are
+decoded and indexed once.
+"""
+import struct
+from typing import List
+
+from .ledger_dto import Settlement, SettlementPart
+from .state_codec import encode_state, decode_state
+from .compact_codec import SETTLEMENT_V2, SETTLEMENT_V2_PART, encode_settlement_part, split_settlement, join_settlement
+from .compression import is_compressed, compress, decompress
+
+
+class SettlementRecord:
+
+    def __init__(self, measurement: str, parts: List[SettlementPart] = None, total: int = None, table: bytes = None):
+        self.measurement = measurement
+        self.parts = list(parts) if parts is not None else []
+        self.total = total if total is not None else sum(part.amount for part in self.parts)
+        self.members = {part.ggo for part in self.parts}
+
+        # The part table of a SETTLEMENT_V2 entry, holding the parts before self.parts
+        self._table = table
+
+    @classmethod
+    def decode(cls, data: bytes) -> 'SettlementRecord':
+        """Reads a settlement entry, raises JSONDecodeError or marshmallow's ValidationError as decode_state does."""
+        plain = decompress(data) if is_compressed(data) else data
+
+        if plain[:1] == bytes((SETTLEMENT_V2,)):
+            try:
+                _, total, measurement, table = split_settlement(plain)
+                return cls(measurement, total=total, table=table)
+            except (struct.error, ValueError):
+                pass
+
+        settlement = decode_state(Settlement, plain)
+        return cls(settlement.measurement, parts=settlement.parts)
+
+    def __contains__(self, ggo: str) -> bool:
+        if ggo in self.members:
+            return True
+
+        row = encode_settlement_part(ggo, 0) if self._table else None
+        if row is None:
+            return False
+
+        address = row[:-8]
+        position = self._search(address) * SETTLEMENT_V2_PART.size
+        return self._table[position:position + len(address)] == address
+
+    def _search(self, key: bytes) -> int:
+        """Returns the index of the first row of the table whose first len(key) bytes are not less than key."""
+        low, high = 0, len(self._table) // SETTLEMENT_V2_PART.size
+
+        while low < high:
+            middle = (low + high) // 2
+            position = middle * SETTLEMENT_V2_PART.size
+            if self._table[position:position + len(key)] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def add(self, ggo: str, amount: int):
+        self.parts.append(SettlementPart(ggo=ggo, amount=amount))
+        self.members.add(ggo)
+        self.total += amount
+
+    def settlement(self) -> Settlement:
+        """Returns the record as a Settlement, decoding the part table if there is one."""
+        parts = []
+
+        if self._table:
+            parts = [SettlementPart(ggo=ggo.hex(), amount=amount) for ggo, amount in SETTLEMENT_V2_PART.iter_unpack(self._table)]
+
+        return Settlement(measurement=self.measurement, parts=parts + self.parts)
+
+    def encode(self, compact: bool = False, compressed: bool = False) -> bytes:
+        """Encodes the record exactly as encode_state encodes settlement(), appending to the part table when there is one."""
+        if compact and self._table is not None:
+            rows = [encode_settlement_part(part.ggo, part.amount) for part in self.parts]
+
+            if None not in rows:
+                table = self._merge(sorted(rows))
+                try:
+                    data = join_settlement(len(table) // SETTLEMENT_V2_PART.size, self.total, self.measurement, table)
+                    return compress(data) if compressed else data
+                except struct.error:
+                    pass
+
+        return encode_state(self.settlement(), compact, compressed)
+
+    def _merge(self, rows: List[bytes]) -> bytes:
+        """Returns the part table with the sorted rows inserted where they keep it sorted."""
+        chunks = []
+        start = 0
+
+        for row in rows:
+            end = self._search(row) * SETTLEMENT_V2_PART.size
+            chunks.append(self._table[start:end])
+            chunks.append(row)
+            start = end
+
+        chunks.append(self._table[start:])
+        return b''.join(chunks)
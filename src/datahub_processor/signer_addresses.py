@@ -0,0 +1,71 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict
+
+from .ledger_dto import generate_address, AddressPrefix
+
+
+class SignerAddressCache:
+    """
+    A bounded LRU cache of the addresses derived from a signer's public key,
+    shared by all handlers of the process.
+
+    Deriving an address hashes the public key with SHA-512, accounts that sign
+    many transactions hit the cache instead. Keys that fail to derive raise as
+    generate_address does and are not cached.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._addresses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, prefix: AddressPrefix, signer_public_key: str) -> str:
+        key = (prefix, signer_public_key)
+
+        with self._lock:
+            address = self._addresses.get(key)
+            if address is not None:
+                self._addresses.move_to_end(key)
+                self.hits += 1
+                return address
+
+            self.misses += 1
+
+        address = generate_address(prefix, bytearray.fromhex(signer_public_key))
+
+        if self.maxsize > 0:
+            with self._lock:
+                self._addresses[key] = address
+                while len(self._addresses) > self.maxsize:
+                    self._addresses.popitem(last=False)
+
+        return address
+
+    def __len__(self) -> int:
+        return len(self._addresses)
+
+    def clear(self):
+        with self._lock:
+            self._addresses.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._addresses),
+            }
+
+
+signer_addresses = SignerAddressCache(int(os.getenv('LEDGER_SIGNER_CACHE_SIZE', '4096')))
+
+
+def signer_address(prefix: AddressPrefix, signer_public_key: str) -> str:
+    """Returns the address of the given prefix derived from the signer's public key (hex)."""
+    return signer_addresses.get(prefix, signer_public_key)
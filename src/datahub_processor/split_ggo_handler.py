@@ -1,12 +1,13 @@
 import os
-import hashlib
 import traceback
-import logging
 
 from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
 
 from .generic_handler import GenericHandler
-from .ledger_dto import GGO, SplitGGORequest, GGONext, GGOAction, generate_address, AddressPrefix
+from . import log
+from .signer_addresses import signer_address
+from .namespaces import GGO_NAMESPACE
+from .ledger_dto import GGO, SplitGGORequest, GGONext, GGOAction, AddressPrefix
 
 
 class SplitGGOTransactionHandler(GenericHandler):
@@ -17,35 +18,33 @@ class SplitGGOTransactionHandler(GenericHandler):
 
     @property
     def family_versions(self):
-        return ['0.1']
+        return self._registered(['0.1', '0.2', '0.3', '0.4'])
 
     @property
     def namespaces(self):
-        ggo_namespace = hashlib.sha512('GGO'.encode('utf-8')).hexdigest()[0:6]
-        return [ggo_namespace]
+        return [GGO_NAMESPACE]
 
 
-    def apply(self, transaction, context):
+    def _apply(self, transaction, context):
 
         try:
             request: SplitGGORequest = self._map_request(SplitGGORequest, transaction.payload)
 
+            generated_address = signer_address(AddressPrefix.GGO, transaction.header.signer_public_key)
+            if generated_address != request.origin:
+                 raise InvalidTransaction('Invalid key for GGO')
+
             current_ggo = self._get_ggo(context, request.origin)
 
             if current_ggo.next != None:
                 raise InvalidTransaction('GGO already has been used')
 
-            public_key_bytes = bytearray.fromhex(transaction.header.signer_public_key)
-            generated_address = generate_address(AddressPrefix.GGO, public_key_bytes)
-            if generated_address != request.origin:
-                 raise InvalidTransaction('Invalid key for GGO')
+            if sum([p.amount for p in request.parts]) != current_ggo.amount:
+                raise InvalidTransaction('The sum of the parts does not equal the whole')
 
             if self._addresses_not_empty(context, [p.address for p in request.parts]):
                 raise InvalidTransaction('Destination address not empty')
 
-            if sum([p.amount for p in request.parts]) != current_ggo.amount:
-                raise InvalidTransaction('The sum of the parts does not equal the whole')
-
             state_update = {}
 
             for part in request.parts:
@@ -59,25 +58,25 @@ class SplitGGOTransactionHandler(GenericHandler):
                     fuel_type=current_ggo.fuel_type,
                     emissions=current_ggo.emissions,
                 )
-                state_update[part.address] = GGO.get_schema().dumps(split_ggo).encode('utf8')
+                state_update[part.address] = self._encode_state(split_ggo, transaction)
 
             current_ggo.next = GGONext(
                 GGOAction.SPLIT,
                 [p.address for p in request.parts]
             )
 
-            state_update[request.origin] = GGO.get_schema().dumps(current_ggo).encode('utf8')
+            state_update[request.origin] = self._encode_state(current_ggo, transaction)
 
             context.set_state(
                 state_update, 
                 self.TIMEOUT)
 
-            logging.info(f'Split GGO - origin={ request.origin } parts=[{ ";".join([p.address for p in request.parts]) }]')
+            log.accepted(self.family_name, origin=request.origin, parts=[p.address for p in request.parts])
             
         except InvalidTransaction as ex:
-            logging.exception('InvalidException')
+            log.rejected(self.family_name, ex)
             raise
             
         except Exception as ex:
-            logging.exception('Exception')
+            log.failed(self.family_name)
             raise InternalError('An unknown error has occured.')
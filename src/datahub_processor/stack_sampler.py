@@ -0,0 +1,135 @@
+"""
+A low overhead sampling profiler that can be left on in production.
+
+A daemon thread reads the stack of every other thread of the process
+LEDGER_SAMPLE_RATE times a second with sys._current_frames and counts the
+stacks. On SIGUSR1 the counts since the last dump are written to
+<LEDGER_PROFILE_DIR>/stacks-<pid>-<time>.folded in the collapsed stack
+format, one "thread;outer;...;inner count" line per stack, which
+flamegraph.pl, speedscope and inferno render as a flame graph.
+
+Unlike profiling.py it does not trace calls, so its cost depends on the
+sample rate and the stack depth, not on the number of calls made.
+"""
+import os
+import sys
+import time
+import signal
+import threading
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from .log import logger
+
+
+# Stacks beyond this many distinct ones are counted as OTHER until the next
+# dump, which bounds the memory a long running sampler holds.
+MAX_STACKS = 20000
+OTHER = ('[other stacks]',)
+
+
+class StackSampler:
+
+    def __init__(self, rate: float, directory: str, max_depth: int = 128):
+        self.rate = rate
+        self.directory = directory
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks = Counter()
+        self._labels: Dict[object, str] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.rate <= 0 or self.running:
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+        logger.info('Sampling stacks %s times a second, send SIGUSR1 to write them to %s', self.rate, self.directory)
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def sample(self):
+        """Counts the current stack of every thread but the sampler's."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        stacks = []
+
+        for ident, frame in sys._current_frames().items():
+            if ident != own:
+                stacks.append((names.get(ident, 'thread'),) + self._stack(frame))
+
+        with self._lock:
+            self.samples += 1
+            for stack in stacks:
+                if stack in self._stacks or len(self._stacks) < MAX_STACKS:
+                    self._stacks[stack] += 1
+                else:
+                    self._stacks[OTHER] += 1
+
+    def collapsed(self, reset: bool = False) -> str:
+        """Returns the stacks counted in the collapsed stack format, most frequent first."""
+        with self._lock:
+            stacks = self._stacks
+            if reset:
+                self._stacks = Counter()
+
+        return ''.join(f'{";".join(stack)} {count}\n' for stack, count in stacks.most_common())
+
+    def dump(self) -> str:
+        """Writes and resets the stacks counted since the last dump, returns the path written."""
+        path = os.path.join(self.directory, f'stacks-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}.folded')
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, 'w') as file:
+                file.write(self.collapsed(reset=True))
+            logger.info('Wrote sampled stacks to %s', path)
+        except OSError:
+            logger.exception('Could not write the sampled stacks to %s', path)
+
+        return path
+
+    def _run(self):
+        interval = 1 / self.rate
+
+        while not self._stopped.wait(interval):
+            try:
+                self.sample()
+            except Exception:
+                logger.exception('Sampling the stacks failed')
+
+    def _stack(self, frame) -> Tuple[str, ...]:
+        labels = []
+
+        while frame is not None and len(labels) < self.max_depth:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                label = self._labels[code] = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            labels.append(label)
+            frame = frame.f_back
+
+        return tuple(reversed(labels))
+
+
+sampler = StackSampler(
+    float(os.getenv('LEDGER_SAMPLE_RATE', '50')),
+    os.getenv('LEDGER_PROFILE_DIR', '/tmp/datahub-processor-profiles'))
+
+
+def install_signal_handler(signum: int = signal.SIGUSR1):
+    """Writes the sampled stacks when the process receives signum, must be called from the main thread."""
+    signal.signal(signum, lambda signum, frame: threading.Thread(target=sampler.dump, name='stack-sampler-dump', daemon=True).start())
@@ -0,0 +1,318 @@
+"""
+Fast-path encoders and decoders for the state entries written by the handlers.
+
+The codecs of GGO, Measurement and Settlement are generated from the type
+annotations of their dataclass fields, and produce exactly the JSON their
+compiled marshmallow schemas would (same key order, same value formatting).
+Whenever the fast path meets a value or a field type it does not handle, the
+entry is passed on to marshmallow, which remains the reference implementation
+and the only path for other types.
+
+Schema level validation, such as Measurement's hourly periods, is declared in
+SCHEMA_CHECKS. An entry failing it is passed on to marshmallow, which raises
+its own error for it.
+"""
+import json
+import typing
+import dataclasses
+from enum import Enum
+from datetime import datetime
+
+from marshmallow import ValidationError
+
+from .ledger_dto import Measurement
+from .schema_registry import get_schema, STATE_TYPES
+from .compact_codec import is_compact, encode_compact, decode_compact
+from .compression import is_compressed, compress, decompress
+
+
+class _Fallback(Exception):
+    """Raised by the fast path when marshmallow must handle the entry."""
+
+
+def _fallback():
+    raise _Fallback()
+
+
+def _parse_datetime(value: str) -> datetime:
+    """
+    Parses the ISO 8601 layout written by marshmallow, YYYY-MM-DDTHH:MM:SS with
+    optional microseconds and UTC offset. Other layouts are left to marshmallow.
+    """
+    if type(value) is not str or len(value) not in (19, 25, 26, 32) or value[10] != 'T' \
+            or value[13] != ':' or value[16] != ':':
+        _fallback()
+
+    if len(value) in (25, 32) and (value[-6] not in '+-' or value[-3] != ':'):
+        _fallback()
+
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        _fallback()
+
+
+def _format_datetime(value: datetime) -> str:
+    return value.isoformat() if isinstance(value, datetime) else _fallback()
+
+
+# A field codec is called with the marshmallow field it stands in for
+# and returns its (encode, decode) pair.
+
+def _of_type(clazz: type):
+    def codec(field):
+        def convert(value):
+            return value if type(value) is clazz else _fallback()
+        return convert, convert
+    return codec
+
+
+STRING = _of_type(str)
+INTEGER = _of_type(int)
+
+
+def _datetime(field):
+    return _format_datetime, _parse_datetime
+
+
+DATETIME = _datetime
+
+
+def _any(field):
+    def convert(value):
+        return value
+    return convert, convert
+
+
+ANY = _any
+
+
+def _unsupported(field):
+    def convert(value):
+        _fallback()
+    return convert, convert
+
+
+UNSUPPORTED = _unsupported
+
+
+def enum(clazz: type):
+    def codec(field):
+        def encode(value):
+            return value.name if isinstance(value, clazz) else _fallback()
+
+        def decode(value):
+            return clazz[value] if type(value) is str and value in clazz.__members__ else _fallback()
+
+        return encode, decode
+    return codec
+
+
+def list_of(item):
+    def codec(field):
+        encode_item, decode_item = _field(field.inner, item)
+
+        def encode(value):
+            return [encode_item(i) for i in value] if type(value) is list else _fallback()
+
+        def decode(value):
+            return [decode_item(i) for i in value] if type(value) is list else _fallback()
+
+        return encode, decode
+    return codec
+
+
+def dict_of(key, value):
+    def codec(field):
+        # marshmallow leaves keys or values as they are when their field is not given
+        encode_key, decode_key = _field(field.key_field, key) if field.key_field is not None else _any(None)
+        encode_value, decode_value = _field(field.value_field, value) if field.value_field is not None else _any(None)
+
+        def encode(value):
+            return {encode_key(k): encode_value(v) for k, v in value.items()} if type(value) is dict else _fallback()
+
+        def decode(value):
+            return {decode_key(k): decode_value(v) for k, v in value.items()} if type(value) is dict else _fallback()
+
+        return encode, decode
+    return codec
+
+
+def nested(clazz: type):
+    def codec(field):
+        record = _RecordCodec(clazz, field.schema, fields_of(clazz))
+        return record.encode_object, record.decode_object
+    return codec
+
+
+def field_codec(annotation):
+    """Returns the field codec for a dataclass field annotation, UNSUPPORTED for types the fast path does not handle."""
+    origin = getattr(annotation, '__origin__', None)
+    args = getattr(annotation, '__args__', ())
+
+    if annotation in (str, int, datetime):
+        return {str: STRING, int: INTEGER, datetime: DATETIME}[annotation]
+    if annotation is typing.Any:
+        return ANY
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return enum(annotation)
+    if dataclasses.is_dataclass(annotation):
+        return nested(annotation)
+    if origin is typing.Union and len(args) == 2 and type(None) in args:
+        # None is accepted or not following the field's allow_none, see _field
+        return field_codec(args[0] if args[1] is type(None) else args[1])
+    if origin is list:
+        return list_of(field_codec(args[0]))
+    if origin is dict:
+        return dict_of(field_codec(args[0]), field_codec(args[1]))
+
+    return UNSUPPORTED
+
+
+def fields_of(clazz: type) -> dict:
+    """Returns the field codecs of a dataclass by field name."""
+    annotations = typing.get_type_hints(clazz)
+    return {field.name: field_codec(annotations[field.name]) for field in dataclasses.fields(clazz)}
+
+
+def _optional(field, encode, decode):
+    """Adds marshmallow's handling of None to a field codec."""
+    allow_none = field.allow_none
+
+    def encode_optional(value):
+        return None if value is None else encode(value)
+
+    def decode_optional(value):
+        if value is None:
+            return None if allow_none else _fallback()
+        return decode(value)
+
+    return encode_optional, decode_optional
+
+
+def _validated(decode, validators):
+    """Runs the field's validators, which raise ValidationError for invalid values."""
+    def decode_validated(value):
+        value = decode(value)
+        for validator in validators:
+            validator(value)
+        return value
+    return decode_validated
+
+
+def _field(field, codec):
+    """Returns the (encode, decode) pair of a marshmallow field, as its field codec with None and validators handled."""
+    encode, decode = codec(field)
+    if field.validators:
+        decode = _validated(decode, field.validators)
+    return _optional(field, encode, decode)
+
+
+class _RecordCodec:
+    """Encodes and decodes one dataclass following its compiled schema and field codecs."""
+
+    def __init__(self, clazz: type, schema, declaration: dict, check=None):
+        self.clazz = clazz
+        self.check = check
+        self.keys = frozenset(schema.load_fields)
+        self.fields = []
+
+        # The schema gives the key order of the JSON
+        for name, field in schema.dump_fields.items():
+            encode, decode = _field(field, declaration[name])
+            self.fields.append((name, encode, decode))
+
+    def encode_object(self, obj) -> dict:
+        if type(obj) is not self.clazz:
+            _fallback()
+        return {name: encode(getattr(obj, name)) for name, encode, _ in self.fields}
+
+    def decode_object(self, data):
+        if type(data) is not dict or data.keys() != self.keys:
+            _fallback()
+        obj = self.clazz(**{name: decode(data[name]) for name, _, decode in self.fields})
+        if self.check is not None:
+            self.check(obj)
+        return obj
+
+
+def _check_period(measurement: Measurement):
+    """Measurement's schema validation, begin before end and hourly periods."""
+    begin, end = measurement.begin, measurement.end
+
+    if (begin.tzinfo is None) != (end.tzinfo is None) or (end - begin).total_seconds() != 3600:
+        _fallback()
+
+
+SCHEMA_CHECKS = {
+    Measurement: _check_period,
+}
+
+
+_codecs = {}
+
+
+def get_codec(clazz: type):
+    """Returns the codec for clazz, or None when only marshmallow can handle it."""
+    return _codecs.get(clazz)
+
+
+def encode_state(obj, compact: bool = False, compressed: bool = False) -> bytes:
+    """
+    Encodes a state entry as JSON, or in the compact binary format when compact
+    is set and the format can represent obj. With compressed set the entry is
+    compressed with the current dictionary when that makes it smaller.
+    """
+    data = _encode_state(obj, compact)
+    return compress(data) if compressed else data
+
+
+def _encode_state(obj, compact: bool) -> bytes:
+    if compact:
+        data = encode_compact(obj)
+        if data is not None:
+            return data
+
+    codec = get_codec(type(obj))
+
+    if codec is not None:
+        try:
+            return json.dumps(codec.encode_object(obj)).encode('utf8')
+        except _Fallback:
+            pass
+
+    return get_schema(type(obj)).dumps(obj).encode('utf8')
+
+
+def decode_state(clazz: type, data: bytes):
+    """
+    Decodes a state entry, raises JSONDecodeError or marshmallow's ValidationError
+    for invalid entries exactly as the schema would. Compressed and compact
+    entries are told apart from JSON by their first byte.
+    """
+    if is_compressed(data):
+        data = decompress(data)
+
+    if is_compact(data):
+        return decode_compact(clazz, data)
+
+    text = data.decode('utf8')
+    codec = get_codec(clazz)
+
+    if codec is not None:
+        value = json.loads(text)
+        try:
+            return codec.decode_object(value)
+        except (_Fallback, ValidationError):
+            pass
+
+    return get_schema(clazz).loads(text)
+
+
+def build_codecs():
+    if not _codecs:
+        for clazz in STATE_TYPES:
+            _codecs[clazz] = _RecordCodec(clazz, get_schema(clazz), fields_of(clazz), SCHEMA_CHECKS.get(clazz))
+
+
+build_codecs()
@@ -0,0 +1,151 @@
+import threading
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+from sawtooth_sdk.processor.exceptions import AuthorizationException, InvalidTransaction
+
+from .tracing import tracer
+
+
+StateEntry = namedtuple('StateEntry', ['address', 'data'])
+
+
+class StateAccessStats:
+    """Process-wide totals of the validator round trips made and saved by CachedContext."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.transactions = 0
+        self.get_state_calls = 0
+        self.set_state_calls = 0
+        self.reads_saved = 0
+        self.writes_saved = 0
+
+    def add(self, context: 'CachedContext'):
+        with self._lock:
+            self.transactions += 1
+            self.get_state_calls += context.get_state_calls
+            self.set_state_calls += context.set_state_calls
+            self.reads_saved += context.reads_saved
+            self.writes_saved += context.writes_saved
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'transactions': self.transactions,
+                'get_state_calls': self.get_state_calls,
+                'set_state_calls': self.set_state_calls,
+                'reads_saved': self.reads_saved,
+                'writes_saved': self.writes_saved,
+            }
+
+
+stats = StateAccessStats()
+
+
+class CachedContext:
+    """
+    Wraps the validator context for the duration of a single transaction.
+
+    Reads are served from memory once an address has been fetched, including
+    addresses that turned out to be empty, and set_state calls are buffered
+    and written to the validator with one call on flush().
+
+    The validator refuses reads of addresses not covered by the inputs of the
+    transaction and writes not covered by its outputs. The transaction lists
+    them, so every validator refuses alike and it is rejected as invalid.
+    """
+
+    def __init__(self, context):
+        self._context = context
+        self._cache: Dict[str, Optional[bytes]] = {}
+        self._pending: Dict[str, bytes] = {}
+
+        self.get_state_calls = 0
+        self.set_state_calls = 0
+        self.addresses_read = 0
+        self.reads_saved = 0
+        self.writes_saved = 0
+
+        # Sizes of the non-empty entries read from and written to the validator
+        self.read_sizes: List[int] = []
+        self.write_sizes: List[int] = []
+
+        # Size of every address the handler read, 0 when empty, whether it was
+        # fetched for the read or before by prefetch
+        self._used: Dict[str, int] = {}
+
+    @property
+    def addresses_used(self) -> int:
+        return len(self._used)
+
+    @property
+    def bytes_used(self) -> int:
+        return sum(self._used.values())
+
+    @property
+    def bytes_written(self) -> int:
+        return sum(self.write_sizes)
+
+    @property
+    def round_trips_saved(self) -> int:
+        return self.reads_saved + self.writes_saved
+
+    def prefetch(self, addresses):
+        """Fetches the addresses not already cached with one get_state call."""
+        missing = [address for address in dict.fromkeys(addresses) if address not in self._cache]
+
+        if missing:
+            self.get_state_calls += 1
+            self.addresses_read += len(missing)
+            self._cache.update(dict.fromkeys(missing))
+            with tracer.span('get_state', addresses=len(missing)):
+                try:
+                    entries = self._context.get_state(missing)
+                except AuthorizationException:
+                    raise InvalidTransaction('The transaction reads addresses that are not in its inputs.')
+
+            for entry in entries:
+                self._cache[entry.address] = entry.data
+                if entry.data:
+                    self.read_sizes.append(len(entry.data))
+
+    def get_state(self, addresses, timeout=None) -> List[StateEntry]:
+        addresses = list(dict.fromkeys(addresses))
+
+        if all(address in self._cache for address in addresses):
+            self.reads_saved += 1
+        else:
+            self.prefetch(addresses)
+
+        for address in addresses:
+            self._used.setdefault(address, len(self._cache[address] or b''))
+
+        return [
+            StateEntry(address, self._cache[address])
+            for address in addresses
+            if self._cache[address]
+        ]
+
+    def set_state(self, entries, timeout=None) -> List[str]:
+        if self._pending:
+            self.writes_saved += 1
+
+        self._pending.update(entries)
+        self._cache.update(entries)
+
+        return list(entries)
+
+    def flush(self, timeout=None):
+        if self._pending:
+            self.set_state_calls += 1
+            with tracer.span('set_state', addresses=len(self._pending)):
+                try:
+                    self._context.set_state(self._pending, timeout)
+                except AuthorizationException:
+                    raise InvalidTransaction('The transaction writes addresses that are not in its outputs.')
+            self.write_sizes.extend(len(data) for data in self._pending.values())
+            self._pending = {}
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
@@ -0,0 +1,159 @@
+"""
+Lightweight span tracing of the handlers, written as JSON lines.
+
+GenericHandler.apply opens a root span per transaction, and spans are
+opened inside it for parsing the request, every get_state and set_state
+round trip to the validator, and decoding and encoding state entries.
+When the root span ends, every span of the transaction is appended to
+LEDGER_TRACE_FILE as one JSON object per line:
+
+    {"trace": <transaction signature>, "span": 2, "parent": 1, "name": "get_state",
+     "family": "SettlementRequest", "start": 1601290000.123, "duration": 0.0021, "addresses": 3}
+
+start is the wall clock time in seconds, duration is in seconds. A span
+left by an exception is tagged with "error", the name of the exception.
+
+Without LEDGER_TRACE_FILE tracing is disabled and opening a span returns a
+shared no-op span. Spans opened outside of a root span are not recorded.
+"""
+import os
+import json
+import time
+import threading
+from typing import List, Optional
+
+from .log import logger
+
+
+class _NoSpan:
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class Span:
+
+    __slots__ = ('trace', 'id', 'parent', 'name', 'tags', 'start', 'duration', '_began')
+
+    def __init__(self, trace: '_Trace', name: str, tags: dict):
+        self.trace = trace
+        self.name = name
+        self.tags = tags
+        self.id = None
+        self.parent = None
+        self.start = None
+        self.duration = None
+        self._began = None
+
+    def __enter__(self) -> 'Span':
+        self.trace.begin(self)
+        self.start = time.time()
+        self._began = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = time.perf_counter() - self._began
+        if exc_type is not None:
+            self.tags['error'] = exc_type.__name__
+        self.trace.end(self)
+        return False
+
+    def record(self) -> dict:
+        record = {
+            'trace': self.trace.id,
+            'span': self.id,
+            'parent': self.parent,
+            'name': self.name,
+            'family': self.trace.family,
+            'start': self.start,
+            'duration': self.duration,
+        }
+        record.update(self.tags)
+        return record
+
+
+class _Trace:
+    """The spans of one transaction, ended spans are kept until the root span ends."""
+
+    def __init__(self, tracer: 'Tracer', id: str, family: str):
+        self.tracer = tracer
+        self.id = id
+        self.family = family
+        self.open: List[Span] = []
+        self.ended: List[Span] = []
+        self._next_id = 1
+
+    def begin(self, span: Span):
+        span.id = self._next_id
+        span.parent = self.open[-1].id if self.open else None
+        self._next_id += 1
+        self.open.append(span)
+
+    def end(self, span: Span):
+        self.open.pop()
+        self.ended.append(span)
+
+        if not self.open:
+            self.tracer._finish(self)
+
+
+class Tracer:
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.enabled = path is not None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = None
+
+    def trace(self, name: str, family: str, signature: str, **tags):
+        """Returns the root span of a transaction, spans opened in this thread until it ends are its children."""
+        if not self.enabled:
+            return NO_SPAN
+
+        trace = _Trace(self, signature, family)
+        self._local.trace = trace
+
+        return Span(trace, name, tags)
+
+    def span(self, name: str, **tags):
+        """Returns a span in the trace of the current thread, or a no-op span if there is none."""
+        if not self.enabled:
+            return NO_SPAN
+
+        trace = getattr(self._local, 'trace', None)
+        if trace is None:
+            return NO_SPAN
+
+        return Span(trace, name, tags)
+
+    def _finish(self, trace: _Trace):
+        self._local.trace = None
+        lines = ''.join(json.dumps(span.record(), default=str) + '\n' for span in sorted(trace.ended, key=lambda span: span.id))
+
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'a')
+                self._file.write(lines)
+                self._file.flush()
+            except OSError:
+                logger.exception('Could not write spans to %s, tracing disabled', self.path)
+                self.enabled = False
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+tracer = Tracer(os.getenv('LEDGER_TRACE_FILE') or None)
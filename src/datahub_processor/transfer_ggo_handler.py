@@ -1,12 +1,13 @@
 import os
-import hashlib
 import traceback
-import logging
 
 from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
 
 from .generic_handler import GenericHandler
-from .ledger_dto import GGO, TransferGGORequest, GGONext, GGOAction, generate_address, AddressPrefix
+from . import log
+from .signer_addresses import signer_address
+from .namespaces import GGO_NAMESPACE
+from .ledger_dto import GGO, TransferGGORequest, GGONext, GGOAction, AddressPrefix
 
 
 class TransferGGOTransactionHandler(GenericHandler):
@@ -17,29 +18,27 @@ class TransferGGOTransactionHandler(GenericHandler):
 
     @property
     def family_versions(self):
-        return ['0.1']
+        return self._registered(['0.1', '0.2', '0.3', '0.4'])
 
     @property
     def namespaces(self):
-        ggo_namespace = hashlib.sha512('GGO'.encode('utf-8')).hexdigest()[0:6]
-        return [ggo_namespace]
+        return [GGO_NAMESPACE]
 
 
-    def apply(self, transaction, context):
+    def _apply(self, transaction, context):
 
         try:
             request: TransferGGORequest = self._map_request(TransferGGORequest, transaction.payload)
 
+            generated_address = signer_address(AddressPrefix.GGO, transaction.header.signer_public_key)
+            if generated_address != request.origin:
+                 raise InvalidTransaction('Invalid key for GGO')
+
             current_ggo = self._get_ggo(context, request.origin)
 
             if current_ggo.next != None:
                 raise InvalidTransaction('GGO already has been used')
 
-            public_key_bytes = bytearray.fromhex(transaction.header.signer_public_key)
-            generated_address = generate_address(AddressPrefix.GGO, public_key_bytes)
-            if generated_address != request.origin:
-                 raise InvalidTransaction('Invalid key for GGO')
-
             if self._addresses_not_empty(context, [request.destination]):
                 raise InvalidTransaction('Destination address not empty')
 
@@ -59,8 +58,8 @@ class TransferGGOTransactionHandler(GenericHandler):
                 emissions=current_ggo.emissions,
             )
 
-            payload_current = GGO.get_schema().dumps(current_ggo).encode('utf8')
-            payload_new = GGO.get_schema().dumps(new_ggo).encode('utf8')
+            payload_current = self._encode_state(current_ggo, transaction)
+            payload_new = self._encode_state(new_ggo, transaction)
 
             context.set_state(
                 {
@@ -69,14 +68,12 @@ class TransferGGOTransactionHandler(GenericHandler):
                 }, 
                 self.TIMEOUT)
 
-            print("TransferGGOTransactionHandler", "origin", request.origin, "destination", request.destination)
-          
-            logging.info(f'Transfer GGO - origin={ request.origin } destination=[{ request.destination }]')
+            log.accepted(self.family_name, origin=request.origin, destination=request.destination)
             
         except InvalidTransaction as ex:
-            logging.exception('InvalidException')
+            log.rejected(self.family_name, ex)
             raise
             
         except Exception as ex:
-            logging.exception('Exception')
+            log.failed(self.family_name)
             raise InternalError('An unknown error has occured.')
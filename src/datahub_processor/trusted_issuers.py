@@ -0,0 +1,105 @@
+"""
+The public keys trusted to publish measurements and issue GGOs.
+
+The keys are read from the on-chain setting ISSUERS_SETTING, a comma
+separated list of hex encoded public keys maintained with the settings
+transaction family, e.g.
+
+    sawset proposal create datahub.issuers.public_keys=02ab...,03cd...
+
+Only transactions of the ISSUER_VERSIONS of PublishMeasurementRequest and
+IssueGGORequest are checked, older versions accept every signer as they always
+have, so existing clients and the blocks already on chain are not affected.
+
+The setting is part of the state, so every validator applies the same rule:
+while the setting does not exist every signer is accepted, once it exists
+only the listed keys are. Checked transactions must list the setting's address
+in their inputs, validators refuse to read it otherwise and the transaction is
+rejected as invalid.
+
+The handlers fetch the setting entry together with the state they read
+anyway, so checking the signer does not add a round trip to the validator.
+The entry is parsed into a set of keys only when its bytes differ from the
+last entry parsed, the check itself is a set lookup.
+"""
+import hashlib
+import threading
+from typing import Dict, FrozenSet, List
+
+from google.protobuf.message import DecodeError
+from sawtooth_sdk.protobuf.setting_pb2 import Setting
+
+from .log import logger
+
+
+ISSUERS_SETTING = 'datahub.issuers.public_keys'
+
+# Family versions of PublishMeasurementRequest and IssueGGORequest whose signer is checked
+ISSUER_VERSIONS = ('0.5',)
+
+SETTINGS_NAMESPACE = '000000'
+SETTING_KEY_PARTS = 4
+SETTING_PART_SIZE = 16
+
+
+def setting_address(key: str) -> str:
+    """Returns the state address of an on-chain setting, as the settings transaction family computes it."""
+    parts = key.split('.', maxsplit=SETTING_KEY_PARTS - 1)
+    parts += [''] * (SETTING_KEY_PARTS - len(parts))
+
+    return SETTINGS_NAMESPACE + ''.join(hashlib.sha256(part.encode('utf8')).hexdigest()[:SETTING_PART_SIZE] for part in parts)
+
+
+def parse_keys(setting: str, data: bytes) -> FrozenSet[str]:
+    """Returns the keys listed by the setting in a settings state entry, none if the entry cannot be read."""
+    entries = Setting()
+
+    try:
+        entries.ParseFromString(data)
+    except DecodeError:
+        logger.warning('The state entry of setting %s is not a valid Setting, trusting no issuers', setting)
+        return frozenset()
+
+    for entry in entries.entries:
+        if entry.key == setting:
+            return frozenset(key.strip().lower() for key in entry.value.split(',') if key.strip())
+
+    return frozenset()
+
+
+class TrustedIssuers:
+
+    def __init__(self, setting: str = ISSUERS_SETTING):
+        self.setting = setting
+        self.addresses: List[str] = [setting_address(setting)]
+        self.parses = 0
+
+        # The last setting entry parsed and its keys, replaced as one tuple
+        # so concurrent readers always see a matching pair.
+        self._parsed = (None, frozenset())
+        self._lock = threading.Lock()
+
+    def keys(self, data: bytes) -> FrozenSet[str]:
+        """Returns the trusted keys listed by the setting entry data."""
+        parsed, keys = self._parsed
+        if data == parsed:
+            return keys
+
+        keys = parse_keys(self.setting, data)
+
+        with self._lock:
+            self._parsed = (data, keys)
+            self.parses += 1
+
+        return keys
+
+    def is_trusted(self, signer_public_key: str, states: Dict[str, bytes]) -> bool:
+        """Returns whether the signer may publish and issue, states are entries fetched with addresses."""
+        data = states.get(self.addresses[0])
+        if data is None:
+            return True
+
+        return signer_public_key.lower() in self.keys(data)
+
+
+trusted_issuers = TrustedIssuers()
@@ -1,26 +1,237 @@
+import time
+STARTED = time.monotonic()
+
 import os
+import signal
 import logging
+import multiprocessing
 import sys
 from sawtooth_sdk.processor.core import TransactionProcessor
 from datahub_processor import PublishMeasurementTransactionHandler,  IssueGGOTransactionHandler, TransferGGOTransactionHandler, SplitGGOTransactionHandler, RetireGGOTransactionHandler, SettlementHandler
+from datahub_processor.warm_up import warm_up, check_compression
+from datahub_processor.metrics import start_http_server, startup
+from datahub_processor.log import configure as configure_logging
+from datahub_processor import profiling, stack_sampler
+
+IMPORTED = time.monotonic()
+
+HANDLERS = [
+    PublishMeasurementTransactionHandler,
+    IssueGGOTransactionHandler,
+    TransferGGOTransactionHandler,
+    SplitGGOTransactionHandler,
+    RetireGGOTransactionHandler,
+    SettlementHandler,
+]
+
+RESTART_DELAY = 1
+STOP_TIMEOUT = 5
+
+# A worker exiting within STABLE_UPTIME seconds of its start failed fast, its
+# restart delay doubles with every fast failure up to MAX_RESTART_DELAY, and the
+# supervisor gives up after MAX_FAST_FAILURES in a row.
+STABLE_UPTIME = 60
+MAX_RESTART_DELAY = 60
+MAX_FAST_FAILURES = 5
+
+LOG_LEVEL = os.getenv('LEDGER_LOG_LEVEL', default='INFO').upper()
+
+METRICS_HOST = os.getenv('LEDGER_METRICS_HOST', default='0.0.0.0')
+METRICS_PORT = os.getenv('LEDGER_METRICS_PORT', default='9464')
+
+WARM_UP = os.getenv('LEDGER_WARM_UP', default='true').lower() == 'true'
+
+
+def main(url, families=None, warm=WARM_UP):
+    handlers = [handler() for handler in HANDLERS]
+    handlers = [handler for handler in handlers if families is None or handler.family_name in families]
+
+    check_compression()
+
+    if warm:
+        timed_warm_up(handlers)
+
+    profiling.install_signal_handler()
+    stack_sampler.install_signal_handler()
+    stack_sampler.sampler.start()
 
-def main(url):
     processor = TransactionProcessor(url=url)
-    processor.add_handler(PublishMeasurementTransactionHandler())
-    processor.add_handler(IssueGGOTransactionHandler())
-    processor.add_handler(TransferGGOTransactionHandler())
-    processor.add_handler(SplitGGOTransactionHandler())
-    processor.add_handler(RetireGGOTransactionHandler())
-    processor.add_handler(SettlementHandler())
+    for handler in handlers:
+        processor.add_handler(handler)
     processor.start()
-    
+
+
+def parse_families(spec):
+    """
+    Parses LEDGER_FAMILIES into a list of (families, worker count).
+
+    Entries are separated by commas, each entry names one or more families
+    joined by '+' and optionally a worker count, e.g.
+    "SettlementRequest:8,TransferGGORequest+SplitGGORequest+RetireGGORequest:1".
+    """
+    known = [handler().family_name for handler in HANDLERS]
+    groups = []
+
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+
+        names, _, count = entry.partition(':')
+        families = tuple(name.strip() for name in names.split('+'))
+
+        for family in families:
+            if family not in known:
+                raise ValueError(f'Unknown transaction family "{family}" in LEDGER_FAMILIES, expected one of {", ".join(known)}')
+
+        groups.append((families, int(count) if count else 1))
+
+    return groups
+
+
+def timed_warm_up(handlers=()):
+    """ Exercises the handlers once before registering with the validator, see datahub_processor.warm_up. """
+    begin = time.monotonic()
+
+    try:
+        warm_up(handlers)
+    except Exception:
+        logging.exception('Warm-up failed, continuing without')
+
+    startup.phase('warm_up', time.monotonic() - begin)
+
+
+def serve_metrics(index=0):
+    """ Serves /metrics on LEDGER_METRICS_PORT, offset by the worker index when running several workers. """
+    if not METRICS_PORT:
+        return
+
+    port = int(METRICS_PORT) + index
+
+    try:
+        start_http_server(port, METRICS_HOST)
+        logging.info(f'Serving metrics on http://{METRICS_HOST}:{port}/metrics')
+    except OSError:
+        logging.exception(f'Could not serve metrics on port {port}')
+
+
+def run_worker(url, families, index=None):
+    # The supervisor's signal handlers are inherited by the fork,
+    # SIGINT must raise KeyboardInterrupt so the processor unregisters.
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+    signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+
+    if index is None:
+        main(url, families)
+        return
+
+    # The supervisor's logging thread did not survive the fork
+    listener = configure_logging(LOG_LEVEL)
+
+    try:
+        serve_metrics(index)
+        # Forked from the supervisor after its warm-up
+        main(url, families, warm=False)
+    finally:
+        listener.stop()
+
+
+def start_worker(url, families, index):
+    process = multiprocessing.get_context('fork').Process(
+        target=run_worker,
+        args=(url, families, index),
+        name=f'datahub-processor-{index}')
+    process.start()
+
+    logging.info(f'Started worker {process.name} pid={process.pid} families={"+".join(families or ["all"])}')
+    return process
+
+
+def supervise(url, groups):
+    """
+    Runs count worker processes per (families, count) group and restarts any
+    worker that exits until stopped by SIGINT or SIGTERM. Returns the exit
+    code, 1 when a worker kept failing fast and the supervisor gave up.
+    """
+    stopping = False
+    exitcode = 0
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    workers = [families for families, count in groups for _ in range(count)]
+    processes = [start_worker(url, families, index) for index, families in enumerate(workers)]
+
+    # SIGUSR1 writes the sampled stacks and SIGUSR2 toggles profiling, in every worker
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    signal.signal(signal.SIGUSR1, forward)
+    signal.signal(signal.SIGUSR2, forward)
+
+    started = [time.monotonic()] * len(processes)
+    failures = [0] * len(processes)
+    restart_at = [None] * len(processes)
+
+    while not stopping:
+        time.sleep(RESTART_DELAY)
+
+        for index, process in enumerate(processes):
+            now = time.monotonic()
+
+            if stopping:
+                break
+
+            if restart_at[index] is not None:
+                if now >= restart_at[index]:
+                    processes[index] = start_worker(url, workers[index], index)
+                    started[index] = now
+                    restart_at[index] = None
+                continue
+
+            if process.is_alive():
+                continue
+
+            failures[index] = failures[index] + 1 if now - started[index] < STABLE_UPTIME else 0
+
+            if failures[index] >= MAX_FAST_FAILURES:
+                logging.error(f'Worker {process.name} pid={process.pid} exited with code {process.exitcode}, '
+                    f'it failed {failures[index]} times in a row within {STABLE_UPTIME} seconds of starting, giving up')
+                exitcode = 1
+                stopping = True
+                break
+
+            delay = min(MAX_RESTART_DELAY, RESTART_DELAY * 2 ** failures[index])
+            logging.warning(f'Worker {process.name} pid={process.pid} exited with code {process.exitcode}, restarting in {delay} seconds')
+            restart_at[index] = now + delay
+
+    for process in processes:
+        if process.is_alive():
+            os.kill(process.pid, signal.SIGINT)
+
+    deadline = time.monotonic() + STOP_TIMEOUT
+    for process in processes:
+        process.join(max(0, deadline - time.monotonic()))
+        if process.is_alive():
+            process.terminate()
+
+    return exitcode
+
+
 if __name__ == "__main__":
 
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format="[%(asctime)s %(levelname)s %(name)s] %(message)s",
-        stream=sys.stdout)
-        
+    listener = configure_logging(LOG_LEVEL)
+
+    startup.started_at = STARTED
+    startup.phase('import', IMPORTED - STARTED)
 
     url = os.getenv('LEDGER_URL', default=None)
 
@@ -28,6 +239,26 @@ if __name__ == "__main__":
         host = os.getenv('HOSTNAME', default='localhost')
         url = f'tcp://{host}:4004'
 
-    print(f'Connecting to "{url}"')
+    families = os.getenv('LEDGER_FAMILIES', default=None)
+
+    if families:
+        groups = parse_families(families)
+    else:
+        groups = [(None, int(os.getenv('LEDGER_WORKERS', default='1')))]
+
+    logging.info(f'Connecting to "{url}"')
 
-    main(url)
\ No newline at end of file
+    try:
+        if len(groups) == 1 and groups[0][1] == 1:
+            serve_metrics()
+            main(url, groups[0][0])
+        else:
+            # Warm up before forking so every worker starts warm
+            if WARM_UP:
+                check_compression()
+                timed_warm_up()
+            exitcode = supervise(url, groups)
+            if exitcode:
+                sys.exit(exitcode)
+    finally:
+        listener.stop()
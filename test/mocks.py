@@ -1,7 +1,19 @@
 
 
-from typing import List, Dict
+import time
+import random
+from contextlib import contextmanager
+from typing import List, Dict, Optional
 from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from bip32utils import BIP32Key
+from marshmallow_dataclass import class_schema
+from sawtooth_sdk.messaging.future import FutureTimeoutError
+from sawtooth_sdk.processor.exceptions import AuthorizationException
+
+from src.datahub_processor.ledger_dto import GGO, TransferGGORequest, generate_address, AddressPrefix
+from src.datahub_processor.state_codec import encode_state
 
 
 @dataclass
@@ -12,13 +24,30 @@ class Entry:
 @dataclass
 class MockContext:
     states: Dict[str, bytes] = field()
+    receipt_data: List[bytes] = field(default_factory=list)
+
+    # State access made through the context, see StateBudget
+    get_state_calls: int = field(default=0)
+    addresses_read: int = field(default=0)
+    bytes_read: int = field(default=0)
+    set_state_calls: int = field(default=0)
+    addresses_written: int = field(default=0)
+    bytes_written: int = field(default=0)
 
     def set_state(self, new_states, timeout):
-        
+
+        self.set_state_calls += 1
+        self.addresses_written += len(new_states)
+        self.bytes_written += sum(len(data) for data in new_states.values())
+
         for key in new_states:
             self.states[key] = new_states[key]
 
-    def get_state(self, addresses):
+    def get_state(self, addresses, timeout=None):
+
+        self.get_state_calls += 1
+        self.addresses_read += len(addresses)
+        self.bytes_read += sum(len(self.states[add]) for add in addresses if add in self.states)
 
         result = []
 
@@ -32,6 +61,153 @@ class MockContext:
 
         return result
 
+    def add_receipt_data(self, data, timeout=None):
+        self.receipt_data.append(data)
+
+
+@dataclass
+class DeclaredContext(MockContext):
+    """ Only allows the addresses covered by the inputs and outputs of a transaction, as the validator does. """
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+
+    @staticmethod
+    def _covered(addresses, declared) -> bool:
+        return all(any(address.startswith(prefix) for prefix in declared) for address in addresses)
+
+    def set_state(self, new_states, timeout):
+        if not self._covered(new_states, self.outputs):
+            raise AuthorizationException(f'Tried to set unauthorized address: {list(new_states)}')
+        return super().set_state(new_states, timeout)
+
+    def get_state(self, addresses, timeout=None):
+        if not self._covered(addresses, self.inputs):
+            raise AuthorizationException(f'Tried to get unauthorized address: {addresses}')
+        return super().get_state(addresses, timeout)
+
+
+@dataclass
+class StateBudget:
+    """
+    The most validator access a handler may spend on one transaction: get_state
+    and set_state round trips, and optionally addresses and bytes read.
+    """
+    reads: int = field()
+    writes: int = field()
+    addresses: Optional[int] = field(default=None)
+    bytes: Optional[int] = field(default=None)
+
+    def exceeded(self, spent: Dict[str, int]) -> List[str]:
+        limits = {
+            'get_state_calls': self.reads,
+            'set_state_calls': self.writes,
+            'addresses_read': self.addresses,
+            'bytes_read': self.bytes,
+        }
+
+        return [f'{key} {spent[key]} > {limit}' for key, limit in limits.items() if limit is not None and spent[key] > limit]
+
+
+def state_access(context: MockContext) -> Dict[str, int]:
+    return {
+        'get_state_calls': context.get_state_calls,
+        'addresses_read': context.addresses_read,
+        'bytes_read': context.bytes_read,
+        'set_state_calls': context.set_state_calls,
+        'addresses_written': context.addresses_written,
+        'bytes_written': context.bytes_written,
+    }
+
+
+class StateBudgetAssertions:
+    """Mixin for handler tests, asserting the state access of the transactions applied in a block."""
+
+    @contextmanager
+    def assertWithinBudget(self, context: MockContext, budget: StateBudget):
+        """
+        Fails if the transactions applied to context in the block together
+        exceed budget, also when the block raises, e.g. in assertRaises.
+        """
+        before = state_access(context)
+
+        try:
+            yield
+        finally:
+            after = state_access(context)
+            exceeded = budget.exceeded({key: after[key] - before[key] for key in after})
+
+            if exceeded:
+                self.fail(f'State access budget exceeded: {", ".join(exceeded)}')
+
+
+@dataclass
+class StateCall:
+    method: str = field()
+    addresses: int = field()
+    bytes: int = field()
+    duration: float = field()
+    outcome: str = field()
+
+
+@dataclass
+class LatencyContext(MockContext):
+    """
+    MockContext that behaves like a remote validator: every call waits for a
+    simulated round trip of latency +/- jitter seconds.
+
+    A call times out with probability timeout_rate, or when the round trip is
+    longer than the caller's timeout, and is dropped with probability drop_rate.
+    Both raise FutureTimeoutError after the caller's timeout as the SDK context
+    does, or immediately when no timeout was given rather than block forever.
+    Every call is recorded in calls.
+    """
+    latency: float = field(default=0.0)
+    jitter: float = field(default=0.0)
+    timeout_rate: float = field(default=0.0)
+    drop_rate: float = field(default=0.0)
+    seed: Optional[int] = field(default=None)
+    calls: List[StateCall] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._random = random.Random(self.seed)
+
+    def _round_trip(self, method, addresses, size, timeout):
+        delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        draw = self._random.random()
+
+        if draw < self.drop_rate:
+            outcome = 'dropped'
+        elif draw < self.drop_rate + self.timeout_rate or (timeout is not None and delay > timeout):
+            outcome = 'timeout'
+        else:
+            outcome = 'ok'
+
+        if outcome != 'ok':
+            delay = timeout or 0.0
+
+        time.sleep(delay)
+        self.calls.append(StateCall(method, addresses, size, delay, outcome))
+
+        if outcome != 'ok':
+            raise FutureTimeoutError(f'{method} {outcome} after {delay} seconds')
+
+    def get_state(self, addresses, timeout=None):
+        result = super().get_state(addresses, timeout)
+        self._round_trip('get_state', len(addresses), sum(len(e.data) for e in result), timeout)
+        return result
+
+    def set_state(self, new_states, timeout):
+        self._round_trip('set_state', len(new_states), sum(len(d) for d in new_states.values()), timeout)
+        return super().set_state(new_states, timeout)
+
+    def add_receipt_data(self, data, timeout=None):
+        self._round_trip('add_receipt_data', 0, len(data), timeout)
+        return super().add_receipt_data(data, timeout)
+
+    def count(self, method):
+        return len([c for c in self.calls if c.method == method])
+
+
 @dataclass
 class FakeTransactionHeader:
     batcher_public_key: str = field()
@@ -49,3 +225,48 @@ class FakeTransaction:
     header: FakeTransactionHeader = field()
     #header_signature: str = field()
     payload: bytes = field()
+
+
+def fake_transaction(key: BIP32Key, request, inputs: List[str], outputs: List[str]) -> FakeTransaction:
+    """A version 0.1 transaction of the family of request, signed and batched by key."""
+    return FakeTransaction(
+        header=FakeTransactionHeader(
+            batcher_public_key=key.PublicKey().hex(),
+            dependencies=[],
+            family_name=type(request).__name__,
+            family_version="0.1",
+            inputs=inputs,
+            outputs=outputs,
+            signer_public_key=key.PublicKey().hex()),
+        payload=class_schema(type(request))().dumps(request).encode('utf8')
+    )
+
+
+def ggo_state(amount: int) -> bytes:
+    return encode_state(GGO(
+        origin='meaaaa1c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c',
+        amount=amount,
+        begin=datetime(2020,1,1,12, tzinfo=timezone.utc),
+        end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+        tech_type='T12412',
+        fuel_type='F010101',
+        sector='DK1'))
+
+
+class TransferFixture:
+    """
+    setUp for tests applying a transfer of the GGO at ggo_src, stored as ggo,
+    to ggo_dst. The transaction is in transaction, transfer() makes one with
+    other inputs.
+    """
+
+    def setUp(self):
+        self.key = BIP32Key.fromEntropy("the_key_that_owns_the_transferred_ggo".encode())
+        self.ggo_src = generate_address(AddressPrefix.GGO, self.key.PublicKey())
+        self.ggo_dst = generate_address(AddressPrefix.GGO, BIP32Key.fromEntropy("the_key_receiving_the_transferred_ggo".encode()).PublicKey())
+        self.ggo = ggo_state(123)
+        self.transaction = self.transfer([self.ggo_src, self.ggo_dst])
+
+    def transfer(self, inputs: List[str]) -> FakeTransaction:
+        request = TransferGGORequest(origin=self.ggo_src, destination=self.ggo_dst)
+        return fake_transaction(self.key, request, inputs, [self.ggo_src, self.ggo_dst])
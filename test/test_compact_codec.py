@@ -0,0 +1,218 @@
+import unittest
+import pytest
+from datetime import datetime, timezone, timedelta
+
+from bip32utils import BIP32Key
+from marshmallow import ValidationError
+from marshmallow_dataclass import class_schema
+
+from src.datahub_processor.ledger_dto import GGO, GGONext, GGOAction, Measurement, MeasurementType, Settlement, SettlementPart, TransferGGORequest, generate_address, AddressPrefix
+from src.datahub_processor.compact_codec import encode_compact, decode_compact, is_compact, encode_settlement_part, GGO_V1, MEASUREMENT_V1, SETTLEMENT_V1, SETTLEMENT_V2
+from src.datahub_processor.state_codec import encode_state, decode_state
+from src.datahub_processor.compression import is_compressed, decompress
+from src.datahub_processor.transfer_ggo_handler import TransferGGOTransactionHandler
+
+from .mocks import MockContext, FakeTransaction, FakeTransactionHeader
+
+
+ADDRESS = '849c0b1c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c'
+
+
+class TestCompactCodec(unittest.TestCase):
+
+    def states(self):
+        return [
+            GGO(
+                origin=ADDRESS,
+                amount=80,
+                begin=datetime(2020,1,1,12, tzinfo=timezone.utc),
+                end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+                tech_type='T12412',
+                fuel_type='F010101',
+                sector='DK1',
+                next=GGONext(action=GGOAction.SPLIT, addresses=[ADDRESS, 'not-an-address']),
+                emissions={"co2": {"value": 1113342.14, "unit": "g/Wh"}}),
+            GGO(
+                origin='meaaaa1c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c',
+                amount=0,
+                begin=datetime(1969,12,31,23, tzinfo=timezone.utc),
+                end=datetime(1970,1,1,0, tzinfo=timezone.utc),
+                tech_type='',
+                fuel_type='F010101',
+                sector='DK2',
+                next=None,
+                emissions=None),
+            Measurement(
+                amount=2**40,
+                type=MeasurementType.CONSUMPTION,
+                begin=datetime(2020,1,1,12, tzinfo=timezone.utc),
+                end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+                sector='DK1'),
+            Settlement(
+                measurement=ADDRESS,
+                parts=[SettlementPart(ggo=ADDRESS, amount=10), SettlementPart(ggo=ADDRESS, amount=20)]),
+            Settlement(
+                measurement=ADDRESS,
+                parts=[]),
+        ]
+
+
+    @pytest.mark.unittest
+    def test_round_trip(self):
+        for state in self.states():
+            data = encode_state(state, compact=True)
+            json_data = encode_state(state)
+
+            self.assertTrue(is_compact(data))
+            self.assertFalse(is_compact(json_data))
+            self.assertLess(len(data), len(json_data) / 2)
+
+            self.assertEqual(decode_state(type(state), data), state)
+            self.assertEqual(decode_state(type(state), json_data), state)
+            self.assertEqual(encode_state(decode_state(type(state), data)), json_data)
+
+
+    @pytest.mark.unittest
+    def test_tags(self):
+        ggo, _, measurement, settlement, _ = self.states()
+        other_settlement = Settlement(
+            measurement='not-an-address',
+            parts=[SettlementPart(ggo=ADDRESS, amount=10), SettlementPart(ggo=ADDRESS.upper(), amount=20)])
+
+        self.assertEqual(encode_compact(ggo)[0], GGO_V1)
+        self.assertEqual(encode_compact(measurement)[0], MEASUREMENT_V1)
+        self.assertEqual(encode_compact(settlement)[0], SETTLEMENT_V2)
+        self.assertEqual(encode_compact(other_settlement)[0], SETTLEMENT_V1)
+        self.assertEqual(decode_compact(Settlement, encode_compact(other_settlement)), other_settlement)
+        self.assertEqual(len(encode_compact(measurement)), 27)
+
+
+    @pytest.mark.unittest
+    def test_unrepresentable_written_as_json(self):
+        ggo = self.states()[0]
+
+        for begin in [datetime(2020,1,1,12,0,0,5, tzinfo=timezone.utc), datetime(2020,1,1,12, tzinfo=timezone(timedelta(hours=1)))]:
+            ggo.begin = begin
+            self.assertIsNone(encode_compact(ggo))
+            self.assertEqual(encode_state(ggo, compact=True), encode_state(ggo))
+
+        self.assertIsNone(encode_compact(object()))
+
+        ggo = self.states()[1]
+        settlement = self.states()[3]
+
+        for clazz, state, changes in [
+            (GGO, ggo, {'amount': 80.0}),
+            (GGO, ggo, {'origin': None}),
+            (GGO, ggo, {'tech_type': b'T12412'}),
+            (GGO, ggo, {'next': {'action': 'SPLIT', 'addresses': []}}),
+            (Settlement, settlement, {'parts': tuple(settlement.parts)}),
+            (Settlement, settlement, {'parts': [{'ggo': ADDRESS, 'amount': 10}]}),
+        ]:
+            self.assertIsNone(encode_compact(clazz(**{**state.__dict__, **changes})))
+
+        self.assertIsNone(encode_settlement_part('z' * 70, 10))
+        self.assertIsNone(encode_settlement_part(ADDRESS, 2**70))
+
+
+    @pytest.mark.unittest
+    def test_uncoded_sector(self):
+        ggo, _, measurement, _, _ = self.states()
+        ggo.sector = measurement.sector = 'NO1'
+
+        for state in (ggo, measurement):
+            data = encode_compact(state)
+            self.assertIn(b'NO1', data)
+            self.assertEqual(decode_compact(type(state), data), state)
+
+
+    @pytest.mark.unittest
+    def test_invalid_entries(self):
+        ggo, _, measurement, settlement, _ = self.states()
+        data = encode_compact(ggo)
+        total = encode_compact(settlement)
+
+        for clazz, entry in [
+            (Measurement, data),
+            (GGO, data[:-1]),
+            (GGO, data + b'\x00'),
+            (GGO, bytes([GGO_V1])),
+            (Measurement, encode_compact(measurement)[:-1] + b"\x09"),
+            (Settlement, total[:-1]),
+            (Settlement, total[:5] + bytes([total[5] + 1]) + total[6:]),
+            (GGO, data[:25] + b'\x09' + data[26:]),
+            (GGO, bytes([0x8F]) + data[1:]),
+        ]:
+            with self.assertRaises(ValidationError):
+                decode_state(clazz, entry)
+
+        with self.assertRaises(ValidationError):
+            decode_compact(GGO, b'')
+
+
+class TestCompactVersion(unittest.TestCase):
+
+    def transfer(self, context, key, origin, destination, version):
+        transaction = FakeTransaction(
+            header=FakeTransactionHeader(
+                batcher_public_key=key.PublicKey().hex(),
+                dependencies=[],
+                family_name="TransferGGORequest",
+                family_version=version,
+                inputs=[origin, destination],
+                outputs=[origin, destination],
+                signer_public_key=key.PublicKey().hex()),
+            payload=class_schema(TransferGGORequest)().dumps(TransferGGORequest(
+                origin=origin,
+                destination=destination
+            )).encode('utf8')
+        )
+
+        TransferGGOTransactionHandler().apply(transaction, context)
+
+
+    @pytest.mark.unittest
+    def test_versions_read_both_encodings(self):
+        key_1 = BIP32Key.fromEntropy("the_first_owner_of_a_compact_ggo".encode())
+        key_2 = BIP32Key.fromEntropy("the_second_owner_of_a_compact_ggo".encode())
+        ggo_1 = generate_address(AddressPrefix.GGO, key_1.PublicKey())
+        ggo_2 = generate_address(AddressPrefix.GGO, key_2.PublicKey())
+        key_3 = BIP32Key.fromEntropy("the_third_owner_of_a_compact_ggo".encode())
+        ggo_3 = generate_address(AddressPrefix.GGO, key_3.PublicKey())
+        ggo_4 = generate_address(AddressPrefix.GGO, b'the fourth owner')
+
+        ggo = GGO(
+            origin=ADDRESS,
+            amount=123,
+            begin=datetime(2020,1,1,12, tzinfo=timezone.utc),
+            end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+            tech_type='T12412',
+            fuel_type='F010101',
+            sector='DK1',
+            next=None,
+            emissions={"co2": {"value": 1113342.14, "unit": "g/Wh"}, "so2": {"value": 9764446, "unit": "g/Wh"}})
+
+        context = MockContext(states={ggo_1: encode_state(ggo)})
+
+        # Version 0.2 reads the legacy JSON entry and writes compact entries
+        self.transfer(context, key_1, ggo_1, ggo_2, '0.2')
+
+        self.assertTrue(is_compact(context.states[ggo_1]))
+        self.assertTrue(is_compact(context.states[ggo_2]))
+        self.assertEqual(decode_state(GGO, context.states[ggo_1]).next, GGONext(action=GGOAction.TRANSFER, addresses=[ggo_2]))
+
+        # Version 0.1 reads the compact entry and keeps writing JSON
+        self.transfer(context, key_2, ggo_2, ggo_3, '0.1')
+
+        self.assertFalse(is_compact(context.states[ggo_2]))
+        self.assertFalse(is_compact(context.states[ggo_3]))
+        self.assertEqual(decode_state(GGO, context.states[ggo_3]).origin, ggo_2)
+        self.assertEqual(decode_state(GGO, context.states[ggo_3]).amount, 123)
+
+        # Version 0.3 also compresses the compact entries
+        self.transfer(context, key_3, ggo_3, ggo_4, '0.3')
+
+        self.assertTrue(is_compressed(context.states[ggo_3]))
+        self.assertTrue(is_compressed(context.states[ggo_4]))
+        self.assertTrue(is_compact(decompress(context.states[ggo_4])))
+        self.assertEqual(decode_state(GGO, context.states[ggo_4]).emissions, ggo.emissions)
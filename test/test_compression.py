@@ -0,0 +1,151 @@
+import json
+import zlib
+import hashlib
+import unittest
+import pytest
+from unittest.mock import patch
+from datetime import datetime, timezone
+
+from marshmallow import ValidationError
+
+from src.datahub_processor.ledger_dto import GGO, GGONext, GGOAction, Settlement, SettlementPart, Measurement, MeasurementType
+from src.datahub_processor import compression
+from src.datahub_processor.compression import compress, decompress, is_compressed, check_compressor, dictionary_path, get_dictionary, golden_sample, CompressorMismatch, MIN_SIZE
+from src.datahub_processor.state_codec import encode_state, decode_state
+from src.datahub_processor.schema_registry import get_schema
+from src.datahub_processor.compact_codec import is_compact
+
+
+ADDRESS = '849c0b1c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c'
+
+# Shipped dictionaries are part of the state format and must never change
+DICTIONARIES = {
+    1: '3f9c905d0eab7c52f2f54a5de33a1ce6011bcf6a8275714b58d472edf06fbb48',
+}
+
+# The entries written by version 0.3, (type, compact): (length, SHA-256),
+# which every processor of a network must reproduce byte for byte. The JSON
+# entries are compressed with sorted keys, their own key order is the schema's.
+GOLDEN = {
+    ('GGO', False): (207, '32c5e03b240fa04068bdf4c1bd89a19d47d6d267de1d6a5d79e4ffb789076715'),
+    ('GGO', True): (121, '5815803616ff95d03851d40695aa7269597ec640a097190d9eef4accf2b8ee6e'),
+    ('Settlement', False): (199, '329dba31daafc17cdac996d64cf609dd37e225983b24fe07c6d35fb32bd43429'),
+    ('Settlement', True): (138, '3a402701ed5d7eb834e9f5a65cf1c68a3d0345af3f21e6d889233484f4619d10'),
+    ('Measurement', False): (35, '3d2339c1712faa4276f0c2d6478060ce92f6b74ed076bf8836f6d9cd4d6660d4'),
+    ('Measurement', True): (27, '3e0e390e8b50008ffe5eced118dcfa03f0c345c0d7b5741ff6e9495575209669'),
+}
+
+
+class TestCompression(unittest.TestCase):
+
+    def states(self):
+        return [
+            GGO(
+                origin=ADDRESS,
+                amount=80,
+                begin=datetime(2020,1,1,12, tzinfo=timezone.utc),
+                end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+                tech_type='T12412',
+                fuel_type='F010101',
+                sector='DK1',
+                next=GGONext(action=GGOAction.SPLIT, addresses=[ADDRESS, ADDRESS]),
+                emissions={"co2": {"value": 1113342.14, "unit": "g/Wh"}, "so2": {"value": 9764446, "unit": "g/Wh"}}),
+            Settlement(
+                measurement=ADDRESS,
+                parts=[SettlementPart(ggo=ADDRESS[:-2] + f'{i:02x}', amount=10 * i) for i in range(20)]),
+        ]
+
+
+    def measurement(self):
+        return Measurement(
+            amount=100,
+            type=MeasurementType.PRODUCTION,
+            begin=datetime(2020,1,1,12, tzinfo=timezone.utc),
+            end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+            sector='DK1')
+
+
+    @pytest.mark.unittest
+    def test_dictionaries_unchanged(self):
+        for version, digest in DICTIONARIES.items():
+            with open(dictionary_path(version), 'rb') as f:
+                self.assertEqual(hashlib.sha256(f.read()).hexdigest(), digest)
+
+        self.assertLessEqual(len(get_dictionary(1)), 32 * 1024)
+
+
+    @pytest.mark.unittest
+    def test_golden_entries(self):
+        for state in self.states() + [self.measurement()]:
+            for compact in (False, True):
+                if compact:
+                    data = encode_state(state, compact, compressed=True)
+                else:
+                    data = compress(json.dumps(get_schema(type(state)).dump(state), sort_keys=True).encode('utf8'))
+
+                self.assertEqual((len(data), hashlib.sha256(data).hexdigest()), GOLDEN[type(state).__name__, compact])
+                self.assertEqual(decode_state(type(state), data), state)
+
+
+    @pytest.mark.unittest
+    def test_compressor_mismatch(self):
+        plain = encode_state(self.states()[0])
+        compressors = dict(compression._compressors)
+        compression._compressors.clear()
+
+        try:
+            with patch.dict(compression.GOLDEN_DIGESTS, {1: hashlib.sha256(b'other zlib').hexdigest()}):
+                with self.assertRaises(CompressorMismatch):
+                    compress(plain)
+                self.assertFalse(check_compressor())
+                self.assertEqual(compression._compressors, {})
+        finally:
+            compression._compressors.update(compressors)
+
+        self.assertTrue(check_compressor())
+        self.assertTrue(is_compressed(compress(plain)))
+        self.assertGreater(len(golden_sample(1)), 4096)
+
+
+    @pytest.mark.unittest
+    def test_round_trip(self):
+        for state in self.states():
+            for compact in (False, True):
+                plain = encode_state(state, compact)
+                data = encode_state(state, compact, compressed=True)
+
+                self.assertTrue(is_compressed(data))
+                self.assertFalse(is_compressed(plain))
+                self.assertEqual(data[0], 0xF1)
+                self.assertLess(len(data), len(plain))
+                self.assertEqual(decompress(data), plain)
+                self.assertEqual(decode_state(type(state), data), state)
+
+
+    @pytest.mark.unittest
+    def test_dictionary_helps(self):
+        plain = encode_state(self.states()[0])
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+        without = compressor.compress(plain) + compressor.flush()
+
+        self.assertLess(len(compress(plain)), len(without) * 0.9)
+
+
+    @pytest.mark.unittest
+    def test_small_entries_not_compressed(self):
+        data = encode_state(self.measurement(), compact=True, compressed=True)
+
+        self.assertLess(len(data), MIN_SIZE)
+        self.assertTrue(is_compact(data))
+
+        random = hashlib.sha512(b'a').digest() + hashlib.sha512(b'b').digest()
+        self.assertEqual(compress(random), random)
+
+
+    @pytest.mark.unittest
+    def test_invalid_entries(self):
+        data = compress(encode_state(self.states()[0]))
+
+        for entry in [data[:-3], data + b'\x00', bytes([0xF1]) + b'not deflate', bytes([0xFF]) + data[1:]]:
+            with self.assertRaises(ValidationError):
+                decode_state(GGO, entry)
@@ -0,0 +1,130 @@
+import unittest
+import pytest
+
+from bip32utils import BIP32Key
+from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
+
+from src.datahub_processor.ledger_dto import SplitGGORequest, SplitGGOPart, generate_address, AddressPrefix
+from src.datahub_processor.cost import TransactionCost, encode_cost, decode_cost, COST
+from src.datahub_processor.split_ggo_handler import SplitGGOTransactionHandler
+
+from .mocks import MockContext, fake_transaction, ggo_state
+
+
+class FailingReceiptContext(MockContext):
+
+    def __init__(self, states, error):
+        super().__init__(states)
+        self.error = error
+
+    def add_receipt_data(self, data, timeout=None):
+        raise self.error
+
+
+class TestCostRecord(unittest.TestCase):
+
+    @pytest.mark.unittest
+    def test_round_trip(self):
+        cost = TransactionCost(addresses_read=3, addresses_written=2, bytes_read=512, bytes_written=1024, cpu_microseconds=1500)
+
+        data = encode_cost(cost)
+
+        self.assertEqual(len(data), COST.size)
+        self.assertEqual(decode_cost(data), cost)
+
+
+    @pytest.mark.unittest
+    def test_clamped(self):
+        cost = TransactionCost(addresses_read=2**40, addresses_written=-1, bytes_read=0, bytes_written=0, cpu_microseconds=2**70)
+
+        self.assertEqual(decode_cost(encode_cost(cost)), TransactionCost(2**32 - 1, 0, 0, 0, 2**64 - 1))
+
+
+    @pytest.mark.unittest
+    def test_invalid(self):
+        data = encode_cost(TransactionCost(1, 1, 1, 1, 1))
+
+        for invalid in [data[:-1], b'\x00' + data[1:], b'']:
+            with self.assertRaises(ValueError):
+                decode_cost(invalid)
+
+
+class TestCostReceipt(unittest.TestCase):
+
+    def setUp(self):
+        key = BIP32Key.fromEntropy('costed_split_owner_entropy'.encode())
+        self.ggo = generate_address(AddressPrefix.GGO, key.PublicKey())
+        self.parts = [generate_address(AddressPrefix.GGO, BIP32Key.fromEntropy(f'costed_split_part_{i}'.encode()).PublicKey()) for i in range(3)]
+
+        self.state = ggo_state(90)
+        self.transaction = fake_transaction(key, SplitGGORequest(
+            origin=self.ggo,
+            parts=[SplitGGOPart(address=address, amount=30) for address in self.parts]
+        ), [self.ggo] + self.parts, [self.ggo] + self.parts)
+
+
+    @pytest.mark.unittest
+    def test_accepted(self):
+        context = MockContext(states={self.ggo: self.state})
+
+        SplitGGOTransactionHandler().apply(self.transaction, context)
+
+        self.assertEqual(len(context.receipt_data), 1)
+        cost = decode_cost(context.receipt_data[0])
+
+        self.assertEqual(cost.addresses_read, 4)
+        self.assertEqual(cost.addresses_written, 4)
+        self.assertEqual(cost.bytes_read, len(self.state))
+        self.assertEqual(cost.bytes_written, sum(len(context.states[address]) for address in [self.ggo] + self.parts))
+        self.assertGreater(cost.cpu_microseconds, 0)
+
+
+    @pytest.mark.unittest
+    def test_prefetch_not_counted(self):
+        # An input the handler never reads is only fetched by the prefetch
+        unread = generate_address(AddressPrefix.GGO, b'declared but not read')
+        self.transaction.header.inputs.append(unread)
+        costs = []
+
+        for prefetch in [False, True]:
+            context = MockContext(states={self.ggo: self.state, unread: self.state})
+            handler = SplitGGOTransactionHandler()
+            handler.PREFETCH_INPUTS = prefetch
+
+            handler.apply(self.transaction, context)
+            costs.append(decode_cost(context.receipt_data[0])._replace(cpu_microseconds=0))
+
+        self.assertEqual(costs[0], costs[1])
+        self.assertEqual((costs[0].addresses_read, costs[0].bytes_read), (4, len(self.state)))
+
+
+    @pytest.mark.unittest
+    def test_invalid_not_recorded(self):
+        context = MockContext(states={})
+
+        with self.assertRaises(InvalidTransaction):
+            SplitGGOTransactionHandler().apply(self.transaction, context)
+
+        self.assertEqual(context.receipt_data, [])
+
+
+    @pytest.mark.unittest
+    def test_disabled(self):
+        context = MockContext(states={self.ggo: self.state})
+        handler = SplitGGOTransactionHandler()
+        handler.COST_RECEIPTS = False
+
+        handler.apply(self.transaction, context)
+
+        self.assertEqual(context.receipt_data, [])
+
+
+    @pytest.mark.unittest
+    def test_failed_receipt_is_internal_error(self):
+        handler = SplitGGOTransactionHandler()
+
+        for error in [InternalError('An unknown error has occured.'), TimeoutError('add_receipt_data')]:
+            with self.assertRaises(InternalError) as raised:
+                handler.apply(self.transaction, FailingReceiptContext({self.ggo: self.state}, error))
+
+            self.assertEqual(str(raised.exception), 'An unknown error has occured.')
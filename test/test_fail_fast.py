@@ -0,0 +1,125 @@
+import unittest
+import pytest
+from datetime import datetime, timezone
+
+from bip32utils import BIP32Key
+from marshmallow_dataclass import class_schema
+from sawtooth_sdk.processor.exceptions import InvalidTransaction
+
+from src.datahub_processor import PublishMeasurementTransactionHandler, IssueGGOTransactionHandler, SplitGGOTransactionHandler, TransferGGOTransactionHandler, RetireGGOTransactionHandler, SettlementHandler
+from src.datahub_processor.ledger_dto import GGO, Measurement, MeasurementType, GGONext, GGOAction, generate_address, AddressPrefix
+from src.datahub_processor.ledger_dto import IssueGGORequest, SplitGGORequest, SplitGGOPart, TransferGGORequest, RetireGGORequest, SettlementRequest
+from src.datahub_processor.state_codec import encode_state
+
+from .mocks import MockContext, FakeTransaction, FakeTransactionHeader
+
+
+BEGIN = datetime(2020,1,1,12, tzinfo=timezone.utc)
+END = datetime(2020,1,1,13, tzinfo=timezone.utc)
+
+
+def key(name: str) -> BIP32Key:
+    return BIP32Key.fromEntropy(f'fail_fast_{name}_key_entropy'.encode())
+
+
+class TestFailFast(unittest.TestCase):
+    """Invalid transactions are rejected with their usual message before the state reads they do not need."""
+
+    def setUp(self):
+        self.owner = key('owner')
+        self.consumer = key('consumer')
+        self.stranger = key('stranger')
+
+        self.ggo = generate_address(AddressPrefix.GGO, self.owner.PublicKey())
+        self.destination = generate_address(AddressPrefix.GGO, key('destination').PublicKey())
+        self.production = generate_address(AddressPrefix.MEASUREMENT, key('producer').PublicKey())
+        self.consumption = generate_address(AddressPrefix.MEASUREMENT, self.consumer.PublicKey())
+        self.settlement = generate_address(AddressPrefix.SETTLEMENT, self.consumer.PublicKey())
+
+        self.retired = [generate_address(AddressPrefix.GGO, key(f'retired_{i}').PublicKey()) for i in range(10)]
+
+        self.states = {
+            self.ggo: encode_state(GGO(origin=self.production, amount=100, begin=BEGIN, end=END, sector='DK1', tech_type='T12412', fuel_type='F010101')),
+            self.production: encode_state(Measurement(amount=100, type=MeasurementType.PRODUCTION, begin=BEGIN, end=END, sector='DK1')),
+            self.consumption: encode_state(Measurement(amount=1000, type=MeasurementType.CONSUMPTION, begin=BEGIN, end=END, sector='DK1')),
+        }
+
+        for address in self.retired:
+            self.states[address] = encode_state(GGO(origin=self.production, amount=10, begin=BEGIN, end=END, sector='DK1', tech_type='T12412', fuel_type='F010101',
+                next=GGONext(action=GGOAction.RETIRE, addresses=[self.settlement])))
+
+
+    def apply(self, handler, request, signer: BIP32Key, payload: bytes = None):
+        transaction = FakeTransaction(
+            header=FakeTransactionHeader(
+                batcher_public_key=signer.PublicKey().hex(),
+                dependencies=[],
+                family_name=handler.family_name,
+                family_version='0.1',
+                inputs=[],
+                outputs=[self.production],
+                signer_public_key=signer.PublicKey().hex()),
+            payload=payload if payload is not None else class_schema(type(request))().dumps(request).encode('utf8')
+        )
+
+        context = MockContext(states=dict(self.states))
+
+        with self.assertRaises(InvalidTransaction) as invalid_transaction:
+            handler.apply(transaction, context)
+
+        return str(invalid_transaction.exception), context
+
+
+    @pytest.mark.unittest
+    def test_payload_before_state(self):
+        message, context = self.apply(PublishMeasurementTransactionHandler(), None, self.owner, b'{"amount": -1, "type": "PRODUCTION", "begin": "2020-01-01T12:00:00+00:00", "end": "2020-01-01T13:00:00+00:00", "sector": "DK1"}')
+
+        self.assertEqual(message, "{'amount': ['Must be greater than or equal to 0.']}")
+        self.assertEqual(context.get_state_calls, 0)
+
+
+    @pytest.mark.unittest
+    def test_signer_before_state(self):
+        requests = [
+            (SplitGGOTransactionHandler(), SplitGGORequest(origin=self.ggo, parts=[SplitGGOPart(address=self.destination, amount=100)])),
+            (TransferGGOTransactionHandler(), TransferGGORequest(origin=self.ggo, destination=self.destination)),
+            (RetireGGOTransactionHandler(), RetireGGORequest(origin=self.ggo, settlement_address=self.settlement)),
+        ]
+
+        for handler, request in requests:
+            message, context = self.apply(handler, request, self.stranger)
+
+            self.assertEqual(message, 'Invalid key for GGO')
+            self.assertEqual(context.get_state_calls, 0)
+
+
+    @pytest.mark.unittest
+    def test_settlement_signer_before_ggos(self):
+        request = SettlementRequest(settlement_address=self.settlement, measurement_address=self.consumption, ggo_addresses=self.retired)
+
+        message, context = self.apply(SettlementHandler(), request, self.stranger)
+
+        self.assertEqual(message, 'Invalid key for measurement')
+        self.assertEqual((context.get_state_calls, context.addresses_read), (1, 2))
+
+        # Duplicates in the request are rejected before any read
+        request.ggo_addresses = self.retired + self.retired[:1]
+        message, context = self.apply(SettlementHandler(), request, self.consumer)
+
+        self.assertEqual(message, 'GGO already part of settlement')
+        self.assertEqual(context.get_state_calls, 0)
+
+
+    @pytest.mark.unittest
+    def test_cheap_checks_before_destination_reads(self):
+        message, context = self.apply(SplitGGOTransactionHandler(),
+            SplitGGORequest(origin=self.ggo, parts=[SplitGGOPart(address=self.destination, amount=60)]), self.owner)
+
+        self.assertEqual(message, 'The sum of the parts does not equal the whole')
+        self.assertEqual(context.get_state_calls, 1)
+
+        message, context = self.apply(IssueGGOTransactionHandler(),
+            IssueGGORequest(origin=self.consumption, destination=self.destination, tech_type='T12412', fuel_type='F010101'), self.owner)
+
+        self.assertEqual(message, 'Measurement is not of type Production!')
+        self.assertEqual(context.get_state_calls, 1)
@@ -5,11 +5,15 @@ import json
 from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
 from src.datahub_processor.issue_ggo_transaction_handler import IssueGGOTransactionHandler
  
-from .mocks import MockContext, FakeTransaction, FakeTransactionHeader
+from .mocks import MockContext, FakeTransaction, FakeTransactionHeader, StateBudget, StateBudgetAssertions
 
 
 
-class TestIssueGGO(unittest.TestCase):
+# get_state and set_state round trips, addresses and bytes read a transaction may make
+BUDGET = StateBudget(reads=2, writes=1, addresses=2, bytes=512)
+
+
+class TestIssueGGO(StateBudgetAssertions, unittest.TestCase):
 
     def create_fake_transaction(self, inputs, outputs, payload):
         
@@ -32,8 +36,12 @@ class TestIssueGGO(unittest.TestCase):
         
         self.assertEqual(handler.family_name, 'IssueGGORequest')
 
-        self.assertEqual(len(handler.family_versions), 1)
+        self.assertEqual(len(handler.family_versions), 5)
         self.assertIn('0.1', handler.family_versions)
+        self.assertIn('0.2', handler.family_versions)
+        self.assertIn('0.3', handler.family_versions)
+        self.assertIn('0.4', handler.family_versions)
+        self.assertIn('0.5', handler.family_versions)
 
         self.assertEqual(len(handler.namespaces), 1)
         self.assertIn('849c0b', handler.namespaces)
@@ -79,7 +87,8 @@ class TestIssueGGO(unittest.TestCase):
             payload=payload)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            IssueGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                IssueGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Address "mea8391c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c" does not contain a valid Measurement.')
 
@@ -117,7 +126,8 @@ class TestIssueGGO(unittest.TestCase):
             payload=payload)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            IssueGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                IssueGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Address "mea8391c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c" does not contain a valid Measurement.')
 
@@ -163,7 +173,8 @@ class TestIssueGGO(unittest.TestCase):
             payload=payload)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            IssueGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                IssueGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Measurement is not of type Production!')
 
@@ -208,7 +219,8 @@ class TestIssueGGO(unittest.TestCase):
             outputs=[ggo_add],
             payload=payload)
 
-        IssueGGOTransactionHandler().apply(transaction, context)
+        with self.assertWithinBudget(context, BUDGET):
+            IssueGGOTransactionHandler().apply(transaction, context)
         self.assertIn(ggo_add, context.states)
 
         obj = json.loads(context.states[ggo_add].decode('utf8'))
@@ -274,10 +286,12 @@ class TestIssueGGO(unittest.TestCase):
             outputs=[ggo_add],
             payload=payload)
 
-        IssueGGOTransactionHandler().apply(transaction, context)
+        with self.assertWithinBudget(context, BUDGET):
+            IssueGGOTransactionHandler().apply(transaction, context)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            IssueGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                IssueGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'GGO already issued!')
 
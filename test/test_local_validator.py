@@ -0,0 +1,109 @@
+import unittest
+import pytest
+from datetime import datetime, timezone
+
+from bip32utils import BIP32Key
+from marshmallow_dataclass import class_schema
+from sawtooth_sdk.protobuf.processor_pb2 import TpProcessResponse
+
+from src.datahub_processor.ledger_dto import GGO, PublishMeasurementRequest, IssueGGORequest, TransferGGORequest, MeasurementType, generate_address, AddressPrefix
+
+from .mocks import FakeTransaction, FakeTransactionHeader
+from .validator import LocalValidator, run_main
+
+
+FAMILIES = ['PublishMeasurementRequest', 'IssueGGORequest', 'TransferGGORequest']
+
+
+class TestLocalValidator(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.validator = LocalValidator()
+        cls.processor = cls.validator.start_processor(run_main)
+        cls.validator.wait_for_registration(FAMILIES)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.validator.shutdown(cls.processor)
+        cls.validator.close()
+
+    def create_transaction(self, request, key, inputs, outputs):
+        return FakeTransaction(
+            header=FakeTransactionHeader(
+                batcher_public_key=key.PublicKey().hex(),
+                dependencies=[],
+                family_name=type(request).__name__,
+                family_version="0.1",
+                inputs=inputs,
+                outputs=outputs,
+                signer_public_key=key.PublicKey().hex()),
+            payload=class_schema(type(request))().dumps(request).encode('utf8')
+        )
+
+
+    @pytest.mark.localvalidatortest
+    def test_publish_issue_transfer(self):
+        master_key = BIP32Key.fromEntropy("the_local_validator_master_key".encode())
+        meter_key = master_key.ChildKey(1)
+        ggo_key = master_key.ChildKey(2)
+
+        measurement_address = generate_address(AddressPrefix.MEASUREMENT, meter_key.PublicKey())
+        ggo_address = generate_address(AddressPrefix.GGO, meter_key.PublicKey())
+        destination_address = generate_address(AddressPrefix.GGO, ggo_key.PublicKey())
+
+        responses = self.validator.run([
+            self.create_transaction(PublishMeasurementRequest(
+                begin=datetime(2020,1,1,12, tzinfo=timezone.utc),
+                end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+                sector='DK1',
+                type=MeasurementType.PRODUCTION,
+                amount=1024
+            ), meter_key, [measurement_address], [measurement_address]),
+            self.create_transaction(IssueGGORequest(
+                origin=measurement_address,
+                destination=ggo_address,
+                tech_type='T124124',
+                fuel_type='F12412'
+            ), meter_key, [measurement_address, ggo_address], [ggo_address]),
+            self.create_transaction(TransferGGORequest(
+                origin=ggo_address,
+                destination=destination_address
+            ), meter_key, [ggo_address, destination_address], [ggo_address, destination_address]),
+        ], in_flight=3)
+
+        self.assertEqual([r.status for r in responses], [TpProcessResponse.OK] * 3)
+
+        ggo = GGO.get_schema().loads(self.validator.states[destination_address])
+        self.assertEqual(ggo.origin, ggo_address)
+        self.assertEqual(ggo.amount, 1024)
+
+
+    @pytest.mark.localvalidatortest
+    def test_rejected_writes_discarded(self):
+        key = BIP32Key.fromEntropy("the_local_validator_other_key".encode())
+        address = generate_address(AddressPrefix.MEASUREMENT, key.PublicKey())
+
+        request = PublishMeasurementRequest(
+            begin=datetime(2020,1,1,12, tzinfo=timezone.utc),
+            end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+            sector='DK1',
+            type=MeasurementType.PRODUCTION,
+            amount=10
+        )
+
+        responses = self.validator.run([
+            self.create_transaction(request, key, [], [address]),
+            self.create_transaction(request, key, [address], [address]),
+            self.create_transaction(request, key, [address], [address]),
+        ])
+
+        # Reading outside the inputs is refused by the validator,
+        # the handler rejects the transaction as invalid
+        self.assertEqual([r.status for r in responses], [
+            TpProcessResponse.INVALID_TRANSACTION,
+            TpProcessResponse.OK,
+            TpProcessResponse.INVALID_TRANSACTION,
+        ])
+        self.assertEqual(responses[2].message, f'Address already in use "{address}"!')
+        self.assertIn(address, self.validator.states)
@@ -0,0 +1,156 @@
+import io
+import logging
+import unittest
+import pytest
+from unittest import mock
+
+from sawtooth_sdk.processor.exceptions import InvalidTransaction
+
+from src.datahub_processor import log
+from src.datahub_processor.log import RejectionSampler
+
+
+class TestRejectionSampler(unittest.TestCase):
+
+    @pytest.mark.unittest
+    def test_sampled_per_reason(self):
+        sampler = RejectionSampler(10)
+
+        with mock.patch('time.monotonic', return_value=100):
+            self.assertEqual(sampler.sample('Family', 'Address "aaaaaaaaaaaaaaaa01" in use'), 0)
+            self.assertIsNone(sampler.sample('Family', 'Address "aaaaaaaaaaaaaaaa02" in use'))
+            self.assertIsNone(sampler.sample('Family', 'Address "aaaaaaaaaaaaaaaa03" in use'))
+            self.assertEqual(sampler.sample('Family', 'Other reason'), 0)
+            self.assertEqual(sampler.sample('Other family', 'Other reason'), 0)
+
+        with mock.patch('time.monotonic', return_value=105):
+            self.assertIsNone(sampler.sample('Family', 'Other reason'))
+
+        with mock.patch('time.monotonic', return_value=110):
+            self.assertEqual(sampler.sample('Family', 'Address "aaaaaaaaaaaaaaaa04" in use'), 2)
+            self.assertEqual(sampler.sample('Family', 'Other reason'), 1)
+
+
+    @pytest.mark.unittest
+    def test_disabled(self):
+        sampler = RejectionSampler(0)
+
+        self.assertEqual(sampler.sample('Family', 'reason'), 0)
+        self.assertEqual(sampler.sample('Family', 'reason'), 0)
+
+
+    @pytest.mark.unittest
+    def test_reasons_bounded(self):
+        sampler = RejectionSampler(10)
+        sampler.MAX_REASONS = 2
+
+        with mock.patch('time.monotonic', return_value=100):
+            self.assertEqual(sampler.sample('Family', 'first'), 0)
+            self.assertEqual(sampler.sample('Family', 'second'), 0)
+            self.assertIsNone(sampler.sample('Family', 'first'))
+
+            # A third reason forgets the others, which are logged again
+            self.assertEqual(sampler.sample('Family', 'third'), 0)
+            self.assertEqual(sampler.sample('Family', 'first'), 0)
+
+
+class TestLog(unittest.TestCase):
+
+    def setUp(self):
+        log.sampler = RejectionSampler(10)
+
+    @pytest.mark.unittest
+    def test_rejected_without_traceback(self):
+        try:
+            raise InvalidTransaction('GGO already has been used')
+        except InvalidTransaction as ex:
+            error = ex
+
+        with self.assertLogs('datahub_processor', logging.ERROR) as logs:
+            log.rejected('Family', error)
+            log.rejected('Family', error)
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].getMessage(), 'Family - InvalidTransaction: GGO already has been used (0 similar suppressed)')
+        self.assertIsNone(logs.records[0].exc_info)
+
+        with mock.patch.object(log, 'INVALID_TRACEBACKS', True), self.assertLogs('datahub_processor', logging.ERROR) as logs:
+            log.rejected('Family', InvalidTransaction('Invalid key for GGO'))
+
+        self.assertIs(logs.records[0].exc_info[0], InvalidTransaction)
+
+
+    @pytest.mark.unittest
+    def test_rejected_not_sampled_when_disabled(self):
+        level = log.logger.level
+        log.logger.setLevel(logging.CRITICAL)
+
+        try:
+            with mock.patch.object(log.sampler, 'sample') as sample:
+                log.rejected('Family', InvalidTransaction('GGO already has been used'))
+        finally:
+            log.logger.setLevel(level)
+
+        sample.assert_not_called()
+
+
+    @pytest.mark.unittest
+    def test_accepted_lazy(self):
+        value = mock.MagicMock()
+        value.__str__.return_value = 'formatted'
+
+        with self.assertLogs('datahub_processor', logging.WARNING):
+            log.accepted('Family', field=value)
+            log.logger.warning('INFO is not enabled')
+
+        value.__str__.assert_not_called()
+
+        with self.assertLogs('datahub_processor', logging.INFO) as logs:
+            log.accepted('Family', field=value, other=1)
+
+        self.assertEqual(logs.records[0].fields, {'field': value, 'other': 1})
+        self.assertEqual(logs.records[0].getMessage(), 'Family - field=formatted other=1')
+
+
+    @pytest.mark.unittest
+    def test_configure_formats_on_listener(self):
+        root = logging.getLogger()
+        handlers, level = root.handlers, root.level
+        stream = io.StringIO()
+
+        try:
+            listener = log.configure('INFO', stream)
+
+            with mock.patch.object(log.Fields, '__str__', autospec=True, side_effect=lambda fields: 'fields') as formatted:
+                log.accepted('Family', field=1)
+                log.logger.debug('not enabled')
+                listener.stop()
+
+            self.assertEqual(formatted.call_count, 1)
+            self.assertRegex(stream.getvalue(), r'^\[.* INFO datahub_processor\] Family - fields\n$')
+        finally:
+            root.handlers, root.level = handlers, level
+
+
+    @pytest.mark.unittest
+    def test_sdk_rejections_sampled(self):
+        root = logging.getLogger()
+        sdk = logging.getLogger(log.SDK_LOGGER)
+        handlers, level = root.handlers, root.level
+        stream = io.StringIO()
+
+        try:
+            listener = log.configure('INFO', stream)
+
+            for address in ('aaaaaaaaaaaaaaaa01', 'aaaaaaaaaaaaaaaa02'):
+                sdk.warning('Invalid Transaction %s', InvalidTransaction(f'Address "{address}" in use'))
+            sdk.warning('internal error: %s', 'An unknown error has occured.')
+            listener.stop()
+
+            self.assertEqual([line.split('] ')[1] for line in stream.getvalue().splitlines()], [
+                'Invalid Transaction Address "aaaaaaaaaaaaaaaa01" in use (0 similar suppressed)',
+                'internal error: An unknown error has occured.',
+            ])
+        finally:
+            root.handlers, root.level = handlers, level
+            sdk.removeFilter(log.rejection_filter)
@@ -0,0 +1,140 @@
+import unittest
+import pytest
+import urllib.request
+import urllib.error
+
+from sawtooth_sdk.processor.exceptions import InvalidTransaction
+
+from src.datahub_processor import metrics
+from src.datahub_processor.metrics import Counter, Gauge, Histogram, start_http_server
+from src.datahub_processor.transfer_ggo_handler import TransferGGOTransactionHandler
+
+from .mocks import MockContext, TransferFixture
+
+
+class TestMetrics(unittest.TestCase):
+
+    @pytest.mark.unittest
+    def test_render(self):
+        counter = Counter('test_total', 'A counter.', ('family',))
+        counter.inc(('A',))
+        counter.inc(('A',), 2)
+        counter.inc(('B"',))
+
+        self.assertEqual(counter.render(), '\n'.join([
+            '# HELP test_total A counter.',
+            '# TYPE test_total counter',
+            'test_total{family="A"} 3',
+            'test_total{family="B\\""} 1',
+        ]))
+
+        gauge = Gauge('test_bytes', 'A gauge.')
+        gauge.set(5)
+        gauge.set(2)
+
+        self.assertEqual(gauge.value(), 2)
+        self.assertEqual(gauge.render(), '\n'.join([
+            '# HELP test_bytes A gauge.',
+            '# TYPE test_bytes gauge',
+            'test_bytes 2',
+        ]))
+
+        histogram = Histogram('test_seconds', 'A histogram.', buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(10)
+
+        self.assertEqual(histogram.render(), '\n'.join([
+            '# HELP test_seconds A histogram.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{le="0.1"} 2',
+            'test_seconds_bucket{le="1"} 3',
+            'test_seconds_bucket{le="+Inf"} 4',
+            'test_seconds_sum 10.65',
+            'test_seconds_count 4',
+        ]))
+
+
+    @pytest.mark.unittest
+    def test_http_endpoint(self):
+        server = start_http_server(0, '127.0.0.1')
+
+        try:
+            url = f'http://127.0.0.1:{server.server_port}'
+
+            with urllib.request.urlopen(f'{url}/metrics') as response:
+                body = response.read().decode('utf8')
+
+            self.assertIn('# TYPE datahub_processor_apply_seconds histogram', body)
+            self.assertIn('# TYPE datahub_processor_cached_context_transactions_total counter', body)
+
+            with self.assertRaises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(f'{url}/other')
+            self.assertEqual(error.exception.code, 404)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestHandlerMetrics(TransferFixture, unittest.TestCase):
+
+    FAMILY = 'TransferGGORequest'
+
+    def snapshot(self):
+        labels = (self.FAMILY,)
+        return {
+            'latency': metrics.apply_seconds.count(labels),
+            'accepted': metrics.transactions.value((self.FAMILY, metrics.ACCEPTED)),
+            'invalid': metrics.transactions.value((self.FAMILY, metrics.INVALID)),
+            'get_state_calls': metrics.get_state_calls.value(labels),
+            'set_state_calls': metrics.set_state_calls.value(labels),
+            'read_bytes': metrics.state_read_bytes.value(labels),
+            'written_bytes': metrics.state_written_bytes.value(labels),
+            'read_entries': metrics.state_entry_bytes.count((self.FAMILY, 'read')),
+            'written_entries': metrics.state_entry_bytes.count((self.FAMILY, 'write')),
+        }
+
+    def delta(self, before):
+        after = self.snapshot()
+        return {key: after[key] - before[key] for key in after}
+
+
+    @pytest.mark.unittest
+    def test_accepted(self):
+        context = MockContext(states={self.ggo_src: self.ggo})
+        before = self.snapshot()
+
+        TransferGGOTransactionHandler().apply(self.transaction, context)
+
+        delta = self.delta(before)
+        written = len(context.states[self.ggo_src]) + len(context.states[self.ggo_dst])
+
+        self.assertEqual(delta, {
+            'latency': 1,
+            'accepted': 1,
+            'invalid': 0,
+            'get_state_calls': 2,
+            'set_state_calls': 1,
+            'read_bytes': len(self.ggo),
+            'written_bytes': written,
+            'read_entries': 1,
+            'written_entries': 2,
+        })
+
+
+    @pytest.mark.unittest
+    def test_invalid(self):
+        context = MockContext(states={})
+        before = self.snapshot()
+
+        with self.assertRaises(InvalidTransaction):
+            TransferGGOTransactionHandler().apply(self.transaction, context)
+
+        delta = self.delta(before)
+
+        self.assertEqual(delta['latency'], 1)
+        self.assertEqual(delta['accepted'], 0)
+        self.assertEqual(delta['invalid'], 1)
+        self.assertEqual(delta['set_state_calls'], 0)
+        self.assertEqual(delta['written_bytes'], 0)
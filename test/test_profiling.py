@@ -0,0 +1,160 @@
+import os
+import time
+import pstats
+import signal
+import cProfile
+import logging
+import tempfile
+import threading
+import unittest
+import pytest
+from unittest import mock
+
+from src.datahub_processor import generic_handler, profiling
+from src.datahub_processor.profiling import HandlerProfiler, install_signal_handler
+from src.datahub_processor.transfer_ggo_handler import TransferGGOTransactionHandler
+
+from .mocks import MockContext, TransferFixture
+
+
+class TestHandlerProfiler(TransferFixture, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def apply(self, profiler):
+        with mock.patch.object(generic_handler, 'profiler', profiler):
+            TransferGGOTransactionHandler().apply(self.transaction, MockContext(states={self.ggo_src: self.ggo}))
+
+
+    @pytest.mark.unittest
+    def test_disabled(self):
+        profiler = HandlerProfiler(self.directory.name, 0)
+
+        self.apply(profiler)
+        profiler.dump()
+
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+    @pytest.mark.unittest
+    def test_stats_per_family(self):
+        profiler = HandlerProfiler(self.directory.name, 3600, enabled=True)
+
+        self.apply(profiler)
+        self.apply(profiler)
+
+        # Not written before the interval has passed
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+        profiler.disable()
+        path = profiler.path('TransferGGORequest')
+
+        self.assertEqual(os.listdir(self.directory.name), [os.path.basename(path)])
+
+        stats = pstats.Stats(path)
+        calls = {function[2]: count for function, (_, count, *_) in stats.stats.items()}
+        self.assertEqual(calls['_apply'], 2)
+
+        # Disabled again, nothing more is profiled
+        self.apply(profiler)
+        profiler.dump()
+        self.assertEqual({function[2]: count for function, (_, count, *_) in pstats.Stats(path).stats.items()}['_apply'], 2)
+
+
+    @pytest.mark.unittest
+    def test_written_every_interval(self):
+        profiler = HandlerProfiler(self.directory.name, 0, enabled=True)
+
+        self.apply(profiler)
+
+        self.assertTrue(os.path.exists(profiler.path('TransferGGORequest')))
+
+
+    @pytest.mark.unittest
+    def test_toggle(self):
+        profiler = HandlerProfiler(self.directory.name, 3600)
+
+        profiler.toggle()
+        self.assertTrue(profiler.enabled)
+        self.apply(profiler)
+
+        profiler.toggle()
+        self.assertFalse(profiler.enabled)
+        self.assertTrue(os.path.exists(profiler.path('TransferGGORequest')))
+
+
+    @pytest.mark.unittest
+    def test_concurrent_calls_unprofiled(self):
+        profiler = HandlerProfiler(self.directory.name, 0, enabled=True)
+
+        with profiler._family_lock('TransferGGORequest'):
+            self.apply(profiler)
+
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+    @pytest.mark.unittest
+    def test_profiler_unavailable(self):
+        profiler = HandlerProfiler(self.directory.name, 0, enabled=True)
+
+        with mock.patch.object(cProfile.Profile, 'enable', side_effect=ValueError('Another profiling tool is already active')):
+            self.assertEqual(profiler.profile('TransferGGORequest', max, 1, 2), 2)
+
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+    @pytest.mark.unittest
+    def test_enabled_during_call(self):
+        profiler = HandlerProfiler(self.directory.name, 0, enabled=True)
+        self.apply(profiler)
+
+        def apply():
+            thread = threading.Thread(target=profiler.enable)
+            thread.start()
+            thread.join(0.1)
+
+            # Waits for the call to finish before resetting the family
+            self.assertTrue(thread.is_alive())
+            return thread
+
+        profiler.profile('TransferGGORequest', apply).join()
+
+        self.assertEqual((profiler._profiles, profiler._dumped_at), ({}, {}))
+        self.apply(profiler)
+        self.assertIn('TransferGGORequest', profiler._profiles)
+
+
+    @pytest.mark.unittest
+    def test_unwritable_directory(self):
+        directory = os.path.join(self.directory.name, 'file')
+        open(directory, 'w').close()
+        profiler = HandlerProfiler(directory, 0, enabled=True)
+
+        with self.assertLogs('datahub_processor', logging.ERROR) as logs:
+            self.apply(profiler)
+
+        self.assertIn('Could not write the profile of TransferGGORequest', logs.output[0])
+
+
+    @pytest.mark.unittest
+    def test_signal_toggles(self):
+        profiler = HandlerProfiler(self.directory.name, 3600)
+        previous = signal.getsignal(signal.SIGUSR2)
+
+        try:
+            with mock.patch.object(profiling, 'profiler', profiler):
+                install_signal_handler(signal.SIGUSR2)
+                os.kill(os.getpid(), signal.SIGUSR2)
+
+                deadline = time.monotonic() + 5
+                while not profiler.enabled and time.monotonic() < deadline:
+                    time.sleep(0.01)
+        finally:
+            signal.signal(signal.SIGUSR2, previous)
+
+        self.assertTrue(profiler.enabled)
@@ -9,10 +9,14 @@ from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
 from src.datahub_processor.publish_measurement_handler import PublishMeasurementTransactionHandler, Measurement
 from src.datahub_processor.ledger_dto import MeasurementType
  
-from .mocks import MockContext, FakeTransaction, FakeTransactionHeader
+from .mocks import MockContext, FakeTransaction, FakeTransactionHeader, StateBudget, StateBudgetAssertions
 
 
-class TestPublishMeasurement(unittest.TestCase):
+# get_state and set_state round trips, addresses and bytes read a transaction may make
+BUDGET = StateBudget(reads=1, writes=1, addresses=1, bytes=64)
+
+
+class TestPublishMeasurement(StateBudgetAssertions, unittest.TestCase):
 
     def create_fake_transaction(self, inputs, outputs, payload):
         
@@ -35,8 +39,12 @@ class TestPublishMeasurement(unittest.TestCase):
         
         self.assertEqual(handler.family_name, 'PublishMeasurementRequest')
 
-        self.assertEqual(len(handler.family_versions), 1)
+        self.assertEqual(len(handler.family_versions), 5)
         self.assertIn('0.1', handler.family_versions)
+        self.assertIn('0.2', handler.family_versions)
+        self.assertIn('0.3', handler.family_versions)
+        self.assertIn('0.4', handler.family_versions)
+        self.assertIn('0.5', handler.family_versions)
 
         self.assertEqual(len(handler.namespaces), 1)
         self.assertIn('5a9839', handler.namespaces)
@@ -60,7 +68,8 @@ class TestPublishMeasurement(unittest.TestCase):
         payload = b'{"amount": 5123, "type": "CONSUMPTION", "begin": "2020-01-01T12:00:00+00:00", "end": "2020-01-01T13:00:00+00:00", "sector": "DK1"}'
         transaction = self.create_fake_transaction([address],[address],payload)
 
-        PublishMeasurementTransactionHandler().apply(transaction, context)
+        with self.assertWithinBudget(context, BUDGET):
+            PublishMeasurementTransactionHandler().apply(transaction, context)
 
         # Assert that the measurement has been added to the context states with the correct values.
         self.assertIn(address, context.states)
@@ -87,7 +96,8 @@ class TestPublishMeasurement(unittest.TestCase):
         transaction = self.create_fake_transaction([address],[address],payload)
         
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            PublishMeasurementTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                PublishMeasurementTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), "{'amount': ['Must be greater than or equal to 0.']}")
 
@@ -104,7 +114,8 @@ class TestPublishMeasurement(unittest.TestCase):
 
         
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            PublishMeasurementTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                PublishMeasurementTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), "{'type': ['Invalid enum member LEFT']}")
 
@@ -122,7 +133,8 @@ class TestPublishMeasurement(unittest.TestCase):
 
         
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            PublishMeasurementTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                PublishMeasurementTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), "{'_schema': ['Begin must be before End!']}")
 
@@ -139,7 +151,8 @@ class TestPublishMeasurement(unittest.TestCase):
 
         
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            PublishMeasurementTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                PublishMeasurementTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), "{'_schema': ['Only positive hourly measurements are currently supported!']}")
 
@@ -156,7 +169,8 @@ class TestPublishMeasurement(unittest.TestCase):
 
         
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            PublishMeasurementTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                PublishMeasurementTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), "{'sector': ['Must be one of: DK1, DK2.']}")
 
@@ -173,7 +187,8 @@ class TestPublishMeasurement(unittest.TestCase):
 
         
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            PublishMeasurementTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                PublishMeasurementTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'The transaction payload was an invalid request. Invalid JSON.')
 
@@ -191,6 +206,7 @@ class TestPublishMeasurement(unittest.TestCase):
 
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            PublishMeasurementTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                PublishMeasurementTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), f'Address already in use "{address}"!')
\ No newline at end of file
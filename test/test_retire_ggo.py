@@ -12,12 +12,18 @@ from src.datahub_processor.ledger_dto import GGO, GGONext, GGOAction, Measuremen
 from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
 from src.datahub_processor import RetireGGOTransactionHandler, SettlementHandler
  
-from .mocks import MockContext, FakeTransaction, FakeTransactionHeader
+from .mocks import MockContext, FakeTransaction, FakeTransactionHeader, StateBudget, StateBudgetAssertions
 
 from marshmallow_dataclass import class_schema
 
 
-class TestIssueGGO(unittest.TestCase):
+# get_state and set_state round trips, addresses and bytes read a transaction may make,
+# the settlement transactions of these tests add at most three GGOs
+RETIRE_BUDGET = StateBudget(reads=1, writes=1, addresses=1, bytes=384)
+SETTLEMENT_BUDGET = StateBudget(reads=1, writes=1, addresses=5, bytes=1536)
+
+
+class TestIssueGGO(StateBudgetAssertions, unittest.TestCase):
 
     def setUp(self):
         master_key = BIP32Key.fromEntropy("bfdgafgaertaehtaha43514r<aefag".encode())
@@ -287,8 +293,11 @@ class TestIssueGGO(unittest.TestCase):
         
         self.assertEqual(handler.family_name, 'RetireGGORequest')
 
-        self.assertEqual(len(handler.family_versions), 1)
+        self.assertEqual(len(handler.family_versions), 4)
         self.assertIn('0.1', handler.family_versions)
+        self.assertIn('0.2', handler.family_versions)
+        self.assertIn('0.3', handler.family_versions)
+        self.assertIn('0.4', handler.family_versions)
 
         self.assertEqual(len(handler.namespaces), 1)
         self.assertIn('849c0b', handler.namespaces)
@@ -297,13 +306,17 @@ class TestIssueGGO(unittest.TestCase):
         
         self.assertEqual(handler.family_name, 'SettlementRequest')
 
-        self.assertEqual(len(handler.family_versions), 1)
+        self.assertEqual(len(handler.family_versions), 4)
         self.assertIn('0.1', handler.family_versions)
+        self.assertIn('0.2', handler.family_versions)
+        self.assertIn('0.3', handler.family_versions)
+        self.assertIn('0.4', handler.family_versions)
 
-        self.assertEqual(len(handler.namespaces), 3)
+        self.assertEqual(len(handler.namespaces), 4)
         self.assertIn('849c0b', handler.namespaces)
         self.assertIn('ba4817', handler.namespaces)
         self.assertIn('5a9839', handler.namespaces)
+        self.assertIn('fe817d', handler.namespaces)
            
 
     @pytest.mark.unittest
@@ -337,7 +350,8 @@ class TestIssueGGO(unittest.TestCase):
                 settlement_address=set_add
             )).encode('utf8'),
             signer_key=self.ggo_1_key)
-        RetireGGOTransactionHandler().apply(transaction, context)
+        with self.assertWithinBudget(context, RETIRE_BUDGET):
+            RetireGGOTransactionHandler().apply(transaction, context)
 
         transaction = self.create_fake_transaction(
             payload=class_schema(SettlementRequest)().dumps(SettlementRequest(
@@ -346,7 +360,8 @@ class TestIssueGGO(unittest.TestCase):
                 ggo_addresses=[self.ggo_1_add]
             )).encode('utf8'),
             signer_key=self.mea_con_1_key)
-        SettlementHandler().apply(transaction, context)
+        with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+            SettlementHandler().apply(transaction, context)
 
         self.assertIn(self.ggo_1_add, context.states)
 
@@ -403,7 +418,8 @@ class TestIssueGGO(unittest.TestCase):
                 settlement_address=set_add
             )).encode('utf8'),
             signer_key=self.ggo_1_key)
-        RetireGGOTransactionHandler().apply(transaction_retire_1, context)
+        with self.assertWithinBudget(context, RETIRE_BUDGET):
+            RetireGGOTransactionHandler().apply(transaction_retire_1, context)
 
         transaction_retire_2 = self.create_fake_transaction(
             payload=class_schema(RetireGGORequest)().dumps(RetireGGORequest(
@@ -411,7 +427,8 @@ class TestIssueGGO(unittest.TestCase):
                 settlement_address=set_add
             )).encode('utf8'),
             signer_key=self.ggo_2_key)
-        RetireGGOTransactionHandler().apply(transaction_retire_2, context)
+        with self.assertWithinBudget(context, RETIRE_BUDGET):
+            RetireGGOTransactionHandler().apply(transaction_retire_2, context)
 
         transaction_retire_3 = self.create_fake_transaction(
             payload=class_schema(RetireGGORequest)().dumps(RetireGGORequest(
@@ -419,7 +436,8 @@ class TestIssueGGO(unittest.TestCase):
                 settlement_address=set_add
             )).encode('utf8'),
             signer_key=self.ggo_3_key)
-        RetireGGOTransactionHandler().apply(transaction_retire_3, context)
+        with self.assertWithinBudget(context, RETIRE_BUDGET):
+            RetireGGOTransactionHandler().apply(transaction_retire_3, context)
 
         transaction_settlement = self.create_fake_transaction(
             payload=class_schema(SettlementRequest)().dumps(SettlementRequest(
@@ -428,7 +446,8 @@ class TestIssueGGO(unittest.TestCase):
                 ggo_addresses=[self.ggo_1_add, self.ggo_2_add, self.ggo_3_add]
             )).encode('utf8'),
             signer_key=self.mea_con_1_key)
-        SettlementHandler().apply(transaction_settlement, context)
+        with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+            SettlementHandler().apply(transaction_settlement, context)
 
 
         self.assertIn(self.ggo_1_add, context.states)
@@ -481,7 +500,8 @@ class TestIssueGGO(unittest.TestCase):
                 settlement_address=set_add
             )).encode('utf8'),
             signer_key=self.ggo_1_key)
-        RetireGGOTransactionHandler().apply(transaction_retire_1, context)
+        with self.assertWithinBudget(context, RETIRE_BUDGET):
+            RetireGGOTransactionHandler().apply(transaction_retire_1, context)
 
         transaction_retire_2 = self.create_fake_transaction(
             payload=class_schema(RetireGGORequest)().dumps(RetireGGORequest(
@@ -489,7 +509,8 @@ class TestIssueGGO(unittest.TestCase):
                 settlement_address=set_add
             )).encode('utf8'),
             signer_key=self.ggo_2_key)
-        RetireGGOTransactionHandler().apply(transaction_retire_2, context)
+        with self.assertWithinBudget(context, RETIRE_BUDGET):
+            RetireGGOTransactionHandler().apply(transaction_retire_2, context)
 
 
         transaction_settlement_1 = self.create_fake_transaction(
@@ -499,7 +520,8 @@ class TestIssueGGO(unittest.TestCase):
                 ggo_addresses=[self.ggo_1_add, self.ggo_2_add]
             )).encode('utf8'),
             signer_key=self.mea_con_1_key)
-        SettlementHandler().apply(transaction_settlement_1, context)
+        with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+            SettlementHandler().apply(transaction_settlement_1, context)
 
 
         transaction_retire_3 = self.create_fake_transaction(
@@ -508,7 +530,8 @@ class TestIssueGGO(unittest.TestCase):
                 settlement_address=set_add
             )).encode('utf8'),
             signer_key=self.ggo_3_key)
-        RetireGGOTransactionHandler().apply(transaction_retire_3, context)
+        with self.assertWithinBudget(context, RETIRE_BUDGET):
+            RetireGGOTransactionHandler().apply(transaction_retire_3, context)
 
         transaction_settlement_2 = self.create_fake_transaction(
             payload=class_schema(SettlementRequest)().dumps(SettlementRequest(
@@ -517,7 +540,8 @@ class TestIssueGGO(unittest.TestCase):
                 ggo_addresses=[self.ggo_3_add]
             )).encode('utf8'),
             signer_key=self.mea_con_1_key)
-        SettlementHandler().apply(transaction_settlement_2, context)
+        with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+            SettlementHandler().apply(transaction_settlement_2, context)
 
 
         self.assertIn(self.ggo_1_add, context.states)
@@ -566,7 +590,8 @@ class TestIssueGGO(unittest.TestCase):
                 settlement_address=set_add
             )).encode('utf8'),
             signer_key=self.ggo_1_key)
-        RetireGGOTransactionHandler().apply(transaction_retire, context)
+        with self.assertWithinBudget(context, RETIRE_BUDGET):
+            RetireGGOTransactionHandler().apply(transaction_retire, context)
 
 
         transaction_settlement = self.create_fake_transaction(
@@ -579,7 +604,8 @@ class TestIssueGGO(unittest.TestCase):
 
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Measurment is not of type consumption')
         
@@ -610,8 +636,10 @@ class TestIssueGGO(unittest.TestCase):
             signer_key=self.mea_con_1_key)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            RetireGGOTransactionHandler().apply(transaction_retire, context)
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
             
 
         self.assertEqual(str(invalid_transaction.exception), 'Invalid key for GGO')
@@ -643,8 +671,10 @@ class TestIssueGGO(unittest.TestCase):
             signer_key=self.mea_con_1_key)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            RetireGGOTransactionHandler().apply(transaction_retire, context)
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
             
         self.assertEqual(str(invalid_transaction.exception), 'GGO already has been used')
 
@@ -669,7 +699,8 @@ class TestIssueGGO(unittest.TestCase):
 
        
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Invalid retired GGO in settlement')
 
@@ -694,7 +725,8 @@ class TestIssueGGO(unittest.TestCase):
 
        
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Invalid retired GGO in settlement')
 
@@ -719,7 +751,8 @@ class TestIssueGGO(unittest.TestCase):
 
        
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Invalid retired GGO in settlement')
 
@@ -751,8 +784,10 @@ class TestIssueGGO(unittest.TestCase):
             signer_key=self.mea_con_1_key)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            RetireGGOTransactionHandler().apply(transaction_retire, context)
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
             
         self.assertEqual(str(invalid_transaction.exception), 'Not correct settlement address for measurement')
 
@@ -787,8 +822,10 @@ class TestIssueGGO(unittest.TestCase):
             signer_key=self.mea_con_2_key)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            RetireGGOTransactionHandler().apply(transaction_retire, context)
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Measurement does not equal settlement measurement')
 
@@ -823,8 +860,10 @@ class TestIssueGGO(unittest.TestCase):
             signer_key=self.mea_con_2_key)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            RetireGGOTransactionHandler().apply(transaction_retire, context)
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Invalid key for settlement')
 
@@ -855,8 +894,10 @@ class TestIssueGGO(unittest.TestCase):
             signer_key=self.mea_con_2_key)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            RetireGGOTransactionHandler().apply(transaction_retire, context)
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Invalid key for measurement')
 
@@ -887,9 +928,12 @@ class TestIssueGGO(unittest.TestCase):
             signer_key=self.mea_con_1_key)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            RetireGGOTransactionHandler().apply(transaction_retire, context)
-            SettlementHandler().apply(transaction_settlement, context)
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'GGO already part of settlement')
 
@@ -921,9 +965,12 @@ class TestIssueGGO(unittest.TestCase):
             signer_key=self.mea_con_1_key)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            RetireGGOTransactionHandler().apply(transaction_retire, context)
-            SettlementHandler().apply(transaction_settlement, context)
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Invalid retired GGO in settlement')
 
@@ -971,10 +1018,14 @@ class TestIssueGGO(unittest.TestCase):
             signer_key=self.mea_con_2_key)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            RetireGGOTransactionHandler().apply(transaction_retire_1, context)
-            RetireGGOTransactionHandler().apply(transaction_retire_2, context)
-            RetireGGOTransactionHandler().apply(transaction_retire_3, context)
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire_1, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire_2, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire_3, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Invalid to retire more that measurement amount')
 
@@ -1005,8 +1056,10 @@ class TestIssueGGO(unittest.TestCase):
             signer_key=self.mea_con_1_key)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            RetireGGOTransactionHandler().apply(transaction_retire, context)
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'GGO not produced in same sector as measurement')
 
@@ -1039,7 +1092,9 @@ class TestIssueGGO(unittest.TestCase):
             signer_key=self.mea_con_1_key)
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            RetireGGOTransactionHandler().apply(transaction_retire, context)
-            SettlementHandler().apply(transaction_settlement, context)
+            with self.assertWithinBudget(context, RETIRE_BUDGET):
+                RetireGGOTransactionHandler().apply(transaction_retire, context)
+            with self.assertWithinBudget(context, SETTLEMENT_BUDGET):
+                SettlementHandler().apply(transaction_settlement, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'GGO not produced at the same time as measurement')
\ No newline at end of file
@@ -0,0 +1,303 @@
+import unittest
+import pytest
+import hashlib
+from datetime import datetime, timezone
+
+from bip32utils import BIP32Key
+from marshmallow_dataclass import class_schema
+from sawtooth_sdk.processor.exceptions import InvalidTransaction
+
+from src.datahub_processor import SettlementHandler
+from src.datahub_processor.ledger_dto import GGO, GGONext, GGOAction, Measurement, MeasurementType, Settlement, SettlementPart, SettlementRequest, generate_address, AddressPrefix
+from src.datahub_processor.namespaces import SETTLEMENT_PAGE_NAMESPACE
+from src.datahub_processor.state_codec import encode_state
+from src.datahub_processor.settlement_pages import PagedSettlement, page_address, page_prefix, member_address, encode_row, decode_page, is_paged, HEADER, ROW, PAGE_SIZE, SETTLEMENT_V3, SETTLEMENT_PAGE_V1, SETTLEMENT_MEMBER_V1
+from src.datahub_processor.settlement_record import SettlementRecord
+
+from .mocks import MockContext, DeclaredContext, FakeTransaction, FakeTransactionHeader, StateBudget, StateBudgetAssertions
+
+
+def ggo_address(i: int) -> str:
+    return generate_address(AddressPrefix.GGO, hashlib.sha256(str(i).encode()).digest())
+
+
+SETTLEMENT = generate_address(AddressPrefix.SETTLEMENT, b'consumer')
+MEASUREMENT = generate_address(AddressPrefix.MEASUREMENT, b'consumer')
+
+# Adding one GGO to a paged settlement of any size reads the measurement, the
+# header, the GGO, its member entry and at most one full page.
+PAGED_BUDGET = StateBudget(reads=2, writes=1, addresses=5, bytes=1 + PAGE_SIZE * ROW.size + 1024)
+
+
+class TestPagedSettlement(unittest.TestCase):
+
+    @pytest.mark.unittest
+    def test_addresses(self):
+        self.assertEqual(len(page_address(SETTLEMENT, 0)), 70)
+        self.assertEqual(page_address(SETTLEMENT, 17), page_prefix(SETTLEMENT) + '00000011')
+        self.assertTrue(page_prefix(SETTLEMENT).startswith(SETTLEMENT_PAGE_NAMESPACE))
+
+        self.assertEqual(len(member_address(SETTLEMENT, ggo_address(1))), 70)
+        self.assertTrue(member_address(SETTLEMENT, ggo_address(1)).startswith(SETTLEMENT_PAGE_NAMESPACE))
+        self.assertNotEqual(member_address(SETTLEMENT, ggo_address(1)), member_address(SETTLEMENT, ggo_address(2)))
+
+
+    @pytest.mark.unittest
+    def test_appends_touch_header_and_last_page(self):
+        states = {}
+        settlement = PagedSettlement(SETTLEMENT, MEASUREMENT, page_size=2)
+        for i in range(3):
+            settlement.add(ggo_address(i), i)
+
+        written = settlement.entries(lambda addresses: {a: states[a] for a in addresses if a in states})
+        states.update(written)
+
+        self.assertEqual(set(written), {SETTLEMENT, page_address(SETTLEMENT, 0), page_address(SETTLEMENT, 1)} | {member_address(SETTLEMENT, ggo_address(i)) for i in range(3)})
+        self.assertEqual(decode_page(states[page_address(SETTLEMENT, 1)]), [(ggo_address(2), 2)])
+        self.assertTrue(is_paged(states[SETTLEMENT]))
+
+        reads = []
+        def read(addresses):
+            reads.extend(addresses)
+            return {a: states[a] for a in addresses if a in states}
+
+        settlement = PagedSettlement.decode(SETTLEMENT, states[SETTLEMENT], states)
+        self.assertEqual((settlement.measurement, settlement.count, settlement.total, settlement.page_size), (MEASUREMENT, 3, 3, 2))
+        self.assertIn(ggo_address(1), settlement)
+        self.assertNotIn(ggo_address(3), settlement)
+
+        for i in range(3, 5):
+            settlement.add(ggo_address(i), i)
+
+        written = settlement.entries(read)
+        states.update(written)
+
+        self.assertEqual(reads, [page_address(SETTLEMENT, 1)])
+        self.assertEqual(set(written), {SETTLEMENT, page_address(SETTLEMENT, 1), page_address(SETTLEMENT, 2)} | {member_address(SETTLEMENT, ggo_address(i)) for i in range(3, 5)})
+        self.assertEqual(decode_page(states[page_address(SETTLEMENT, 1)]), [(ggo_address(2), 2), (ggo_address(3), 3)])
+        self.assertEqual(decode_page(states[page_address(SETTLEMENT, 2)]), [(ggo_address(4), 4)])
+        self.assertEqual(states[member_address(SETTLEMENT, ggo_address(4))], bytes((SETTLEMENT_MEMBER_V1, 2, 0, 0, 0)))
+
+
+    @pytest.mark.unittest
+    def test_missing_page(self):
+        settlement = PagedSettlement(SETTLEMENT, MEASUREMENT, count=3, total=3, page_size=2)
+        settlement.add(ggo_address(3), 3)
+
+        for page in [{}, {page_address(SETTLEMENT, 1): b''}, {page_address(SETTLEMENT, 1): bytes(1 + ROW.size)}]:
+            with self.assertRaises(InvalidTransaction):
+                settlement.entries(lambda addresses: page)
+
+
+    @pytest.mark.unittest
+    def test_invalid_parts_and_entries(self):
+        for ggo, amount in [(ggo_address(1).upper(), 1), (ggo_address(1)[:-1], 1), ('849c0b' + 'z' * 64, 1), (ggo_address(1), 2**63), (ggo_address(1), 1.0)]:
+            self.assertIsNone(encode_row(ggo, amount))
+
+        for data in [b'', bytes((SETTLEMENT_MEMBER_V1,)), bytes((SETTLEMENT_PAGE_V1,)) + bytes(ROW.size - 1)]:
+            with self.assertRaises(InvalidTransaction):
+                decode_page(data)
+
+        for header in [HEADER.pack(SETTLEMENT_V3, 0, 0, 0) + MEASUREMENT.encode('utf8'), bytes((SETTLEMENT_V3, 1)), HEADER.pack(SETTLEMENT_V3, 1, 0, 0) + b'\xff']:
+            with self.assertRaises(InvalidTransaction) as invalid_transaction:
+                PagedSettlement.decode(SETTLEMENT, header, {})
+
+            self.assertEqual(str(invalid_transaction.exception), 'Invalid settlement header')
+
+        settlement = PagedSettlement(SETTLEMENT, MEASUREMENT)
+        settlement.add('not-an-address', 1)
+
+        with self.assertRaises(ValueError):
+            settlement.entries(lambda addresses: {})
+
+
+class TestPagedSettlementHandler(StateBudgetAssertions, unittest.TestCase):
+
+    def setUp(self):
+        self.key = BIP32Key.fromEntropy("the_consumer_of_a_paged_settlement".encode())
+        self.measurement = generate_address(AddressPrefix.MEASUREMENT, self.key.PublicKey())
+        self.settlement = generate_address(AddressPrefix.SETTLEMENT, self.key.PublicKey())
+
+        begin = datetime(2020,1,1,12, tzinfo=timezone.utc)
+        end = datetime(2020,1,1,13, tzinfo=timezone.utc)
+
+        self.states = {
+            self.measurement: encode_state(Measurement(amount=100000, type=MeasurementType.CONSUMPTION, begin=begin, end=end, sector='DK1')),
+            self.settlement: encode_state(Settlement(
+                measurement=self.measurement,
+                parts=[SettlementPart(ggo=ggo_address(i), amount=10) for i in range(300)])),
+        }
+
+        for i in [17, 300, 301, 302]:
+            self.states[ggo_address(i)] = encode_state(GGO(
+                origin=self.measurement, amount=1000, begin=begin, end=end, tech_type='T12412', fuel_type='F010101', sector='DK1',
+                next=GGONext(action=GGOAction.RETIRE, addresses=[self.settlement])))
+
+
+    def apply(self, context, ggo_addresses, version='0.4', declare_pages=True):
+        members = [member_address(self.settlement, ggo_address) for ggo_address in ggo_addresses]
+        pages = [page_prefix(self.settlement)] + members if declare_pages else []
+
+        transaction = FakeTransaction(
+            header=FakeTransactionHeader(
+                batcher_public_key=self.key.PublicKey().hex(),
+                dependencies=[],
+                family_name="SettlementRequest",
+                family_version=version,
+                inputs=[self.measurement, self.settlement] + ggo_addresses + pages,
+                outputs=[self.settlement] + pages,
+                signer_public_key=self.key.PublicKey().hex()),
+            payload=class_schema(SettlementRequest)().dumps(SettlementRequest(
+                settlement_address=self.settlement,
+                measurement_address=self.measurement,
+                ggo_addresses=ggo_addresses
+            )).encode('utf8')
+        )
+
+        if isinstance(context, DeclaredContext):
+            context.inputs, context.outputs = transaction.header.inputs, transaction.header.outputs
+
+        before = dict(context.states)
+        SettlementHandler().apply(transaction, context)
+
+        return {address for address, data in context.states.items() if before.get(address) != data}
+
+
+    def paged(self):
+        """ A context holding a settlement created by a 0.4 transaction, with ggo_address(300) in it. """
+        states = dict(self.states)
+        del states[self.settlement]
+
+        context = MockContext(states=states)
+        self.apply(context, [ggo_address(300)])
+        return context
+
+
+    @pytest.mark.unittest
+    def test_new_settlement_paged(self):
+        context = self.paged()
+
+        self.assertTrue(is_paged(context.states[self.settlement]))
+        self.assertEqual(decode_page(context.states[page_address(self.settlement, 0)]), [(ggo_address(300), 1000)])
+
+        written = self.apply(context, [ggo_address(301), ggo_address(302)])
+
+        self.assertEqual(written, {self.settlement, page_address(self.settlement, 0)} | {member_address(self.settlement, ggo_address(i)) for i in (301, 302)})
+        settlement = PagedSettlement.decode(self.settlement, context.states[self.settlement], {})
+        self.assertEqual((settlement.count, settlement.total), (3, 3000))
+
+
+    @pytest.mark.unittest
+    def test_legacy_settlement_not_paged(self):
+        context = MockContext(states=dict(self.states))
+
+        written = self.apply(context, [ggo_address(300)])
+
+        self.assertEqual(written, {self.settlement})
+        self.assertFalse(is_paged(context.states[self.settlement]))
+        self.assertEqual(len(SettlementRecord.decode(context.states[self.settlement]).settlement().parts), 301)
+
+        written = self.apply(context, [ggo_address(301)], version='0.1', declare_pages=False)
+
+        self.assertEqual(written, {self.settlement})
+
+
+    @pytest.mark.unittest
+    def test_budget(self):
+        states = dict(self.states)
+        settlement = PagedSettlement(self.settlement, self.measurement)
+        for i in range(1000, 1600):
+            settlement.add(ggo_address(i), 10)
+        states.update(settlement.entries(lambda addresses: {}))
+
+        context = MockContext(states=states)
+
+        with self.assertWithinBudget(context, PAGED_BUDGET):
+            written = self.apply(context, [ggo_address(301)])
+
+        self.assertEqual(written, {self.settlement, page_address(self.settlement, 2), member_address(self.settlement, ggo_address(301))})
+        self.assertGreater(sum(len(states[address]) for address in states if address.startswith(page_prefix(self.settlement))), PAGED_BUDGET.bytes)
+
+
+    @pytest.mark.unittest
+    def test_older_versions_rejected(self):
+        context = self.paged()
+        states = dict(context.states)
+
+        for version in ['0.1', '0.2', '0.3']:
+            with self.assertRaises(InvalidTransaction) as invalid_transaction:
+                self.apply(context, [ggo_address(301)], version, declare_pages=False)
+
+            self.assertEqual(str(invalid_transaction.exception), 'Settlement is paged, it can only be extended by family version 0.4')
+            self.assertEqual(context.states, states)
+
+
+    @pytest.mark.unittest
+    def test_undeclared_pages(self):
+        context = DeclaredContext(states=self.paged().states)
+
+        with self.assertRaises(InvalidTransaction) as invalid_transaction:
+            self.apply(context, [ggo_address(301)], declare_pages=False)
+
+        self.assertEqual(str(invalid_transaction.exception), 'The transaction reads addresses that are not in its inputs.')
+
+        with self.assertWithinBudget(context, PAGED_BUDGET):
+            written = self.apply(context, [ggo_address(301)])
+
+        self.assertEqual(written, {self.settlement, page_address(self.settlement, 0), member_address(self.settlement, ggo_address(301))})
+
+
+    @pytest.mark.unittest
+    def test_malformed_entries(self):
+        context = self.paged()
+        context.states[page_address(self.settlement, 0)] = b''
+
+        with self.assertRaises(InvalidTransaction) as invalid_transaction:
+            self.apply(context, [ggo_address(301)])
+
+        self.assertEqual(str(invalid_transaction.exception), f'Settlement page {page_address(self.settlement, 0)} does not hold 1 parts')
+
+        context.states[self.settlement] = bytes((SETTLEMENT_V3,))
+
+        with self.assertRaises(InvalidTransaction) as invalid_transaction:
+            self.apply(context, [ggo_address(301)])
+
+        self.assertEqual(str(invalid_transaction.exception), 'Invalid settlement header')
+
+
+    @pytest.mark.unittest
+    def test_unpageable_ggo(self):
+        states = dict(self.states)
+        del states[self.settlement]
+        context = MockContext(states=states)
+
+        upper = ggo_address(301)[:6] + ggo_address(301)[6:].upper()
+        context.states[upper] = context.states[ggo_address(301)]
+
+        with self.assertRaises(InvalidTransaction) as invalid_transaction:
+            self.apply(context, [upper])
+
+        self.assertEqual(str(invalid_transaction.exception), 'Invalid retired GGO in settlement')
+
+
+    @pytest.mark.unittest
+    def test_duplicates(self):
+        context = self.paged()
+
+        for ggo_addresses in ([ggo_address(300)], [ggo_address(301), ggo_address(301)]):
+            with self.assertRaises(InvalidTransaction) as invalid_transaction:
+                self.apply(context, ggo_addresses)
+
+            self.assertEqual(str(invalid_transaction.exception), 'GGO already part of settlement')
+
+
+    @pytest.mark.unittest
+    def test_total(self):
+        self.states[self.measurement] = encode_state(Measurement(amount=1500, type=MeasurementType.CONSUMPTION,
+            begin=datetime(2020,1,1,12, tzinfo=timezone.utc), end=datetime(2020,1,1,13, tzinfo=timezone.utc), sector='DK1'))
+        context = self.paged()
+
+        with self.assertRaises(InvalidTransaction) as invalid_transaction:
+            self.apply(context, [ggo_address(301)])
+
+        self.assertEqual(str(invalid_transaction.exception), 'Invalid to retire more that measurement amount')
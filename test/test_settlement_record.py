@@ -0,0 +1,225 @@
+import unittest
+import pytest
+import hashlib
+from datetime import datetime, timezone
+
+from bip32utils import BIP32Key
+from marshmallow import ValidationError
+from marshmallow_dataclass import class_schema
+from sawtooth_sdk.processor.exceptions import InvalidTransaction
+
+from src.datahub_processor import SettlementHandler
+from src.datahub_processor.ledger_dto import GGO, GGONext, GGOAction, Measurement, MeasurementType, Settlement, SettlementPart, SettlementRequest, generate_address, AddressPrefix
+from src.datahub_processor.compact_codec import SETTLEMENT_V1, SETTLEMENT_V2, encode_compact
+from src.datahub_processor.compression import is_compressed, decompress
+from src.datahub_processor.state_codec import encode_state, decode_state
+from src.datahub_processor.settlement_record import SettlementRecord
+
+from .mocks import MockContext, FakeTransaction, FakeTransactionHeader
+
+
+def ggo_address(i: int) -> str:
+    return generate_address(AddressPrefix.GGO, hashlib.sha256(str(i).encode()).digest())
+
+
+MEASUREMENT = generate_address(AddressPrefix.MEASUREMENT, b'consumer')
+
+
+class TestSettlementRecord(unittest.TestCase):
+
+    def settlement(self, count: int) -> Settlement:
+        return Settlement(measurement=MEASUREMENT, parts=[SettlementPart(ggo=ggo_address(i), amount=i) for i in range(count)])
+
+
+    @pytest.mark.unittest
+    def test_encodings(self):
+        settlement = self.settlement(30)
+
+        for compact in (False, True):
+            for compressed in (False, True):
+                data = encode_state(settlement, compact, compressed)
+                record = SettlementRecord.decode(data)
+
+                self.assertEqual(record.measurement, MEASUREMENT)
+                self.assertEqual(record.total, sum(range(30)))
+                self.assertEqual(record.settlement(), decode_state(Settlement, data))
+                self.assertCountEqual(record.settlement().parts, settlement.parts)
+                self.assertIn(ggo_address(29), record)
+                self.assertNotIn(ggo_address(30), record)
+
+                record.add(ggo_address(30), 30)
+                expected = decode_state(Settlement, data)
+                expected.parts.append(SettlementPart(ggo=ggo_address(30), amount=30))
+
+                self.assertIn(ggo_address(30), record)
+                self.assertEqual(record.total, sum(range(31)))
+
+                for write_compact in (False, True):
+                    for write_compressed in (False, True):
+                        self.assertEqual(record.encode(write_compact, write_compressed), encode_state(expected, write_compact, write_compressed))
+
+
+    @pytest.mark.unittest
+    def test_part_table_sorted(self):
+        data = encode_state(self.settlement(200), compact=True)
+        parts = decode_state(Settlement, data).parts
+
+        self.assertEqual([part.ggo for part in parts], sorted(ggo_address(i) for i in range(200)))
+
+        record = SettlementRecord.decode(data)
+        for i in range(200, 210):
+            record.add(ggo_address(i), i)
+        record.add(ggo_address(0), 7)
+
+        data = record.encode(compact=True)
+        parts = decode_state(Settlement, data).parts
+
+        self.assertEqual(data, encode_state(Settlement(measurement=MEASUREMENT, parts=parts[::-1]), compact=True))
+        self.assertEqual(sorted(parts, key=lambda part: part.ggo), parts)
+        self.assertEqual(len(parts), 211)
+
+        record = SettlementRecord.decode(data)
+        for i in range(210):
+            self.assertIn(ggo_address(i), record)
+        self.assertNotIn(ggo_address(210), record)
+        self.assertNotIn(ggo_address(0)[:-2] + '00', record)
+
+
+    @pytest.mark.unittest
+    def test_part_table_not_decoded(self):
+        record = SettlementRecord.decode(encode_state(self.settlement(1000), compact=True))
+
+        self.assertEqual(record.parts, [])
+        self.assertEqual(record.total, sum(range(1000)))
+
+        record.add(ggo_address(1000), 5)
+        data = record.encode(compact=True)
+
+        self.assertEqual(data[0], SETTLEMENT_V2)
+        self.assertIn(SettlementPart(ggo=ggo_address(1000), amount=5), decode_state(Settlement, data).parts)
+        self.assertEqual(len(decode_state(Settlement, data).parts), 1001)
+
+
+    @pytest.mark.unittest
+    def test_membership_only_matches_rows(self):
+        table = encode_compact(self.settlement(2))
+        rows = table[-86:]
+
+        # 35 bytes straddling the two rows, found in the table but not a part
+        straddling = rows[20:55].hex()
+        record = SettlementRecord.decode(table)
+
+        self.assertEqual(len(straddling), 70)
+        self.assertNotIn(straddling, record)
+        self.assertNotIn('not-an-address', record)
+        self.assertIn(ggo_address(0), record)
+        self.assertIn(ggo_address(1), record)
+
+
+    @pytest.mark.unittest
+    def test_other_parts_written_as_v1(self):
+        record = SettlementRecord.decode(encode_state(self.settlement(3), compact=True))
+        record.add('not-an-address', 7)
+
+        data = record.encode(compact=True)
+
+        self.assertEqual(data[0], SETTLEMENT_V1)
+        self.assertEqual(decode_state(Settlement, data).parts[-1], SettlementPart(ggo='not-an-address', amount=7))
+
+
+    @pytest.mark.unittest
+    def test_total_out_of_range_written_as_json(self):
+        record = SettlementRecord.decode(encode_state(self.settlement(3), compact=True))
+        record.add(ggo_address(3), 2**62)
+        record.add(ggo_address(4), 2**62)
+
+        data = record.encode(compact=True)
+
+        self.assertEqual(data, encode_state(record.settlement(), compact=True))
+        self.assertEqual(SettlementRecord.decode(data).total, 3 + 2**63)
+
+
+    @pytest.mark.unittest
+    def test_invalid_entries(self):
+        data = encode_state(self.settlement(3), compact=True)
+
+        for entry in [data[:-1], data[:1] + bytes([data[1] + 1]) + data[2:], b'{"measurement": 1}']:
+            with self.assertRaises(ValidationError):
+                SettlementRecord.decode(entry)
+
+
+class TestLargeSettlement(unittest.TestCase):
+
+    def setUp(self):
+        self.key = BIP32Key.fromEntropy("the_consumer_of_a_large_settlement".encode())
+        self.measurement = generate_address(AddressPrefix.MEASUREMENT, self.key.PublicKey())
+        self.settlement = generate_address(AddressPrefix.SETTLEMENT, self.key.PublicKey())
+
+        begin = datetime(2020,1,1,12, tzinfo=timezone.utc)
+        end = datetime(2020,1,1,13, tzinfo=timezone.utc)
+
+        self.states = {
+            self.measurement: encode_state(Measurement(amount=600000, type=MeasurementType.CONSUMPTION, begin=begin, end=end, sector='DK1')),
+            self.settlement: encode_state(Settlement(
+                measurement=self.measurement,
+                parts=[SettlementPart(ggo=ggo_address(i), amount=100) for i in range(5000)]), compact=True),
+        }
+
+        for i in [17, 5000, 5001, 5002]:
+            self.states[ggo_address(i)] = encode_state(GGO(
+                origin=self.measurement, amount=50000, begin=begin, end=end, tech_type='T12412', fuel_type='F010101', sector='DK1',
+                next=GGONext(action=GGOAction.RETIRE, addresses=[self.settlement])))
+
+
+    def apply(self, context, ggo_addresses, version='0.3'):
+        transaction = FakeTransaction(
+            header=FakeTransactionHeader(
+                batcher_public_key=self.key.PublicKey().hex(),
+                dependencies=[],
+                family_name="SettlementRequest",
+                family_version=version,
+                inputs=[self.measurement, self.settlement] + ggo_addresses,
+                outputs=[self.settlement],
+                signer_public_key=self.key.PublicKey().hex()),
+            payload=class_schema(SettlementRequest)().dumps(SettlementRequest(
+                settlement_address=self.settlement,
+                measurement_address=self.measurement,
+                ggo_addresses=ggo_addresses
+            )).encode('utf8')
+        )
+
+        SettlementHandler().apply(transaction, context)
+
+
+    @pytest.mark.unittest
+    def test_append(self):
+        context = MockContext(states=dict(self.states))
+
+        self.apply(context, [ggo_address(5000), ggo_address(5001)])
+
+        data = context.states[self.settlement]
+        self.assertTrue(is_compressed(data))
+        self.assertEqual(decompress(data)[0], SETTLEMENT_V2)
+
+        record = SettlementRecord.decode(data)
+        self.assertEqual(record.total, 600000)
+        self.assertIn(ggo_address(5001), record)
+        self.assertEqual(len(decode_state(Settlement, data).parts), 5002)
+
+        # Version 0.1 reads the compressed table and writes JSON
+        self.states[self.settlement] = data
+        context = MockContext(states=dict(self.states))
+        with self.assertRaises(InvalidTransaction) as invalid_transaction:
+            self.apply(context, [ggo_address(5002)], version='0.1')
+        self.assertEqual(str(invalid_transaction.exception), 'Invalid to retire more that measurement amount')
+
+
+    @pytest.mark.unittest
+    def test_duplicates(self):
+        for ggo_addresses in ([ggo_address(17)], [ggo_address(5000), ggo_address(5000)]):
+            context = MockContext(states=dict(self.states))
+
+            with self.assertRaises(InvalidTransaction) as invalid_transaction:
+                self.apply(context, ggo_addresses)
+
+            self.assertEqual(str(invalid_transaction.exception), 'GGO already part of settlement')
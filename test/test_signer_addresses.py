@@ -0,0 +1,135 @@
+import unittest
+import pytest
+import threading
+from datetime import datetime, timezone
+
+from bip32utils import BIP32Key
+from marshmallow_dataclass import class_schema
+
+from src.datahub_processor.ledger_dto import GGO, TransferGGORequest, generate_address, AddressPrefix
+from src.datahub_processor.state_codec import encode_state
+from src.datahub_processor.signer_addresses import SignerAddressCache, signer_addresses
+from src.datahub_processor.transfer_ggo_handler import TransferGGOTransactionHandler
+
+from .mocks import MockContext, FakeTransaction, FakeTransactionHeader
+
+
+def public_key(i: int) -> str:
+    return BIP32Key.fromEntropy(f'signer_address_cache_key_{i}'.encode()).PublicKey().hex()
+
+
+class TestSignerAddressCache(unittest.TestCase):
+
+    @pytest.mark.unittest
+    def test_hits_and_misses(self):
+        cache = SignerAddressCache(8)
+        key = public_key(1)
+
+        address = cache.get(AddressPrefix.GGO, key)
+
+        self.assertEqual(address, generate_address(AddressPrefix.GGO, bytearray.fromhex(key)))
+        self.assertEqual(cache.get(AddressPrefix.GGO, key), address)
+        self.assertEqual(cache.get(AddressPrefix.SETTLEMENT, key), generate_address(AddressPrefix.SETTLEMENT, bytearray.fromhex(key)))
+        self.assertEqual(cache.snapshot(), {'hits': 1, 'misses': 2, 'size': 2})
+
+
+    @pytest.mark.unittest
+    def test_least_recently_used_evicted(self):
+        cache = SignerAddressCache(2)
+
+        cache.get(AddressPrefix.GGO, public_key(1))
+        cache.get(AddressPrefix.GGO, public_key(2))
+        cache.get(AddressPrefix.GGO, public_key(1))
+        cache.get(AddressPrefix.GGO, public_key(3))
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.snapshot()['misses'], 3)
+
+        cache.get(AddressPrefix.GGO, public_key(1))
+        self.assertEqual(cache.snapshot()['hits'], 2)
+
+        cache.get(AddressPrefix.GGO, public_key(2))
+        self.assertEqual(cache.snapshot()['misses'], 4)
+
+
+    @pytest.mark.unittest
+    def test_disabled(self):
+        cache = SignerAddressCache(0)
+
+        cache.get(AddressPrefix.GGO, public_key(1))
+        cache.get(AddressPrefix.GGO, public_key(1))
+
+        self.assertEqual(cache.snapshot(), {'hits': 0, 'misses': 2, 'size': 0})
+
+
+    @pytest.mark.unittest
+    def test_invalid_key_not_cached(self):
+        cache = SignerAddressCache(8)
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                cache.get(AddressPrefix.GGO, 'not-hex')
+
+        self.assertEqual(cache.snapshot(), {'hits': 0, 'misses': 2, 'size': 0})
+
+
+    @pytest.mark.unittest
+    def test_threads(self):
+        cache = SignerAddressCache(4)
+        keys = [public_key(i) for i in range(8)]
+        expected = {key: generate_address(AddressPrefix.GGO, bytearray.fromhex(key)) for key in keys}
+        errors = []
+
+        def run():
+            for _ in range(50):
+                for key in keys:
+                    if cache.get(AddressPrefix.GGO, key) != expected[key]:
+                        errors.append(key)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        snapshot = cache.snapshot()
+        self.assertEqual(errors, [])
+        self.assertEqual(snapshot['hits'] + snapshot['misses'], 4 * 50 * 8)
+        self.assertLessEqual(snapshot['size'], 4)
+
+
+    @pytest.mark.unittest
+    def test_shared_by_handlers(self):
+        key = BIP32Key.fromEntropy('signer_address_cache_owner'.encode())
+        receiver = BIP32Key.fromEntropy('signer_address_cache_receiver'.encode())
+
+        ggo_src = generate_address(AddressPrefix.GGO, key.PublicKey())
+        ggo_dst = generate_address(AddressPrefix.GGO, receiver.PublicKey())
+
+        ggo = encode_state(GGO(origin='meaaaa1c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c', amount=80,
+            begin=datetime(2020,1,1,12, tzinfo=timezone.utc), end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+            tech_type='T124124', fuel_type='F12412', sector='DK1', next=None, emissions=None))
+
+        transaction = FakeTransaction(
+            header=FakeTransactionHeader(
+                batcher_public_key=key.PublicKey().hex(),
+                dependencies=[],
+                family_name="TransferGGORequest",
+                family_version="0.1",
+                inputs=[ggo_src, ggo_dst],
+                outputs=[ggo_src, ggo_dst],
+                signer_public_key=key.PublicKey().hex()),
+            payload=class_schema(TransferGGORequest)().dumps(TransferGGORequest(
+                origin=ggo_src,
+                destination=ggo_dst
+            )).encode('utf8')
+        )
+
+        before = signer_addresses.snapshot()
+
+        for _ in range(2):
+            TransferGGOTransactionHandler().apply(transaction, MockContext(states={ggo_src: ggo}))
+
+        after = signer_addresses.snapshot()
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 1)
@@ -8,12 +8,16 @@ from bip32utils import BIP32Key
 from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
 from src.datahub_processor.split_ggo_handler import SplitGGOTransactionHandler
  
-from .mocks import MockContext, FakeTransaction, FakeTransactionHeader
+from .mocks import MockContext, FakeTransaction, FakeTransactionHeader, StateBudget, StateBudgetAssertions
 
 from marshmallow_dataclass import class_schema
 
 
-class TestIssueGGO(unittest.TestCase):
+# get_state and set_state round trips, addresses and bytes read a transaction may make
+BUDGET = StateBudget(reads=2, writes=1, addresses=4, bytes=768)
+
+
+class TestIssueGGO(StateBudgetAssertions, unittest.TestCase):
 
     def create_fake_transaction(self, inputs, outputs, payload, key: BIP32Key):
         
@@ -35,8 +39,11 @@ class TestIssueGGO(unittest.TestCase):
         
         self.assertEqual(handler.family_name, 'SplitGGORequest')
 
-        self.assertEqual(len(handler.family_versions), 1)
+        self.assertEqual(len(handler.family_versions), 4)
         self.assertIn('0.1', handler.family_versions)
+        self.assertIn('0.2', handler.family_versions)
+        self.assertIn('0.3', handler.family_versions)
+        self.assertIn('0.4', handler.family_versions)
 
         self.assertEqual(len(handler.namespaces), 1)
         self.assertIn('849c0b', handler.namespaces)
@@ -97,7 +104,8 @@ class TestIssueGGO(unittest.TestCase):
             payload=payload,
             key=key)
 
-        SplitGGOTransactionHandler().apply(transaction, context)
+        with self.assertWithinBudget(context, BUDGET):
+            SplitGGOTransactionHandler().apply(transaction, context)
 
 
         self.assertIn(ggo_src, context.states)
@@ -230,7 +238,8 @@ class TestIssueGGO(unittest.TestCase):
 
 
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            SplitGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                SplitGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'The sum of the parts does not equal the whole')
 
@@ -262,7 +271,8 @@ class TestIssueGGO(unittest.TestCase):
             key=key)
    
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            SplitGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                SplitGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), f'Address "{ggo_src}" does not contain a valid GGO.')
 
@@ -305,7 +315,8 @@ class TestIssueGGO(unittest.TestCase):
             key=key)
    
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            SplitGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                SplitGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'GGO already has been used')
 
@@ -349,7 +360,8 @@ class TestIssueGGO(unittest.TestCase):
             key=key_criminal)
    
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            SplitGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                SplitGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Invalid key for GGO')
 
@@ -406,6 +418,7 @@ class TestIssueGGO(unittest.TestCase):
             key=key)
    
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            SplitGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                SplitGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Destination address not empty')
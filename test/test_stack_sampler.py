@@ -0,0 +1,152 @@
+import os
+import time
+import signal
+import logging
+import tempfile
+import threading
+import unittest
+import pytest
+from unittest import mock
+
+from src.datahub_processor import stack_sampler
+from src.datahub_processor.stack_sampler import StackSampler, install_signal_handler
+
+
+def busy_outer(stop: threading.Event):
+    busy_inner(stop)
+
+
+def busy_inner(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestStackSampler(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=busy_outer, args=(self.stop,), name='busy')
+        self.thread.start()
+
+    def tearDown(self):
+        self.stop.set()
+        self.thread.join()
+        self.directory.cleanup()
+
+
+    @pytest.mark.unittest
+    def test_collapsed(self):
+        sampler = StackSampler(100, self.directory.name)
+
+        for _ in range(5):
+            sampler.sample()
+
+        lines = sampler.collapsed().splitlines()
+        busy = [line for line in lines if line.startswith('busy;')]
+
+        self.assertEqual(sampler.samples, 5)
+        self.assertEqual(sum(int(line.rsplit(' ', 1)[1]) for line in busy), 5)
+        self.assertTrue(all('busy_outer (test_stack_sampler.py:' in line and ';busy_inner (test_stack_sampler.py:' in line for line in busy))
+
+        # The sampling thread is not sampled
+        self.assertFalse(any('sample (stack_sampler.py' in line for line in lines))
+
+
+    @pytest.mark.unittest
+    def test_dump_resets(self):
+        sampler = StackSampler(100, self.directory.name)
+        sampler.sample()
+
+        path = sampler.dump()
+
+        with open(path) as file:
+            self.assertIn('busy_inner', file.read())
+        self.assertEqual(os.path.dirname(path), self.directory.name)
+        self.assertEqual(sampler.collapsed(), '')
+
+
+    @pytest.mark.unittest
+    def test_bounded(self):
+        sampler = StackSampler(100, self.directory.name)
+
+        with mock.patch.object(stack_sampler, 'MAX_STACKS', 0):
+            sampler.sample()
+
+        self.assertEqual(list(sampler._stacks), [stack_sampler.OTHER])
+
+
+    @pytest.mark.unittest
+    def test_thread(self):
+        sampler = StackSampler(500, self.directory.name)
+
+        sampler.start()
+        self.assertTrue(sampler.running)
+        self.stop.wait(0.2)
+        sampler.stop()
+
+        self.assertFalse(sampler.running)
+        self.assertGreater(sampler.samples, 0)
+        self.assertIn('busy_inner', sampler.collapsed())
+
+
+    @pytest.mark.unittest
+    def test_disabled(self):
+        sampler = StackSampler(0, self.directory.name)
+
+        sampler.start()
+
+        self.assertFalse(sampler.running)
+
+
+    @pytest.mark.unittest
+    def test_unwritable_directory(self):
+        directory = os.path.join(self.directory.name, 'file')
+        open(directory, 'w').close()
+        sampler = StackSampler(100, directory)
+
+        with self.assertLogs('datahub_processor', logging.ERROR) as logs:
+            sampler.dump()
+
+        self.assertIn('Could not write the sampled stacks', logs.output[0])
+
+
+    @pytest.mark.unittest
+    def test_failed_sample_logged(self):
+        sampler = StackSampler(500, self.directory.name)
+        failed = threading.Event()
+
+        def sample():
+            failed.set()
+            raise RuntimeError('sampling failed')
+
+        with self.assertLogs('datahub_processor', logging.ERROR) as logs:
+            with mock.patch.object(sampler, 'sample', side_effect=sample):
+                sampler.start()
+                failed.wait(5)
+                sampler.stop()
+
+        self.assertIn('Sampling the stacks failed', logs.output[0])
+
+
+    @pytest.mark.unittest
+    def test_signal_dumps(self):
+        sampler = StackSampler(100, self.directory.name)
+        sampler.sample()
+        previous = signal.getsignal(signal.SIGUSR1)
+
+        try:
+            with mock.patch.object(stack_sampler, 'sampler', sampler):
+                install_signal_handler(signal.SIGUSR1)
+
+                with self.assertLogs('datahub_processor', logging.INFO) as logs:
+                    os.kill(os.getpid(), signal.SIGUSR1)
+
+                    deadline = time.monotonic() + 5
+                    while not logs.records and time.monotonic() < deadline:
+                        time.sleep(0.01)
+        finally:
+            signal.signal(signal.SIGUSR1, previous)
+
+        self.assertIn(f'Wrote sampled stacks to {self.directory.name}', logs.output[0])
+        self.assertEqual(sampler.collapsed(), '')
@@ -0,0 +1,201 @@
+import unittest
+import pytest
+import json
+from typing import Dict, List, Optional
+from unittest.mock import patch
+from datetime import datetime, timezone
+
+from marshmallow import ValidationError
+
+from src.datahub_processor.ledger_dto import GGO, GGONext, GGOAction, Measurement, MeasurementType, Settlement, SettlementPart
+from src.datahub_processor.state_codec import encode_state, decode_state, get_codec, field_codec, STRING, UNSUPPORTED, _Fallback
+from src.datahub_processor.schema_registry import get_schema
+
+
+EMISSIONS = {
+    "co2": {
+        "value": 1113342.14,
+        "unit": "g/Wh",
+    },
+    "so2": {
+        "value": 9764446,
+        "unit": "g/Wh",
+    },
+}
+
+
+class TestStateCodec(unittest.TestCase):
+
+    def states(self):
+        return [
+            GGO(
+                origin='meaaaa1c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c',
+                amount=80,
+                begin=datetime(2020,1,1,12, tzinfo=timezone.utc),
+                end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+                tech_type='T12412',
+                fuel_type='F010101',
+                sector='DK1',
+                next=None,
+                emissions=EMISSIONS),
+            GGO(
+                origin='meaaaa1c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c',
+                amount=80,
+                begin=datetime(2020,1,1,12, tzinfo=timezone.utc),
+                end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+                tech_type='T12412',
+                fuel_type='F010101',
+                sector='DK1',
+                next=GGONext(GGOAction.SPLIT, ['split1_add', 'split2_add'])),
+            Measurement(
+                amount=150,
+                type=MeasurementType.CONSUMPTION,
+                begin=datetime(2020,1,1,12, tzinfo=timezone.utc),
+                end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+                sector='DK2'),
+            Settlement(
+                measurement='mea_con_1_add',
+                parts=[
+                    SettlementPart(ggo='ggo_1_add', amount=10),
+                    SettlementPart(ggo='ggo_2_add', amount=25),
+                ]),
+            Settlement(
+                measurement='mea_con_1_add',
+                parts=[]),
+        ]
+
+    def assert_same_outcome(self, clazz, data: bytes):
+        try:
+            expected = get_schema(clazz).loads(data.decode('utf8'))
+        except (ValidationError, json.JSONDecodeError) as err:
+            with self.assertRaises(type(err)) as actual:
+                decode_state(clazz, data)
+            self.assertEqual(str(actual.exception), str(err))
+        else:
+            self.assertEqual(decode_state(clazz, data), expected)
+
+
+    @pytest.mark.unittest
+    def test_codecs_generated(self):
+        self.assertIsNotNone(get_codec(GGO))
+        self.assertIsNotNone(get_codec(Measurement))
+        self.assertIsNotNone(get_codec(Settlement))
+
+
+    @pytest.mark.unittest
+    def test_measurement_decoded_by_fast_path(self):
+        measurement = self.states()[2]
+        data = get_schema(Measurement).dumps(measurement).encode('utf8')
+
+        with patch.object(get_schema(Measurement), 'loads', side_effect=AssertionError):
+            self.assertEqual(decode_state(Measurement, data), measurement)
+
+
+    @pytest.mark.unittest
+    def test_field_codecs(self):
+        self.assertIs(field_codec(str), STRING)
+        self.assertIs(field_codec(Optional[str]), STRING)
+        self.assertIs(field_codec(float), UNSUPPORTED)
+
+        for annotation in (List[str], Dict[str, int]):
+            self.assertTrue(callable(field_codec(annotation)))
+
+        encode, decode = UNSUPPORTED(None)
+        with self.assertRaises(_Fallback):
+            decode(1.5)
+
+
+    @pytest.mark.unittest
+    def test_encode_byte_identical(self):
+        for state in self.states():
+            self.assertEqual(
+                encode_state(state),
+                get_schema(type(state)).dumps(state).encode('utf8'))
+
+
+    @pytest.mark.unittest
+    def test_decode_equal(self):
+        for state in self.states():
+            data = get_schema(type(state)).dumps(state).encode('utf8')
+            self.assertEqual(decode_state(type(state), data), state)
+            self.assert_same_outcome(type(state), data)
+
+
+    @pytest.mark.unittest
+    def test_decode_invalid_entries(self):
+        measurement = {
+            "amount": 5123,
+            "type": "CONSUMPTION",
+            "begin": "2020-01-01T12:00:00+00:00",
+            "end": "2020-01-01T13:00:00+00:00",
+            "sector": "DK1"
+        }
+
+        variants = [
+            {"amount": -5123},
+            {"amount": "5123"},
+            {"amount": True},
+            {"type": "LEFT"},
+            {"sector": "NO1"},
+            {"begin": "2020-01-01T13:00:00+00:00", "end": "2020-01-01T12:00:00+00:00"},
+            {"begin": "2020-01-01T12:00:00+00:00", "end": "2020-01-01T14:00:00+00:00"},
+            {"begin": "2020-01-01T12:00:00", "end": "2020-01-01T13:00:00"},
+            {"begin": "2020-01-01T12:00:00Z"},
+            {"begin": "2020-01-01"},
+            {"end": None},
+            {"unknown": 1},
+        ]
+
+        for variant in variants:
+            data = json.dumps({**measurement, **variant}).encode('utf8')
+            self.assert_same_outcome(Measurement, data)
+
+        self.assert_same_outcome(Measurement, json.dumps({"amount": 5123}).encode('utf8'))
+        self.assert_same_outcome(Measurement, b'[]')
+        self.assert_same_outcome(Measurement, b'gibberish')
+        self.assert_same_outcome(GGO, json.dumps({'value': 'not a ggo'}).encode('utf8'))
+        self.assert_same_outcome(Settlement, b'{"measurement": "m", "parts": [{"ggo": "g"}]}')
+        self.assert_same_outcome(Settlement, b'{"measurement": "m", "parts": null}')
+
+
+    @pytest.mark.unittest
+    def test_decode_invalid_ggos(self):
+        ggo = json.loads(get_schema(GGO).dumps(self.states()[1]))
+
+        variants = [
+            {"amount": -80},
+            {"amount": 80.0},
+            {"begin": "2020-01-01T12:00:00Z"},
+            {"begin": "2020-01-01T12:00:00.123456"},
+            {"begin": "2020-01-01T12:00:00.12345"},
+            {"begin": "2020-13-01T12:00:00+00:00"},
+            {"next": None},
+            {"next": {"action": "BURN", "addresses": []}},
+            {"next": {"action": "SPLIT", "addresses": "split1_add"}},
+            {"next": {"action": "SPLIT", "addresses": [None]}},
+            {"emissions": []},
+            {"emissions": {"co2": None}},
+            {"emissions": {"co2": {"value": None}}},
+            {"emissions": {"co2": 1.5, "so2": "g/Wh"}},
+            {"emissions": None},
+            {"origin": None},
+        ]
+
+        for variant in variants:
+            data = json.dumps({**ggo, **variant}).encode('utf8')
+            self.assert_same_outcome(GGO, data)
+
+
+    @pytest.mark.unittest
+    def test_encode_unexpected_values(self):
+        states = [
+            GGO(origin='ggo_add', amount=80.0, begin=datetime(2020,1,1,12, tzinfo=timezone.utc), end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+                tech_type='T12412', fuel_type='F010101', sector='DK1'),
+            Settlement(measurement='mea_con_1_add', parts=(SettlementPart(ggo='ggo_1_add', amount=10),)),
+            Settlement(measurement='mea_con_1_add', parts=[{'ggo': 'ggo_1_add', 'amount': 10}]),
+        ]
+
+        for state in states:
+            self.assertEqual(
+                encode_state(state),
+                get_schema(type(state)).dumps(state).encode('utf8'))
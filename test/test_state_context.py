@@ -0,0 +1,191 @@
+import unittest
+import pytest
+
+from src.datahub_processor.state_context import CachedContext
+from src.datahub_processor.transfer_ggo_handler import TransferGGOTransactionHandler
+from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
+
+from .mocks import MockContext, DeclaredContext, LatencyContext, TransferFixture
+
+
+class CountingContext(MockContext):
+
+    def __init__(self, states):
+        super().__init__(states)
+        self.get_calls = []
+        self.set_calls = []
+
+    def get_state(self, addresses, timeout=None):
+        self.get_calls.append(list(addresses))
+        return super().get_state(addresses, timeout)
+
+    def set_state(self, new_states, timeout):
+        self.set_calls.append(dict(new_states))
+        return super().set_state(new_states, timeout)
+
+
+class TestCachedContext(unittest.TestCase):
+
+    @pytest.mark.unittest
+    def test_reads_cached(self):
+        inner = CountingContext({'add_1': b'data_1'})
+        context = CachedContext(inner)
+
+        self.assertEqual(context.get_state(['add_1', 'add_2']), [('add_1', b'data_1')])
+        self.assertEqual(context.get_state(['add_1']), [('add_1', b'data_1')])
+        self.assertEqual(context.get_state(['add_2']), [])
+
+        self.assertEqual(inner.get_calls, [['add_1', 'add_2']])
+        self.assertEqual(context.get_state_calls, 1)
+        self.assertEqual(context.reads_saved, 2)
+
+
+    @pytest.mark.unittest
+    def test_only_missing_fetched(self):
+        inner = CountingContext({'add_1': b'data_1', 'add_2': b'data_2'})
+        context = CachedContext(inner)
+
+        context.get_state(['add_1'])
+        entries = context.get_state(['add_1', 'add_2'])
+
+        self.assertEqual([e.address for e in entries], ['add_1', 'add_2'])
+        self.assertEqual(inner.get_calls, [['add_1'], ['add_2']])
+        self.assertEqual(context.reads_saved, 0)
+
+
+    @pytest.mark.unittest
+    def test_writes_coalesced(self):
+        inner = CountingContext({'add_1': b'data_1'})
+        context = CachedContext(inner)
+
+        context.set_state({'add_1': b'new_1'}, 3)
+        context.set_state({'add_2': b'new_2'}, 3)
+
+        self.assertEqual(inner.set_calls, [])
+        self.assertEqual(context.get_state(['add_1', 'add_2']), [('add_1', b'new_1'), ('add_2', b'new_2')])
+        self.assertEqual(inner.get_calls, [])
+
+        context.flush()
+        context.flush()
+
+        self.assertEqual(inner.set_calls, [{'add_1': b'new_1', 'add_2': b'new_2'}])
+        self.assertEqual(inner.states, {'add_1': b'new_1', 'add_2': b'new_2'})
+        self.assertEqual(context.set_state_calls, 1)
+        self.assertEqual(context.writes_saved, 1)
+        self.assertEqual(context.round_trips_saved, 2)
+
+
+    @pytest.mark.unittest
+    def test_other_calls_passed_on(self):
+        inner = CountingContext({})
+        context = CachedContext(inner)
+
+        context.add_receipt_data(b'receipt')
+
+        self.assertEqual(inner.receipt_data, [b'receipt'])
+
+
+    @pytest.mark.unittest
+    def test_undeclared_addresses_invalid(self):
+        context = CachedContext(DeclaredContext({'add_1': b'data_1'}, inputs=['add'], outputs=['add_2']))
+
+        self.assertEqual(context.get_state(['add_1']), [('add_1', b'data_1')])
+        with self.assertRaises(InvalidTransaction):
+            context.get_state(['other'])
+
+        context.set_state({'add_2': b'new_2'})
+        context.flush()
+        context.set_state({'add_1': b'new_1'})
+        with self.assertRaises(InvalidTransaction):
+            context.flush()
+
+
+class PrefetchingTransferHandler(TransferGGOTransactionHandler):
+    PREFETCH_INPUTS = True
+    PREFETCH_MAX_ADDRESSES = 2
+
+
+class CountingTransferFixture(TransferFixture):
+
+    def setUp(self):
+        super().setUp()
+        self.context = CountingContext({self.ggo_src: self.ggo})
+
+
+class TestPrefetchInputs(CountingTransferFixture, unittest.TestCase):
+
+    @pytest.mark.unittest
+    def test_inputs_fetched_once(self):
+        transaction = self.transfer([self.ggo_src, self.ggo_dst])
+
+        PrefetchingTransferHandler().apply(transaction, self.context)
+
+        self.assertEqual(self.context.get_calls, [[self.ggo_src, self.ggo_dst]])
+        self.assertEqual(len(self.context.set_calls), 1)
+        self.assertIn(self.ggo_dst, self.context.states)
+
+
+    @pytest.mark.unittest
+    def test_prefixes_and_cap(self):
+        transaction = self.transfer(['849c0b', self.ggo_src, 'a' * 70, self.ggo_dst])
+
+        PrefetchingTransferHandler().apply(transaction, self.context)
+
+        self.assertEqual(self.context.get_calls, [[self.ggo_src, 'a' * 70], [self.ggo_dst]])
+
+
+class TestValidatorTimeouts(CountingTransferFixture, unittest.TestCase):
+
+    def apply(self, handler, **faults):
+        context = LatencyContext(self.context.states, **faults)
+        transaction = self.transfer([self.ggo_src, self.ggo_dst])
+
+        try:
+            handler.apply(transaction, context)
+        finally:
+            self.calls = context.calls
+
+
+    @pytest.mark.unittest
+    def test_round_trips_recorded(self):
+        self.apply(TransferGGOTransactionHandler(), latency=0.001, jitter=0.0005, seed=1)
+
+        self.assertEqual([(c.method, c.addresses, c.outcome) for c in self.calls], [
+            ('get_state', 1, 'ok'),
+            ('get_state', 1, 'ok'),
+            ('set_state', 2, 'ok'),
+            ('add_receipt_data', 0, 'ok'),
+        ])
+        self.assertGreater(self.calls[0].bytes, 0)
+        self.assertEqual(self.calls[1].bytes, 0)
+        self.assertTrue(all(0.0005 <= c.duration <= 0.0015 for c in self.calls))
+
+
+    @pytest.mark.unittest
+    def test_slow_write_is_internal_error(self):
+        handler = TransferGGOTransactionHandler()
+        handler.TIMEOUT = 0.01
+
+        with self.assertRaises(InternalError) as invalid:
+            self.apply(handler, latency=0.05)
+
+        self.assertEqual(str(invalid.exception), 'An unknown error has occured.')
+        self.assertEqual([(c.method, c.duration, c.outcome) for c in self.calls], [
+            ('get_state', 0.05, 'ok'),
+            ('get_state', 0.05, 'ok'),
+            ('set_state', 0.01, 'timeout'),
+        ])
+
+
+    @pytest.mark.unittest
+    def test_dropped_reads_and_writes_are_internal_errors(self):
+        states = dict(self.context.states)
+
+        with self.assertRaises(InternalError):
+            self.apply(PrefetchingTransferHandler(), drop_rate=1)
+        self.assertEqual([(c.method, c.outcome) for c in self.calls], [('get_state', 'dropped')])
+
+        with self.assertRaises(InternalError):
+            self.apply(TransferGGOTransactionHandler(), timeout_rate=0.5, seed=3)
+        self.assertEqual(self.calls[-1].outcome, 'timeout')
+        self.assertEqual(self.context.states, states)
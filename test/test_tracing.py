@@ -0,0 +1,100 @@
+import os
+import json
+import logging
+import tempfile
+import unittest
+import pytest
+from unittest import mock
+
+from sawtooth_sdk.processor.exceptions import InvalidTransaction
+
+from src.datahub_processor.tracing import Tracer, tracer, NO_SPAN
+from src.datahub_processor.transfer_ggo_handler import TransferGGOTransactionHandler
+
+from .mocks import MockContext, TransferFixture
+
+
+class TestTracing(TransferFixture, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'spans.jsonl')
+        self.transaction.signature = 'a1b2c3'
+
+    def tearDown(self):
+        tracer.close()
+        self.directory.cleanup()
+
+    def spans(self):
+        with open(self.path) as file:
+            return [json.loads(line) for line in file]
+
+
+    @pytest.mark.unittest
+    def test_disabled(self):
+        tracer = Tracer(None)
+
+        self.assertIs(tracer.trace('apply', 'family', 'signature'), NO_SPAN)
+        self.assertIs(tracer.span('get_state'), NO_SPAN)
+
+
+    @pytest.mark.unittest
+    def test_span_outside_trace(self):
+        tracer = Tracer(self.path)
+
+        with tracer.span('get_state') as span:
+            self.assertIsNone(span)
+
+        self.assertFalse(os.path.exists(self.path))
+
+
+    @pytest.mark.unittest
+    def test_unwritable_file_disables(self):
+        tracer = Tracer(os.path.join(self.directory.name, 'missing', 'spans.jsonl'))
+
+        with self.assertLogs('datahub_processor', logging.ERROR) as logs:
+            with tracer.trace('apply', 'family', 'signature'):
+                pass
+
+        self.assertIn('tracing disabled', logs.output[0])
+        self.assertFalse(tracer.enabled)
+        self.assertIs(tracer.trace('apply', 'family', 'signature'), NO_SPAN)
+
+
+    @pytest.mark.unittest
+    def test_apply(self):
+        with mock.patch.multiple(tracer, path=self.path, enabled=True):
+            TransferGGOTransactionHandler().apply(self.transaction, MockContext(states={self.ggo_src: self.ggo}))
+
+        spans = self.spans()
+        root = spans[0]
+
+        self.assertEqual([span['name'] for span in spans],
+            ['apply', 'map_request', 'get_state', 'decode_state', 'get_state', 'encode_state', 'encode_state', 'set_state'])
+        self.assertEqual((root['parent'], root['family'], root['trace']), (None, 'TransferGGORequest', 'a1b2c3'))
+        self.assertNotIn('error', root)
+
+        for span in spans[1:]:
+            self.assertEqual(span['parent'], root['span'])
+            self.assertEqual(span['trace'], 'a1b2c3')
+            self.assertEqual(span['family'], 'TransferGGORequest')
+            self.assertGreaterEqual(span['start'], root['start'])
+            self.assertLessEqual(span['duration'], root['duration'])
+
+        self.assertEqual(spans[1]['type'], 'TransferGGORequest')
+        self.assertEqual(spans[3], dict(spans[3], type='GGO', bytes=len(self.ggo)))
+        self.assertEqual(spans[7]['addresses'], 2)
+
+
+    @pytest.mark.unittest
+    def test_error(self):
+        with mock.patch.multiple(tracer, path=self.path, enabled=True):
+            with self.assertRaises(InvalidTransaction):
+                TransferGGOTransactionHandler().apply(self.transaction, MockContext(states={}))
+
+        spans = self.spans()
+
+        self.assertEqual([span['name'] for span in spans], ['apply', 'map_request', 'get_state'])
+        self.assertEqual(spans[0]['error'], 'InvalidTransaction')
+        self.assertNotIn('error', spans[2])
@@ -11,12 +11,16 @@ from src.datahub_processor.ledger_dto import GGO, TransferGGORequest, GGONext, G
 from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
 from src.datahub_processor.transfer_ggo_handler import TransferGGOTransactionHandler
  
-from .mocks import MockContext, FakeTransaction, FakeTransactionHeader
+from .mocks import MockContext, FakeTransaction, FakeTransactionHeader, StateBudget, StateBudgetAssertions
 
 from marshmallow_dataclass import class_schema
 
 
-class TestIssueGGO(unittest.TestCase):
+# get_state and set_state round trips, addresses and bytes read a transaction may make
+BUDGET = StateBudget(reads=2, writes=1, addresses=2, bytes=768)
+
+
+class TestIssueGGO(StateBudgetAssertions, unittest.TestCase):
 
     def create_fake_transaction(self, inputs, outputs, payload, key: BIP32Key):
         
@@ -39,8 +43,11 @@ class TestIssueGGO(unittest.TestCase):
         
         self.assertEqual(handler.family_name, 'TransferGGORequest')
 
-        self.assertEqual(len(handler.family_versions), 1)
+        self.assertEqual(len(handler.family_versions), 4)
         self.assertIn('0.1', handler.family_versions)
+        self.assertIn('0.2', handler.family_versions)
+        self.assertIn('0.3', handler.family_versions)
+        self.assertIn('0.4', handler.family_versions)
 
         self.assertEqual(len(handler.namespaces), 1)
         self.assertIn('849c0b', handler.namespaces)
@@ -54,6 +61,53 @@ class TestIssueGGO(unittest.TestCase):
         self.assertEqual(str(invalid_transaction.exception), 'An unknown error has occured.')
         
           
+    @pytest.mark.unittest
+    def test_budget_exceeded(self):
+        key = BIP32Key.fromEntropy("the_valid_key_that_owns_the_specific_ggo".encode())
+        ggo_src = generate_address(AddressPrefix.GGO, key.PublicKey())
+        ggo_dst = 'ggonextc37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c'
+
+        ggo = GGO.get_schema().dumps(GGO(
+            origin='meaaaa1c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c',
+            amount=123,
+            begin=datetime(2020,1,1,12, tzinfo=timezone.utc),
+            end=datetime(2020,1,1,13, tzinfo=timezone.utc),
+            tech_type='T12412',
+            fuel_type='F010101',
+            sector='DK1',
+            next=None
+            )).encode('utf8')
+
+        payload = class_schema(TransferGGORequest)().dumps(TransferGGORequest(
+            origin=ggo_src,
+            destination=ggo_dst
+        )).encode('utf8')
+
+        transaction = self.create_fake_transaction(
+            inputs=[ggo_src, ggo_dst],
+            outputs=[ggo_src, ggo_dst],
+            payload=payload,
+            key=key)
+
+        budgets = [
+            (StateBudget(reads=1, writes=1), 'get_state_calls 2 > 1'),
+            (StateBudget(reads=2, writes=0), 'set_state_calls 1 > 0'),
+            (StateBudget(reads=2, writes=1, addresses=1), 'addresses_read 2 > 1'),
+            (StateBudget(reads=2, writes=1, bytes=len(ggo) - 1), f'bytes_read {len(ggo)} > {len(ggo) - 1}'),
+        ]
+
+        for budget, exceeded in budgets:
+            context = MockContext(states={
+                ggo_src: ggo
+            })
+
+            with self.assertRaises(AssertionError) as assertion:
+                with self.assertWithinBudget(context, budget):
+                    TransferGGOTransactionHandler().apply(transaction, context)
+
+            self.assertEqual(str(assertion.exception), f'State access budget exceeded: {exceeded}')
+
+
     @pytest.mark.unittest
     def test_transfer_ggo_success(self):
 
@@ -98,7 +152,8 @@ class TestIssueGGO(unittest.TestCase):
             payload=payload,
             key=key)
 
-        TransferGGOTransactionHandler().apply(transaction, context)
+        with self.assertWithinBudget(context, BUDGET):
+            TransferGGOTransactionHandler().apply(transaction, context)
 
 
         self.assertIn(ggo_src, context.states)
@@ -170,7 +225,8 @@ class TestIssueGGO(unittest.TestCase):
             key=key)
    
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            TransferGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                TransferGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), f'Address "{ggo_src}" does not contain a valid GGO.')
 
@@ -220,7 +276,8 @@ class TestIssueGGO(unittest.TestCase):
             key=key)
    
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            TransferGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                TransferGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'GGO already has been used')
 
@@ -271,7 +328,8 @@ class TestIssueGGO(unittest.TestCase):
             key=key_criminal)
    
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            TransferGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                TransferGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Invalid key for GGO')
 
@@ -344,6 +402,7 @@ class TestIssueGGO(unittest.TestCase):
             key=key)
    
         with self.assertRaises(InvalidTransaction) as invalid_transaction:
-            TransferGGOTransactionHandler().apply(transaction, context)
+            with self.assertWithinBudget(context, BUDGET):
+                TransferGGOTransactionHandler().apply(transaction, context)
 
         self.assertEqual(str(invalid_transaction.exception), 'Destination address not empty')
@@ -0,0 +1,183 @@
+import unittest
+import pytest
+from unittest import mock
+
+from sawtooth_sdk.processor.exceptions import InvalidTransaction
+from sawtooth_sdk.protobuf.setting_pb2 import Setting
+
+from src.datahub_processor import warm_up as warm_up_module
+from src.datahub_processor import publish_measurement_handler, issue_ggo_transaction_handler
+from src.datahub_processor.trusted_issuers import TrustedIssuers, trusted_issuers, setting_address
+from src.datahub_processor.publish_measurement_handler import PublishMeasurementTransactionHandler
+from src.datahub_processor.issue_ggo_transaction_handler import IssueGGOTransactionHandler
+
+from .mocks import MockContext, DeclaredContext, FakeTransaction, FakeTransactionHeader
+
+
+SETTING = 'datahub.issuers.public_keys'
+ISSUER = '039c6c728796613c8fc4bff1294df728047a6c9fd0a37b9b8d53f0a09fc4906be8'
+OTHER = '02a3e6b0a1b8f4c1b8e5c7a2f0b4a8f2c3d1e5a7b9c0d2e4f6a8b0c2d4e6f8a0b1'
+
+
+def setting(value: str, key: str = SETTING) -> bytes:
+    return Setting(entries=[Setting.Entry(key=key, value=value)]).SerializeToString()
+
+
+class CountingContext(MockContext):
+
+    def __init__(self, states):
+        super().__init__(states)
+        self.get_calls = []
+
+    def get_state(self, addresses, timeout=None):
+        self.get_calls.append(list(addresses))
+        return super().get_state(addresses, timeout)
+
+
+class TestTrustedIssuers(unittest.TestCase):
+
+    @pytest.mark.unittest
+    def test_setting_address(self):
+        # The address of a well known setting, as computed by the settings transaction family
+        self.assertEqual(setting_address('sawtooth.settings.vote.authorized_keys'), '000000a87cb5eafdcca6a8cde0fb0dec1400c5ab274474a6aa82c12840f169a04216b7')
+        self.assertEqual(len(setting_address(SETTING)), 70)
+
+
+    @pytest.mark.unittest
+    def test_no_setting_trusts_all(self):
+        self.assertEqual(trusted_issuers.setting, SETTING)
+        self.assertEqual(trusted_issuers.addresses, [setting_address(SETTING)])
+        self.assertTrue(trusted_issuers.is_trusted(OTHER, {}))
+
+
+    @pytest.mark.unittest
+    def test_parsed_when_changed(self):
+        issuers = TrustedIssuers(SETTING)
+        address = setting_address(SETTING)
+
+        states = {address: setting(f'{ISSUER}, {OTHER.upper()}')}
+        self.assertTrue(issuers.is_trusted(ISSUER, states))
+        self.assertTrue(issuers.is_trusted(OTHER, dict(states)))
+        self.assertEqual(issuers.parses, 1)
+
+        states = {address: setting(ISSUER)}
+        self.assertTrue(issuers.is_trusted(ISSUER, states))
+        self.assertFalse(issuers.is_trusted(OTHER, states))
+        self.assertEqual(issuers.parses, 2)
+
+
+    @pytest.mark.unittest
+    def test_other_entries_trust_none(self):
+        issuers = TrustedIssuers(SETTING)
+        address = setting_address(SETTING)
+
+        self.assertFalse(issuers.is_trusted(ISSUER, {address: setting('')}))
+        self.assertFalse(issuers.is_trusted(ISSUER, {address: setting(ISSUER, key='datahub.other')}))
+        self.assertFalse(issuers.is_trusted(ISSUER, {address: b'\xff\xff'}))
+
+
+class TestIssuerValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.issuers = TrustedIssuers(SETTING)
+        self.patches = [
+            mock.patch.object(publish_measurement_handler, 'trusted_issuers', self.issuers),
+            mock.patch.object(issue_ggo_transaction_handler, 'trusted_issuers', self.issuers),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+
+    def transaction(self, inputs, outputs, payload, signer=ISSUER, version='0.5'):
+        return FakeTransaction(
+            header=FakeTransactionHeader(
+                batcher_public_key=signer,
+                dependencies=[],
+                family_name="datahub",
+                family_version=version,
+                inputs=inputs,
+                outputs=outputs,
+                signer_public_key=signer),
+            payload=payload
+        )
+
+
+    @pytest.mark.unittest
+    def test_publish(self):
+        address = '5a98391c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c'
+        payload = b'{"amount": 5123, "type": "CONSUMPTION", "begin": "2020-01-01T12:00:00+00:00", "end": "2020-01-01T13:00:00+00:00", "sector": "DK1"}'
+        inputs = [address, setting_address(SETTING)]
+
+        context = CountingContext({setting_address(SETTING): setting(ISSUER)})
+        PublishMeasurementTransactionHandler().apply(self.transaction(inputs, [address], payload), context)
+
+        self.assertIn(address, context.states)
+        self.assertEqual(context.get_calls, [[address, setting_address(SETTING)]])
+
+        context = CountingContext({setting_address(SETTING): setting(ISSUER)})
+        with self.assertRaises(InvalidTransaction) as invalid_transaction:
+            PublishMeasurementTransactionHandler().apply(self.transaction(inputs, [address], payload, signer=OTHER), context)
+
+        self.assertEqual(str(invalid_transaction.exception), 'Not valid Guarantee of origin issuer!')
+        self.assertNotIn(address, context.states)
+        self.assertEqual(self.issuers.parses, 1)
+
+
+    @pytest.mark.unittest
+    def test_issue(self):
+        mea_add = 'mea8391c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c'
+        ggo_add = 'ggoaaa1c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c'
+        payload = f'{{"origin": "{mea_add}", "destination": "{ggo_add}", "tech_type": "T124124", "fuel_type": "F12412"}}'.encode('utf8')
+        measurement = b'{"amount": 1000, "type": "PRODUCTION", "begin": "2020-01-01T12:00:00+00:00", "end": "2020-01-01T13:00:00+00:00", "sector": "DK1"}'
+        inputs = [mea_add, ggo_add, setting_address(SETTING)]
+
+        context = CountingContext({mea_add: measurement, setting_address(SETTING): setting(ISSUER)})
+        IssueGGOTransactionHandler().apply(self.transaction(inputs, [ggo_add], payload), context)
+
+        self.assertIn(ggo_add, context.states)
+        self.assertEqual(context.get_calls, [[mea_add, setting_address(SETTING)], [ggo_add]])
+
+        context = CountingContext({mea_add: measurement, setting_address(SETTING): setting(ISSUER)})
+        with self.assertRaises(InvalidTransaction) as invalid_transaction:
+            IssueGGOTransactionHandler().apply(self.transaction(inputs, [ggo_add], payload, signer=OTHER), context)
+
+        self.assertEqual(str(invalid_transaction.exception), 'Not valid Guarantee of origin issuer!')
+        self.assertNotIn(ggo_add, context.states)
+
+
+    @pytest.mark.unittest
+    def test_older_versions_not_checked(self):
+        address = '5a98391c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c'
+        payload = b'{"amount": 5123, "type": "CONSUMPTION", "begin": "2020-01-01T12:00:00+00:00", "end": "2020-01-01T13:00:00+00:00", "sector": "DK1"}'
+
+        for version in ['0.1', '0.2', '0.3', '0.4']:
+            context = DeclaredContext({setting_address(SETTING): setting(ISSUER)}, inputs=[address], outputs=[address])
+            PublishMeasurementTransactionHandler().apply(self.transaction([address], [address], payload, signer=OTHER, version=version), context)
+
+            self.assertIn(address, context.states)
+            self.assertEqual(context.addresses_read, 1)
+
+        self.assertEqual(self.issuers.parses, 0)
+
+
+    @pytest.mark.unittest
+    def test_setting_not_in_inputs(self):
+        address = '5a98391c37509b1de4a7f9f1c59e0efc2ed285e7c96c29d5271edd8b4c2714e3c8979c'
+        payload = b'{"amount": 5123, "type": "CONSUMPTION", "begin": "2020-01-01T12:00:00+00:00", "end": "2020-01-01T13:00:00+00:00", "sector": "DK1"}'
+
+        context = DeclaredContext({setting_address(SETTING): setting(ISSUER)}, inputs=[address], outputs=[address])
+        with self.assertRaises(InvalidTransaction) as invalid_transaction:
+            PublishMeasurementTransactionHandler().apply(self.transaction([address], [address], payload), context)
+
+        self.assertEqual(str(invalid_transaction.exception), 'The transaction reads addresses that are not in its inputs.')
+        self.assertNotIn(address, context.states)
+
+
+    @pytest.mark.unittest
+    def test_warm_up(self):
+        with mock.patch.object(warm_up_module, 'trusted_issuers', self.issuers):
+            warm_up_module.warm_up()
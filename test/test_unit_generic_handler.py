@@ -7,8 +7,9 @@ from src.datahub_processor.ledger_dto import GGO, TransferGGORequest, GGONext, G
 
 from sawtooth_sdk.processor.exceptions import InvalidTransaction, InternalError
 from src.datahub_processor.publish_measurement_handler import PublishMeasurementTransactionHandler
+from src.datahub_processor.state_context import CachedContext
  
-from .mocks import MockContext, FakeTransaction, FakeTransactionHeader
+from .mocks import MockContext, DeclaredContext, FakeTransaction, FakeTransactionHeader
 
 from marshmallow_dataclass import class_schema
 
@@ -27,3 +28,46 @@ class TestGenericFunctions(unittest.TestCase):
             handler._get_type(GGO, context, 'add_1')
 
         self.assertEqual(str(invalid_transaction.exception), 'Address "add_1" does not contain a valid GGO.')
+
+
+    @pytest.mark.unittest
+    def test_try_get_type_invalid_json(self):
+        handler = PublishMeasurementTransactionHandler()
+
+        context = MockContext({
+            'add_1': b'{"amount": 10'
+        })
+
+        self.assertIsNone(handler._try_get_type(GGO, context, 'add_1'))
+        self.assertIsNone(handler._try_get_type(GGO, context, 'add_2'))
+
+        with self.assertRaises(InvalidTransaction) as invalid_transaction:
+            handler._get_measurement(context, 'add_1')
+
+        self.assertEqual(str(invalid_transaction.exception), 'Address "add_1" does not contain a valid Measurement.')
+
+
+    @pytest.mark.unittest
+    def test_undeclared_addresses_passed_on(self):
+        handler = PublishMeasurementTransactionHandler()
+        address = 'a' * handler.ADDRESS_LENGTH
+
+        transaction = FakeTransaction(
+            header=FakeTransactionHeader(
+                batcher_public_key='',
+                dependencies=[],
+                family_name='PublishMeasurementRequest',
+                family_version='0.1',
+                inputs=[address],
+                outputs=[address],
+                signer_public_key=''),
+            payload=b'')
+
+        with self.assertRaises(InvalidTransaction):
+            handler._prefetch_inputs(transaction, CachedContext(DeclaredContext({}, inputs=[], outputs=[])))
+
+        state = CachedContext(DeclaredContext({}, inputs=[], outputs=[]))
+        state.set_state({address: b'data'})
+
+        with self.assertRaises(InvalidTransaction):
+            handler._flush(state)
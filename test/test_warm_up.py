@@ -0,0 +1,63 @@
+import hashlib
+import unittest
+import pytest
+from unittest import mock
+
+from src.datahub_processor import metrics, SettlementHandler
+from src.datahub_processor import warm_up as warm_up_module
+from src.datahub_processor.generic_handler import GenericHandler
+from src.datahub_processor.warm_up import warm_up, transactions, check_compression
+from src.datahub_processor.namespaces import GGO_NAMESPACE, MEASUREMENT_NAMESPACE, SETTLEMENT_NAMESPACE, SETTLEMENT_PAGE_NAMESPACE
+
+
+class TestWarmUp(unittest.TestCase):
+
+    @pytest.mark.unittest
+    def test_namespaces(self):
+        for namespace, name in [(GGO_NAMESPACE, 'GGO'), (MEASUREMENT_NAMESPACE, 'MEASUREMENT'), (SETTLEMENT_NAMESPACE, 'SETTLEMENT'), (SETTLEMENT_PAGE_NAMESPACE, 'SETTLEMENT_PAGE')]:
+            self.assertEqual(namespace, hashlib.sha512(name.encode('utf-8')).hexdigest()[0:6])
+
+
+    @pytest.mark.unittest
+    def test_lifecycle_covers_every_handler(self):
+        self.assertEqual([t.header.family_name for t in transactions()], [
+            'PublishMeasurementRequest',
+            'PublishMeasurementRequest',
+            'IssueGGORequest',
+            'SplitGGORequest',
+            'TransferGGORequest',
+            'RetireGGORequest',
+            'SettlementRequest',
+        ])
+
+
+    @pytest.mark.unittest
+    def test_warm_up_not_recorded(self):
+        handler = SettlementHandler()
+        labels = (handler.family_name,)
+        before = metrics.apply_seconds.count(labels)
+
+        with self.assertLogs('datahub_processor') as logs:
+            warm_up([handler])
+            metrics.logger.info('nothing else logged')
+
+        self.assertEqual(metrics.apply_seconds.count(labels), before)
+        self.assertEqual([r.getMessage() for r in logs.records], ['nothing else logged'])
+
+
+    @pytest.mark.unittest
+    def test_compressed_versions_refused(self):
+        handler = SettlementHandler()
+
+        check_compression()
+        self.assertEqual(handler.family_versions, ['0.1', '0.2', '0.3', '0.4'])
+
+        try:
+            with mock.patch.object(warm_up_module, 'check_compressor', return_value=False):
+                with self.assertLogs('datahub_processor', 'ERROR'):
+                    check_compression()
+
+            self.assertEqual(handler.family_versions, ['0.1', '0.2'])
+            warm_up([handler])
+        finally:
+            GenericHandler.REFUSED_VERSIONS = ()
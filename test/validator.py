@@ -0,0 +1,275 @@
+import os
+import sys
+import time
+import signal
+import hashlib
+import itertools
+import dataclasses
+import multiprocessing
+from typing import Dict, List
+
+import zmq
+from sawtooth_sdk.protobuf.validator_pb2 import Message
+from sawtooth_sdk.protobuf.transaction_pb2 import TransactionHeader
+from sawtooth_sdk.protobuf.processor_pb2 import TpRegisterRequest, TpRegisterResponse, TpUnregisterResponse, TpProcessRequest, TpProcessResponse
+from sawtooth_sdk.protobuf.state_context_pb2 import TpStateEntry, TpStateGetRequest, TpStateGetResponse, TpStateSetRequest, TpStateSetResponse, TpStateDeleteRequest, TpStateDeleteResponse, TpReceiptAddDataRequest, TpReceiptAddDataResponse, TpEventAddResponse
+
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# Stands in for an answered context. On SIGINT TransactionProcessor.start()
+# processes its last request once more, whose state requests then arrive after
+# the context is gone; as by the validator, they are refused.
+_FINISHED = (TransactionHeader(), None, {}, [])
+
+
+def run_main(url: str, families=None):
+    """ Process target running src/main.py against url, as the container does. """
+    sys.path.insert(0, SRC)
+    import main
+    main.run_worker(url, families)
+
+
+class LocalValidator:
+    """
+    Stands in for the validator side of the Sawtooth transaction processor
+    protocol, so a real TransactionProcessor (e.g. main.main(url)) can be
+    driven without Docker.
+
+    Processors connect to self.url and register as they would with a
+    validator. run() sends them TpProcessRequests and serves their state
+    get/set/delete requests from the in-memory states, restricted to the
+    transaction's inputs and outputs. The writes of a transaction are
+    applied to states when it is answered with OK and discarded otherwise.
+
+    Everything happens on the calling thread: messages are only handled
+    while wait_for_registration(), run() or shutdown() is executing.
+    """
+
+    def __init__(self, states: Dict[str, bytes] = None, host: str = '127.0.0.1'):
+        self.states = {} if states is None else states
+        self.receipts: Dict[str, List[bytes]] = {}
+        self.processors: Dict[tuple, bytes] = {}
+
+        self._context = zmq.Context()
+        self._socket = self._context.socket(zmq.ROUTER)
+        self._socket.setsockopt(zmq.LINGER, 0)
+        self._socket.bind(f'tcp://{host}:*')
+        self.url = self._socket.getsockopt_string(zmq.LAST_ENDPOINT)
+
+        self._ids = itertools.count()
+        self._executions = {}
+        self._responses = {}
+
+    def close(self):
+        self._socket.close()
+        self._context.term()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def wait_for_registration(self, families, timeout: float = 10):
+        """ Handles messages until a processor has registered each of the families. """
+        deadline = time.monotonic() + timeout
+
+        while not all(any(name == family for name, _ in self.processors) for family in families):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'Families not registered within {timeout} seconds: {", ".join(families)}')
+            self._receive(deadline)
+
+    def run(self, transactions, in_flight: int = 1, timeout: float = 10) -> List[TpProcessResponse]:
+        """
+        Sends the transactions to the registered processors, keeping up to
+        in_flight requests outstanding, and returns their responses in order.
+
+        A processor handles its requests one at a time and answers them in
+        order, so pipelining keeps the state of dependent transactions
+        consistent as long as a single processor handles them.
+        """
+        pending = iter(transactions)
+        outstanding = []
+        responses = []
+
+        while True:
+            while len(outstanding) < in_flight:
+                transaction = next(pending, None)
+                if transaction is None:
+                    break
+                outstanding.append(self._send(transaction))
+
+            if not outstanding:
+                return responses
+
+            deadline = time.monotonic() + timeout
+
+            while outstanding[0] not in self._responses:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f'No response from the processor within {timeout} seconds')
+                self._receive(deadline)
+
+            responses.append(self._responses.pop(outstanding.pop(0)))
+
+    def start_processor(self, target, *args, method: str = 'fork') -> multiprocessing.Process:
+        """ Runs target(self.url, *args) in a new process, use method='spawn' for a cold interpreter. """
+        process = multiprocessing.get_context(method).Process(target=target, args=(self.url,) + args, daemon=True)
+        process.start()
+        return process
+
+    def shutdown(self, process: multiprocessing.Process, timeout: float = 5):
+        """ Interrupts a processor and serves its unregistration until it exits. """
+        os.kill(process.pid, signal.SIGINT)
+        deadline = time.monotonic() + timeout
+
+        while process.is_alive() and time.monotonic() < deadline:
+            self._receive(min(deadline, time.monotonic() + 0.1))
+
+        process.join(max(0, deadline - time.monotonic()))
+        if process.is_alive():
+            process.terminate()
+
+    def _send(self, transaction) -> str:
+        header = transaction.header
+        if dataclasses.is_dataclass(header):
+            header = TransactionHeader(**dataclasses.asdict(header))
+
+        header.payload_sha512 = hashlib.sha512(transaction.payload).hexdigest()
+        context_id = str(next(self._ids))
+        signature = getattr(transaction, 'signature', None) or hashlib.sha512(header.SerializeToString() + context_id.encode()).hexdigest()
+
+        processor = self.processors.get((header.family_name, header.family_version))
+        if processor is None:
+            raise ValueError(f'No processor registered for {header.family_name} {header.family_version}')
+
+        self._executions[context_id] = (header, signature, {}, [])
+
+        request = TpProcessRequest(header=header, payload=transaction.payload, signature=signature, context_id=context_id)
+        self._socket.send_multipart([processor, Message(
+            message_type=Message.TP_PROCESS_REQUEST,
+            correlation_id=context_id,
+            content=request.SerializeToString()).SerializeToString()])
+
+        return context_id
+
+    def _receive(self, deadline: float):
+        if not self._socket.poll(max(0, int((deadline - time.monotonic()) * 1000))):
+            return
+
+        identity, data = self._socket.recv_multipart()
+        message = Message()
+        message.ParseFromString(data)
+
+        handler = self._handlers.get(message.message_type)
+        if handler is not None:
+            handler(self, identity, message)
+
+    def _reply(self, identity: bytes, message: Message, message_type, response):
+        self._socket.send_multipart([identity, Message(
+            message_type=message_type,
+            correlation_id=message.correlation_id,
+            content=response.SerializeToString()).SerializeToString()])
+
+    def _register(self, identity, message):
+        request = TpRegisterRequest()
+        request.ParseFromString(message.content)
+        self.processors[(request.family, request.version)] = identity
+
+        self._reply(identity, message, Message.TP_REGISTER_RESPONSE, TpRegisterResponse(
+            status=TpRegisterResponse.OK,
+            protocol_version=request.protocol_version))
+
+    def _unregister(self, identity, message):
+        self.processors = {key: value for key, value in self.processors.items() if value != identity}
+        self._reply(identity, message, Message.TP_UNREGISTER_RESPONSE, TpUnregisterResponse(status=TpUnregisterResponse.OK))
+
+    def _process_response(self, identity, message):
+        response = TpProcessResponse()
+        response.ParseFromString(message.content)
+
+        if message.correlation_id not in self._executions:
+            return
+
+        header, signature, writes, receipts = self._executions.pop(message.correlation_id)
+
+        if response.status == TpProcessResponse.OK:
+            for address, data in writes.items():
+                if data is None:
+                    self.states.pop(address, None)
+                else:
+                    self.states[address] = data
+            if receipts:
+                self.receipts[signature] = receipts
+
+        self._responses[message.correlation_id] = response
+
+    def _get_state(self, identity, message):
+        request = TpStateGetRequest()
+        request.ParseFromString(message.content)
+        header, _, writes, _ = self._executions.get(request.context_id, _FINISHED)
+
+        if not all(_allowed(address, header.inputs) for address in request.addresses):
+            response = TpStateGetResponse(status=TpStateGetResponse.AUTHORIZATION_ERROR)
+        else:
+            response = TpStateGetResponse(status=TpStateGetResponse.OK, entries=[
+                TpStateEntry(address=address, data=writes[address] if address in writes else self.states.get(address, b''))
+                for address in request.addresses
+            ])
+
+        self._reply(identity, message, Message.TP_STATE_GET_RESPONSE, response)
+
+    def _set_state(self, identity, message):
+        request = TpStateSetRequest()
+        request.ParseFromString(message.content)
+        header, _, writes, _ = self._executions.get(request.context_id, _FINISHED)
+
+        if not all(_allowed(entry.address, header.outputs) for entry in request.entries):
+            response = TpStateSetResponse(status=TpStateSetResponse.AUTHORIZATION_ERROR)
+        else:
+            writes.update((entry.address, entry.data) for entry in request.entries)
+            response = TpStateSetResponse(status=TpStateSetResponse.OK, addresses=[entry.address for entry in request.entries])
+
+        self._reply(identity, message, Message.TP_STATE_SET_RESPONSE, response)
+
+    def _delete_state(self, identity, message):
+        request = TpStateDeleteRequest()
+        request.ParseFromString(message.content)
+        header, _, writes, _ = self._executions.get(request.context_id, _FINISHED)
+
+        if not all(_allowed(address, header.outputs) for address in request.addresses):
+            response = TpStateDeleteResponse(status=TpStateDeleteResponse.AUTHORIZATION_ERROR)
+        else:
+            writes.update(dict.fromkeys(request.addresses))
+            response = TpStateDeleteResponse(status=TpStateDeleteResponse.OK, addresses=request.addresses)
+
+        self._reply(identity, message, Message.TP_STATE_DELETE_RESPONSE, response)
+
+    def _add_receipt_data(self, identity, message):
+        request = TpReceiptAddDataRequest()
+        request.ParseFromString(message.content)
+        if request.context_id not in self._executions:
+            response = TpReceiptAddDataResponse(status=TpReceiptAddDataResponse.ERROR)
+        else:
+            self._executions[request.context_id][3].append(request.data)
+            response = TpReceiptAddDataResponse(status=TpReceiptAddDataResponse.OK)
+
+        self._reply(identity, message, Message.TP_RECEIPT_ADD_DATA_RESPONSE, response)
+
+    def _add_event(self, identity, message):
+        self._reply(identity, message, Message.TP_EVENT_ADD_RESPONSE, TpEventAddResponse(status=TpEventAddResponse.OK))
+
+    _handlers = {
+        Message.TP_REGISTER_REQUEST: _register,
+        Message.TP_UNREGISTER_REQUEST: _unregister,
+        Message.TP_PROCESS_RESPONSE: _process_response,
+        Message.TP_STATE_GET_REQUEST: _get_state,
+        Message.TP_STATE_SET_REQUEST: _set_state,
+        Message.TP_STATE_DELETE_REQUEST: _delete_state,
+        Message.TP_RECEIPT_ADD_DATA_REQUEST: _add_receipt_data,
+        Message.TP_EVENT_ADD_REQUEST: _add_event,
+    }
+
+
+def _allowed(address: str, prefixes) -> bool:
+    return any(address.startswith(prefix) for prefix in prefixes)